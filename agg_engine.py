@@ -0,0 +1,151 @@
+"""Factorized group-by engine for interactive aggregates.
+
+Every categorical column is factorized into integer codes once, when the
+engine is built for a loaded dataset. Grouped aggregates are then computed
+with ``np.bincount``-style kernels over those codes instead of re-hashing the
+string column on every request, and each (group column, value column,
+function) result is cached for the lifetime of the engine.
+
+Results match ``df.groupby(by)[column].agg(func).reset_index()``: groups are
+sorted by key, null keys are dropped and null values are skipped.
+
+Rows appended to the frame (e.g. live bookings) are folded in with
+:meth:`AggregationEngine.append`: only the new values are looked up among the
+known categories, so the existing rows are never factorized again.
+"""
+import numpy as np
+import pandas as pd
+
+AGG_FUNCS = ('mean', 'sum', 'median', 'count', 'min', 'max')
+
+
+class AggregationEngine:
+    """Cached grouped aggregates over a read-only DataFrame that only grows by appends."""
+
+    def __init__(self, df, categorical_cols=None):
+        self.df = df
+        self._codes = {}
+        self._values = {}
+        self._sizes = {}
+        self._cache = {}
+        if categorical_cols is None:
+            categorical_cols = df.select_dtypes(include=['object', 'string', 'category']).columns
+        for col in categorical_cols:
+            self.codes(col)
+
+    def codes(self, col):
+        """Return ``(codes, uniques)`` for ``col``, factorizing it on first use."""
+        if col not in self._codes:
+            codes, uniques = pd.factorize(self.df[col], sort=True)
+            self._codes[col] = (codes.astype(np.intp, copy=False), uniques)
+        return self._codes[col]
+
+    def append(self, new_rows, df=None):
+        """Extend the engine with rows appended to its frame.
+
+        Args:
+            new_rows (pd.DataFrame): The appended rows, with the frame's columns.
+            df (pd.DataFrame): The extended frame, if the caller already built it.
+        """
+        self.df = df if df is not None else pd.concat([self.df, new_rows], ignore_index=True)
+        # New dicts rather than updates in place, so a shallow copy leaves the original intact
+        all_codes, sizes = {}, dict(self._sizes)
+        for col, (codes, uniques) in self._codes.items():
+            new_values = new_rows[col]
+            new_codes = uniques.get_indexer(new_values)
+            unseen = pd.unique(new_values[(new_codes < 0) & new_values.notna().to_numpy()])
+            if len(unseen):
+                # A new category: re-sort the uniques and remap the old codes, without re-hashing the rows
+                merged = uniques.append(pd.Index(unseen)).sort_values()
+                remap = merged.get_indexer(uniques)
+                codes = np.where(codes >= 0, remap[codes], -1)
+                new_codes = merged.get_indexer(new_values)
+                uniques = merged
+                sizes.pop(col, None)
+            new_codes = new_codes.astype(np.intp, copy=False)
+            all_codes[col] = (np.concatenate([codes, new_codes]), uniques)
+            if col in sizes:
+                sizes[col] = sizes[col] + np.bincount(new_codes[new_codes >= 0], minlength=len(uniques))
+        self._values = {col: np.concatenate([values, new_rows[col].to_numpy(dtype=np.float64, na_value=np.nan)])
+                        for col, values in self._values.items()}
+        self._codes, self._sizes, self._cache = all_codes, sizes, {}
+        return self
+
+    def _float_values(self, col):
+        if col not in self._values:
+            self._values[col] = self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        return self._values[col]
+
+    def _group_sizes(self, by):
+        # Rows per group, including rows whose value is null; empty groups are not reported
+        if by not in self._sizes:
+            codes, uniques = self.codes(by)
+            self._sizes[by] = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return self._sizes[by]
+
+    def aggregate(self, by, column, func):
+        """Aggregate ``column`` by the groups of ``by``.
+
+        Args:
+            by (str): Group column; factorized once and reused.
+            column (str): Numeric column to aggregate.
+            func (str): One of :data:`AGG_FUNCS`.
+
+        Returns:
+            pd.DataFrame: Columns ``by`` and ``column``, one row per group.
+        """
+        if func not in AGG_FUNCS:
+            raise ValueError(f"Unsupported aggregation '{func}', expected one of {AGG_FUNCS}")
+        key = (by, column, func)
+        if key not in self._cache:
+            self._cache[key] = self._compute(by, column, func)
+        return self._cache[key]
+
+    def _compute(self, by, column, func):
+        codes, uniques = self.codes(by)
+        values = self._float_values(column)
+        present = self._group_sizes(by) > 0
+        n_groups = len(uniques)
+
+        valid = (codes >= 0) & ~np.isnan(values)
+        counts = np.bincount(codes[valid], minlength=n_groups)
+
+        if func == 'count':
+            result = counts
+        elif func in ('sum', 'mean'):
+            sums = np.bincount(codes[valid], weights=values[valid], minlength=n_groups)
+            if func == 'sum':
+                result = sums
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        else:
+            result = self._sorted_kernel(codes, values, valid, counts, func)
+
+        out = pd.DataFrame({by: uniques[present], column: result[present]})
+        if func == 'count':
+            out[column] = out[column].astype('int64')
+        elif (func in ('sum', 'min', 'max') and pd.api.types.is_integer_dtype(self.df[column])
+              and not out[column].isna().any()):
+            out[column] = out[column].astype('int64' if func == 'sum' else self.df[column].dtype)
+        return out
+
+    def _sorted_kernel(self, codes, values, valid, counts, func):
+        # Median/min/max need values ordered within each group: one lexsort per request
+        group_codes = codes[valid]
+        group_values = values[valid]
+        order = np.lexsort((group_values, group_codes))
+        sorted_values = group_values[order]
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        result = np.full(len(counts), np.nan)
+        nonempty = counts > 0
+        if func == 'min':
+            result[nonempty] = sorted_values[starts[nonempty]]
+        elif func == 'max':
+            result[nonempty] = sorted_values[ends[nonempty] - 1]
+        else:
+            lo = starts[nonempty] + (counts[nonempty] - 1) // 2
+            hi = starts[nonempty] + counts[nonempty] // 2
+            result[nonempty] = (sorted_values[lo] + sorted_values[hi]) / 2
+        return result
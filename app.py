@@ -5,7 +5,19 @@ import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
+import os
 import numpy as np
+import forecast_charts
+import forecast_fleet
+import forecast_table
+import instrumentation
+import metrics
+import sarimax_updater
+import scenarios
+
+MODEL_PATH = sarimax_updater.MODEL_PATH
+# Only used if the model has no date index to read its last observation from
+DEFAULT_TRAINING_END = pd.Timestamp("2017-08-31")
 
 # Set Streamlit page config
 st.set_page_config(
@@ -13,6 +25,9 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+instrumentation.start_run('sarimax_app')
+metrics.start_server('sarimax_app')
+metrics.record_rerun('sarimax_app')
 
 # Custom CSS for premium dark styling
 st.markdown("""
@@ -282,29 +297,36 @@ st.markdown("""
 with st.sidebar:
     st.markdown("## 🎯 Dashboard Controls")
     
-    # Add hotel info section
-    st.markdown("""
-    <div class="info-box">
-        <h4>📊 Model Information</h4>
-        <p><strong>Algorithm:</strong> SARIMAX</p>
-        <p><strong>Training Period:</strong> Up to Aug 31, 2017</p>
-        <p><strong>Forecast Target:</strong> Total Guests</p>
-    </div>
-    """, unsafe_allow_html=True)
+    # Add hotel info section (filled in once the model is loaded)
+    model_info = st.empty()
     
     # Model loading status
     with st.spinner("🔄 Loading SARIMAX model..."):
-        @st.cache_resource
-        def load_model():
-            return joblib.load("model.joblib")
+        @instrumentation.timed()
+        @metrics.track_cache('load_model', st.cache_resource)
+        def load_model(modified):
+            # `modified` keys the cache, so a model advanced by sarimax_updater is picked up
+            with metrics.MODEL_LOAD_SECONDS.labels(model='sarimax').time():
+                return joblib.load(MODEL_PATH)
         
         try:
-            model = load_model()
+            model = load_model(os.path.getmtime(MODEL_PATH))
             st.success("✅ Model loaded successfully!")
         except Exception as e:
             st.error(f"❌ Error loading model: {e}")
             st.stop()
     
+    # Forecasts start the day after the model's last observation
+    training_end = sarimax_updater.last_observed(model) or DEFAULT_TRAINING_END
+    model_info.markdown(f"""
+    <div class="info-box">
+        <h4>📊 Model Information</h4>
+        <p><strong>Algorithm:</strong> SARIMAX</p>
+        <p><strong>Training Period:</strong> Up to {training_end.strftime('%b %d, %Y')}</p>
+        <p><strong>Forecast Target:</strong> Total Guests</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
     # Add some metrics about the model
     st.markdown("### 📈 Quick Stats")
     st.markdown('<div class="stats-container">', unsafe_allow_html=True)
@@ -323,11 +345,12 @@ with col2:
     
     # Enhanced date selection with better UX
     st.markdown("### Select Your Forecast Period")
-    st.info("🔍 **Note:** Forecasts are available from September 1, 2017 onwards (post-training period)")
+    first_forecast_day = training_end + pd.Timedelta(days=1)
+    st.info(f"🔍 **Note:** Forecasts are available from {first_forecast_day.strftime('%B %d, %Y')} onwards (post-training period)")
     
     # Date inputs with better defaults and validation
-    default_start = pd.to_datetime("2017-09-14").date()
-    default_end = pd.to_datetime("2017-09-28").date()
+    default_start = (training_end + pd.Timedelta(days=14)).date()
+    default_end = (training_end + pd.Timedelta(days=28)).date()
     
     date_col1, date_col2 = st.columns(2)
     with date_col1:
@@ -346,11 +369,10 @@ with col2:
 # Convert to Timestamp for comparison
 start_date = pd.Timestamp(start_date)
 end_date = pd.Timestamp(end_date)
-training_end = pd.Timestamp("2017-08-31")
 
 # Enhanced validation with better error messages
 if start_date <= training_end:
-    st.error("❌ **Invalid Date Range:** Start date must be after August 31, 2017 (end of training data)")
+    st.error(f"❌ **Invalid Date Range:** Start date must be after {training_end.strftime('%B %d, %Y')} (end of training data)")
 elif start_date > end_date:
     st.error("❌ **Invalid Date Range:** Start date must be before or equal to end date")
 else:
@@ -374,7 +396,9 @@ else:
             start_offset = (start_date - training_end).days
             
             # Get full forecast up to end_date
-            forecast_all = model.forecast(steps=total_days)
+            with instrumentation.span('SARIMAX forecast', 'model', steps=total_days), \
+                    metrics.FORECAST_SECONDS.labels(model='sarimax').time():
+                forecast_all = model.forecast(steps=total_days)
             
             # Get only the forecast from selected start_date to end_date
             forecast = forecast_all[start_offset - 1:]
@@ -429,84 +453,25 @@ else:
             
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             
-            fig = go.Figure()
-            
-            # Add forecast line with premium styling
-            fig.add_trace(go.Scatter(
-                x=forecast.index,
-                y=forecast.values,
-                mode='lines+markers',
+            # Cached template per style; long horizons are decimated before plotting
+            fig = forecast_charts.forecast_figure(
+                forecast.index,
+                forecast.values,
+                f'Hotel Guest Demand Forecast ({start_date.strftime("%b %d")} - {end_date.strftime("%b %d, %Y")})',
+                style=forecast_charts.SARIMAX_STYLE,
                 name='Predicted Guests',
-                line=dict(color='#FFD700', width=4, shape='spline'),
-                marker=dict(size=8, color='#FFA500', line=dict(color='#FFD700', width=2)),
-                hovertemplate='<b>Date:</b> %{x}<br><b>Guests:</b> %{y:.0f}<extra></extra>',
-                fill='tonexty',
-                fillcolor='rgba(255, 215, 0, 0.1)'
-            ))
-            
-            # Update layout for dark theme
-            fig.update_layout(
-                title={
-                    'text': f'Hotel Guest Demand Forecast ({start_date.strftime("%b %d")} - {end_date.strftime("%b %d, %Y")})',
-                    'x': 0.5,
-                    'xanchor': 'center',
-                    'font': {'size': 22, 'color': '#ffffff', 'family': 'Arial Black'}
-                },
-                xaxis_title="Date",
-                yaxis_title="Number of Guests",
-                hovermode='x unified',
-                height=500,
-                template='plotly_dark',
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1,
-                    font=dict(color='#ffffff')
-                ),
-                paper_bgcolor='rgba(26, 26, 26, 0.9)',
-                plot_bgcolor='rgba(45, 45, 45, 0.9)',
-                xaxis=dict(
-                    gridcolor='rgba(255, 255, 255, 0.1)',
-                    color='#ffffff'
-                ),
-                yaxis=dict(
-                    gridcolor='rgba(255, 255, 255, 0.1)',
-                    color='#ffffff'
-                )
+                hover='<b>Date:</b> %{x}<br><b>Guests:</b> %{y:.0f}'
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            instrumentation.plotly_chart(fig, use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
             
             # Detailed forecast table with enhanced styling
             st.markdown("### 📋 Detailed Forecast Data")
             
-            # Create a formatted dataframe
-            forecast_df = pd.DataFrame({
-                'Date': forecast.index.strftime('%A, %B %d, %Y'),
-                'Predicted Guests': forecast.values.astype(int),
-                'Day of Week': forecast.index.strftime('%A'),
-                'Month': forecast.index.strftime('%B')
-            })
-            
-            # Add color coding based on guest numbers
-            def color_code_guests(val):
-                if val > avg_guests * 1.1:
-                    return 'background-color: #d4edda; color: #155724'  # High demand - green
-                elif val < avg_guests * 0.9:
-                    return 'background-color: #f8d7da; color: #721c24'  # Low demand - red
-                else:
-                    return 'background-color: #fff3cd; color: #856404'  # Medium demand - yellow
-            
-            styled_df = forecast_df.style.applymap(
-                color_code_guests, 
-                subset=['Predicted Guests']
-            ).format({'Predicted Guests': '{:,}'})
-            
-            st.dataframe(styled_df, use_container_width=True)
+            # Demand tiers are computed as one vectorized column; only the visible page is styled
+            forecast_df = forecast_table.build_forecast_table(forecast, avg_guests)
+            forecast_table.render_forecast_table(forecast_df)
             
             # Download options
             st.markdown("### 💾 Export Options")
@@ -514,7 +479,7 @@ else:
             col1, col2 = st.columns(2)
             
             with col1:
-                csv_data = forecast_df.to_csv(index=False)
+                csv_data = forecast_df[forecast_table.EXPORT_COLUMNS].to_csv(index=False)
                 st.download_button(
                     label="📥 Download CSV",
                     data=csv_data,
@@ -614,6 +579,18 @@ else:
             
         except Exception as e:
             st.error(f"❌ Error generating forecast: {e}")
+    
+    # Probability of exceeding a capacity over the selected period, from simulated demand paths
+    try:
+        scenarios.render_capacity_section('sarimax', start_date, end_date)
+    except Exception as e:
+        st.error(f"❌ Error simulating demand scenarios: {e}")
+    
+    # Per hotel, segment and channel forecasts, when a fleet has been trained
+    try:
+        forecast_fleet.render_fleet_section('sarimax', start_date, end_date)
+    except Exception as e:
+        st.error(f"❌ Error loading fleet forecasts: {e}")
 
 # Footer with premium dark styling
 st.markdown("---")
@@ -624,4 +601,6 @@ st.markdown("""
     <p style="color: #cccccc;">📊 Built with Streamlit & Python | ⚡ Optimized for Performance</p>
     <p style="color: #999999; font-size: 0.9rem;">Last Updated: {}</p>
 </div>
-""".format(datetime.now().strftime('%B %Y')), unsafe_allow_html=True)
\ No newline at end of file
+""".format(datetime.now().strftime('%B %Y')), unsafe_allow_html=True)
+
+instrumentation.render_panel()
@@ -0,0 +1,261 @@
+"""Rolling-origin backtests for the served forecasting models.
+
+The notebook scores each model on a single 701-day train/test split. Here a
+model is refitted at many cutoffs, each forecasting the next ``horizon`` days.
+MAE, MAPE and interval coverage are reported per step ahead. Supported kinds:
+
+- ``sarimax``: any ``order``/``seasonal_order``. With ``refit=False`` the
+  parameters are estimated once at the first cutoff (and cached with the
+  folds) and later folds only run the Kalman filter, which is much faster.
+- ``prophet``: any Prophet keyword arguments, plus ``country_holidays``. Seasonality
+  and holiday features come from :mod:`calendar_features`' cache.
+- ``rnn`` and ``lstm``: the notebook's Keras networks, trained per fold
+  (needs TensorFlow; no intervals, so coverage is empty).
+
+The daily series is built once and handed to each worker process once, not
+once per fold. Folds run in parallel. Each fold's forecast is cached on disk,
+keyed by the model config, the cutoff, the horizon and a hash of the training
+data, so re-running after a retrain only computes the new folds.
+
+Usage:
+    python backtest.py --bookings hotel_bookings.csv --kind sarimax --max-mape 0.35
+    python backtest.py --bookings hotel_bookings.csv --kind prophet --period 14 --workers 4
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import calendar_features
+import guest_series
+import rnn_runtime
+import windowing
+
+CACHE_DIR = os.environ.get('DASHBOARD_BACKTEST_CACHE', 'backtest_cache')
+INITIAL_DAYS = 701
+HORIZON = 28
+PERIOD = 7
+CONFIGS = {
+    'sarimax': {'order': [0, 1, 6], 'seasonal_order': [0, 1, 1, 7], 'refit': True},
+    'prophet': {
+        'interval_width': 0.95, 'weekly_seasonality': True,
+        'changepoint_prior_scale': 0.001, 'seasonality_prior_scale': 0.1,
+    },
+    'rnn': {'look_back': 7, 'epochs': 100, 'batch_size': 30},
+    'lstm': {'look_back': 7, 'epochs': 100, 'batch_size': 30},
+}
+
+# Set once per worker process by _init_worker
+_series = None
+
+
+def cutoffs(series, horizon=HORIZON, period=PERIOD, initial=INITIAL_DAYS):
+    """Cutoff dates: the first after ``initial`` days, then every ``period`` days,
+    the last leaving a full ``horizon`` of actuals."""
+    last = len(series) - horizon - 1
+    return list(series.index[np.arange(initial - 1, last + 1, period)])
+
+
+def _sarimax(train, horizon, config):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    model = SARIMAX(train, order=tuple(config['order']), seasonal_order=tuple(config['seasonal_order']))
+    params = config.get('params')
+    results = model.filter(np.asarray(params)) if params is not None else model.fit(disp=False)
+    forecast = results.get_forecast(steps=horizon)
+    bounds = forecast.conf_int(alpha=0.05).to_numpy()
+    return np.column_stack([forecast.predicted_mean.to_numpy(), bounds])
+
+
+def _prophet(train, horizon, config):
+    from prophet import Prophet
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    config = dict(config)
+    country = config.pop('country_holidays', None)
+    model = calendar_features.attach(Prophet(**config))
+    if country:
+        model.add_country_holidays(country_name=country)
+    model.fit(pd.DataFrame({'ds': train.index, 'y': train.to_numpy()}))
+    future = pd.DataFrame({'ds': pd.date_range(train.index[-1] + pd.Timedelta(days=1), periods=horizon)})
+    return model.predict(future)[['yhat', 'yhat_lower', 'yhat_upper']].to_numpy()
+
+
+def _keras(kind):
+    def forecast(train, horizon, config):
+        from keras.callbacks import EarlyStopping
+        from keras.layers import LSTM, Dense, SimpleRNN
+        from keras.models import Sequential
+        look_back = config['look_back']
+        # Min-max scaling on the training window, as the notebook does for the LSTM
+        low, high = float(train.min()), float(train.max())
+        scaled = (train.to_numpy(dtype=np.float64) - low) / ((high - low) or 1.0)
+        x, y = windowing.windows(scaled, look_back)
+        x = windowing.rnn_input(x)
+        model = Sequential()
+        if kind == 'rnn':
+            model.add(SimpleRNN(units=32, input_shape=(1, look_back), activation='relu'))
+            model.add(Dense(8, activation='relu'))
+        else:
+            model.add(LSTM(100, input_shape=(1, look_back), activation='relu'))
+            model.add(Dense(4))
+        model.add(Dense(1))
+        model.compile(loss='mean_squared_error', optimizer='adam')
+        model.fit(x, y, epochs=config['epochs'], batch_size=config['batch_size'], verbose=0, shuffle=False,
+                  callbacks=[EarlyStopping(monitor='loss', patience=10)])
+        # Recursive multi-step forecast with the NumPy runtime, not one model.predict per step
+        network = rnn_runtime.Network.from_keras(model, look_back, scale=(low, high))
+        yhat = network.forecast(train.to_numpy(dtype=np.float64), horizon)
+        return np.column_stack([yhat, np.full(horizon, np.nan), np.full(horizon, np.nan)])
+    return forecast
+
+
+FORECASTERS = {'sarimax': _sarimax, 'prophet': _prophet, 'rnn': _keras('rnn'), 'lstm': _keras('lstm')}
+
+
+def _init_worker(series):
+    global _series
+    _series = series
+
+
+def _run_fold(kind, config, cutoff, horizon, cache_path):
+    train = _series.loc[:cutoff]
+    if cache_path and os.path.exists(cache_path):
+        return joblib.load(cache_path), True
+    forecast = FORECASTERS[kind](train, horizon, config)
+    if cache_path:
+        joblib.dump(forecast, cache_path)
+    return forecast, False
+
+
+def fold_key(kind, config, cutoff, horizon, train):
+    """Cache key of one fold: model, config, cutoff, horizon and the training data."""
+    digest = hashlib.sha1()
+    digest.update(json.dumps([kind, config, str(cutoff), horizon], sort_keys=True, default=str).encode())
+    digest.update(np.ascontiguousarray(train.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def _first_window_params(train, config, cache_dir):
+    # Estimated once on the first training window, so later folds only filter; cached like a
+    # fold, so a rerun whose folds are all cached does not fit the model either
+    key = fold_key('sarimax', config, train.index[-1], None, train)
+    path = os.path.join(cache_dir, f'params-{key}.joblib') if cache_dir else None
+    if path and os.path.exists(path):
+        return joblib.load(path)
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    params = SARIMAX(train, order=tuple(config['order']),
+                     seasonal_order=tuple(config['seasonal_order'])).fit(disp=False).params.to_list()
+    if path:
+        joblib.dump(params, path)
+    return params
+
+
+def run(series, kind='sarimax', config=None, horizon=HORIZON, period=PERIOD, initial=INITIAL_DAYS,
+        workers=None, cache_dir=CACHE_DIR):
+    """Rolling-origin backtest of one model configuration.
+
+    Args:
+        series (pd.Series): Daily guests with a daily ``DatetimeIndex``.
+        kind (str): One of ``FORECASTERS``.
+        config (dict): Model settings; defaults to ``CONFIGS[kind]``.
+        horizon (int): Days forecast at each cutoff.
+        period (int): Days between cutoffs.
+        initial (int): Training days at the first cutoff.
+        workers (int): Worker processes; defaults to the CPU count.
+        cache_dir (str): Fold cache directory, or None to disable caching.
+
+    Returns:
+        dict: ``folds`` (one row per cutoff and step) and ``metrics`` (per
+        step ahead), plus fold counts and the wall time.
+    """
+    config = dict(CONFIGS[kind], **(config or {}))
+    series = series.astype(np.float64)
+    points = cutoffs(series, horizon, period, initial)
+    if not points:
+        raise ValueError(f'Series of {len(series)} days is too short for {initial} initial days '
+                         f'and a {horizon}-day horizon')
+    start = time.perf_counter()
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    if kind == 'sarimax' and not config.get('refit', True) and 'params' not in config:
+        config['params'] = _first_window_params(series.loc[:points[0]], config, cache_dir)
+    paths = [os.path.join(cache_dir, f'{fold_key(kind, config, cutoff, horizon, series.loc[:cutoff])}.joblib')
+             if cache_dir else None for cutoff in points]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(series,)) as pool:
+        futures = [pool.submit(_run_fold, kind, config, cutoff, horizon, path) for cutoff, path in zip(points, paths)]
+        outputs = [future.result() for future in futures]
+
+    forecasts = np.stack([forecast for forecast, _ in outputs])
+    # Actuals for every fold and step in one gather
+    positions = series.index.get_indexer(points)[:, np.newaxis] + np.arange(1, horizon + 1)
+    actual = series.to_numpy()[positions]
+    folds = pd.DataFrame({
+        'cutoff': np.repeat(points, horizon),
+        'step': np.tile(np.arange(1, horizon + 1), len(points)),
+        'actual': actual.ravel(),
+        'yhat': forecasts[:, :, 0].ravel(),
+        'lower': forecasts[:, :, 1].ravel(),
+        'upper': forecasts[:, :, 2].ravel(),
+    })
+    return {
+        'folds': folds,
+        'metrics': horizon_metrics(folds),
+        'computed': sum(not cached for _, cached in outputs),
+        'cached': sum(cached for _, cached in outputs),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def horizon_metrics(folds):
+    """MAE, MAPE and interval coverage per step ahead.
+
+    MAPE skips days with zero actual guests; coverage is NaN without intervals.
+    """
+    error = (folds['yhat'] - folds['actual']).abs()
+    nonzero = folds['actual'] != 0
+    frame = pd.DataFrame({
+        'step': folds['step'],
+        'abs_error': error,
+        'pct_error': (error / folds['actual'].abs()).where(nonzero),
+        'covered': ((folds['actual'] >= folds['lower']) & (folds['actual'] <= folds['upper']))
+        .astype(np.float64).where(folds['lower'].notna()),
+    })
+    metrics = frame.groupby('step').agg(
+        mae=('abs_error', 'mean'), mape=('pct_error', 'mean'), coverage=('covered', 'mean'),
+        folds=('abs_error', 'size'),
+    )
+    return metrics
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of a forecasting model.')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings with the hotel_bookings.csv columns')
+    parser.add_argument('--kind', choices=sorted(FORECASTERS), default='sarimax')
+    parser.add_argument('--config', default=None, help='JSON object overriding the default model config')
+    parser.add_argument('--horizon', type=int, default=HORIZON)
+    parser.add_argument('--period', type=int, default=PERIOD)
+    parser.add_argument('--initial', type=int, default=INITIAL_DAYS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--max-mape', type=float, default=None, help='Fail if the mean MAPE over the horizon is above')
+    parser.add_argument('--max-mae', type=float, default=None, help='Fail if the mean MAE over the horizon is above')
+    args = parser.parse_args()
+    result = run(guest_series.daily_guests(pd.read_csv(args.bookings)), args.kind,
+                 json.loads(args.config) if args.config else None, args.horizon, args.period, args.initial,
+                 args.workers, None if args.no_cache else CACHE_DIR)
+    metrics = result['metrics']
+    print(metrics.to_string(float_format='{:.3f}'.format))
+    print(f"{result['computed']} folds computed, {result['cached']} cached, {result['seconds']:.1f} s; "
+          f"mean MAE {metrics['mae'].mean():.2f}, mean MAPE {metrics['mape'].mean():.3f}")
+    failed = ((args.max_mape is not None and metrics['mape'].mean() > args.max_mape)
+              or (args.max_mae is not None and metrics['mae'].mean() > args.max_mae))
+    if failed:
+        print('Quality gate failed')
+        sys.exit(1)
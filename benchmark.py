@@ -0,0 +1,418 @@
+"""Benchmark suite for the dashboard and forecasting hot paths.
+
+Runs against synthetic bookings from :mod:`synthetic_bookings` at a chosen
+scale (100k, 1m or 10m rows) and times:
+
+- loading: CSV parse, building the partitioned store, publishing it to shared
+  memory and attaching the full dataset (``load_data``);
+- global filtering: attaching a (hotel, year) selection vs masking the frame;
+- the aggregations behind every dashboard page;
+- model load and forecast latency for Prophet and SARIMAX, when installed;
+- building the forecast chart for each horizon, with and without plotly's
+  validation of the cached layout.
+
+Each result records min, median and mean wall time over ``--repeat`` runs
+and is written to JSON together with the environment. ``compare`` diffs two
+result files and flags any benchmark whose median slowed down by more than
+the threshold.
+
+Usage:
+    python benchmark.py run --rows 1m
+    python benchmark.py compare benchmark_results/base.json benchmark_results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import agg_engine
+import booking_store
+import country_index
+import dataset_profile
+import derived_columns
+import forecast_charts
+import guest_series
+import quantile_sketch
+import query_backend
+import ranking
+import sarimax_updater
+import shared_dataset
+import synthetic_bookings
+from query_backend import AggSpec, summary_spec
+
+BENCH_DIR = 'bench_data'
+RESULTS_DIR = 'benchmark_results'
+PROPHET_MODEL = 'prophetmodel.joblib'
+SARIMAX_MODEL = 'model.joblib'
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 0.10
+# Differences below this many seconds are treated as noise by compare
+NOISE_FLOOR = 0.001
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+               'September', 'October', 'November', 'December']
+
+
+def measure(func, repeat=DEFAULT_REPEAT, warmup=1, setup=None):
+    """Time ``func()`` ``repeat`` times after ``warmup`` untimed calls.
+
+    Args:
+        func (callable): Code under test.
+        repeat (int): Number of timed runs.
+        warmup (int): Untimed runs first, e.g. to fill OS caches.
+        setup (callable): Called, untimed, before every run.
+
+    Returns:
+        dict: ``min_s``, ``median_s``, ``mean_s`` and ``repeat``.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+        'repeat': repeat,
+    }
+
+
+class Suite:
+    """Collects benchmark results and prints them as they complete."""
+
+    def __init__(self, repeat=DEFAULT_REPEAT, only=None):
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+        self.skipped = {}
+
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) for prefix in self.only)
+
+    def bench(self, name, func, repeat=None, warmup=1, setup=None):
+        if not self.wanted(name):
+            return
+        result = measure(func, repeat or self.repeat, warmup, setup)
+        self.results[name] = result
+        print(f"{name:<45} {result['median_s'] * 1000:>10.2f} ms (min {result['min_s'] * 1000:.2f})", flush=True)
+
+    def skip(self, name, reason):
+        if self.wanted(name):
+            self.skipped[name] = reason
+            print(f'{name:<45} skipped: {reason}', flush=True)
+
+
+def prepare_csv(rows, work_dir=BENCH_DIR, seed=0):
+    """Return the path of a synthetic CSV with ``rows`` bookings, generating it once."""
+    path = os.path.join(work_dir, f'hotel_bookings_{rows}.csv')
+    if not os.path.exists(path):
+        print(f'Generating {rows:,} synthetic bookings -> {path}', flush=True)
+        synthetic_bookings.write_csv(path, rows, seed=seed)
+    return path
+
+
+def page_benchmarks(df, version_dir, query):
+    """Name -> callable for the aggregations behind each dashboard page."""
+    partitions = shared_dataset.list_partitions(version_dir)
+
+    def overview():
+        dataset_profile.load_profile(partitions).describe()
+
+    def overview_exact():
+        df.describe()
+        df.isnull().sum()
+
+    def univariate():
+        sketches = quantile_sketch.SketchIndex(df)
+        sketches.describe()
+        for col in ['lead_time', 'adr', 'total stayed']:
+            sketches.columns[col].box_stats()
+        for col in ['hotel', 'is_canceled', 'market_segment', 'customer_type', 'meal', 'distribution_channel']:
+            df[col].value_counts()
+
+    def bivariate():
+        lead_time_bin = derived_columns.compute(df, 'lead_time_bin')
+        df['is_canceled'].groupby(lead_time_bin, observed=False).mean()
+        df.groupby(['hotel', 'reservation_status']).size()
+        sketches = quantile_sketch.SketchIndex(df)
+        for group in sketches.group_sketches('booking_changes', 'adr').values():
+            group.box_stats()
+        for group in sketches.group_sketches('total_of_special_requests', 'total stayed').values():
+            group.quantiles(np.linspace(0, 1, 201))
+
+    def time_series():
+        by_month = df.groupby('arrival_date_month')
+        by_month.size().reindex(MONTH_ORDER)
+        by_month[['adr', 'is_canceled', 'total stayed', 'lead_time']].mean().reindex(MONTH_ORDER)
+        df.groupby('arrival_date_week_number').size()
+        df.groupby('arrival_date_day_of_month').size()
+        df.groupby(['arrival_date_year', 'arrival_date_month']).size()
+        query.aggregate(df, AggSpec(by=('arrival_date_month',), measures=(
+            ('weekend_nights', 'stays_in_weekend_nights', 'sum'), ('week_nights', 'stays_in_week_nights', 'sum'))))
+        query.aggregate(df, summary_spec('arrival_date_month', df.columns))
+
+    def geographic():
+        engine = agg_engine.AggregationEngine(df)
+        countries = country_index.CountryIndex(df, codes=engine.codes('country'))
+        top = ranking.top_counts(*engine.codes('country'), 15)
+        countries.frames(top.index[:5], columns=['arrival_date_month', 'country']) \
+            .groupby(['arrival_date_month', 'country']).size()
+        for column in ['adr', 'is_canceled', 'lead_time', 'total stayed']:
+            table = query.aggregate(df, AggSpec(by=('country',), measures=(
+                ('mean', column, 'mean'), ('count', column, 'count'))))
+            ranking.top_rows(table, 'mean', 15, min_count=50)
+        ranking.top_rows(countries.summary, 'Total_Bookings', 20, min_count=20, count_column='Total_Bookings')
+
+    def advanced():
+        query.aggregate(df, summary_spec('market_segment', df.columns, with_stay=False))
+        query.aggregate(df, summary_spec('customer_type', df.columns, with_stay=False))
+        revenue = derived_columns.with_columns(df, ['total_revenue'])
+        query.aggregate(revenue, AggSpec(by=('hotel',), measures=(('total_revenue', 'total_revenue', 'sum'),)))
+        revenue.groupby('arrival_date_month')['total_revenue'].sum().reindex(MONTH_ORDER)
+        engine = agg_engine.AggregationEngine(df)
+        for func in ['mean', 'sum', 'count', 'median']:
+            engine.aggregate('market_segment', 'adr', func)
+        engine.aggregate('arrival_date_month', 'lead_time', 'mean')
+
+    return {
+        'page.overview': overview,
+        'page.overview_exact': overview_exact,
+        'page.univariate': univariate,
+        'page.bivariate': bivariate,
+        'page.time_series': time_series,
+        'page.geographic': geographic,
+        'page.advanced': advanced,
+    }
+
+
+def bench_prophet(suite, horizons):
+    try:
+        import prophet  # noqa: F401
+    except ImportError:
+        suite.skip('model.prophet', 'prophet is not installed')
+        return
+    if not os.path.exists(PROPHET_MODEL):
+        suite.skip('model.prophet', f'{PROPHET_MODEL} not found')
+        return
+    suite.bench('model.prophet.load', lambda: joblib.load(PROPHET_MODEL), repeat=max(1, suite.repeat // 2))
+    model = joblib.load(PROPHET_MODEL)
+    start = model.history['ds'].max() + pd.Timedelta(days=1)
+    for days in horizons:
+        future = pd.DataFrame({'ds': pd.date_range(start, periods=days, freq='D')})
+        suite.bench(f'forecast.prophet.{days}d', lambda future=future: model.predict(future))
+
+
+def bench_sarimax(suite, df, horizons, work_dir):
+    try:
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+    except ImportError:
+        suite.skip('model.sarimax', 'statsmodels is not installed')
+        return
+    path = SARIMAX_MODEL
+    if not os.path.exists(path):
+        # No trained model shipped: fit the notebook's specification on the synthetic series once
+        path = os.path.join(work_dir, f'sarimax_{len(df)}.joblib')
+        if not os.path.exists(path):
+            series = guest_series.daily_guests(df)
+            fitted = SARIMAX(series, order=(0, 1, 6), seasonal_order=(0, 1, 1, 7)).fit(disp=False)
+            joblib.dump(fitted, path)
+    suite.bench('model.sarimax.load', lambda: joblib.load(path), repeat=max(1, suite.repeat // 2))
+    model = joblib.load(path)
+    for days in horizons:
+        suite.bench(f'forecast.sarimax.{days}d', lambda days=days: model.forecast(steps=days))
+    # Advancing the filter state by a week of observations, in place of a refit; the forecast
+    # stands in for them
+    week = model.forecast(steps=7)
+    suite.bench('update.sarimax.7d', lambda: sarimax_updater.advance(model, week))
+
+
+def bench_charts(suite, horizons):
+    style = forecast_charts.STYLES['Luxury Gold']
+    for days in horizons:
+        dates = pd.date_range('2017-09-01', periods=days)
+        values = np.random.default_rng(days).normal(150, 30, days)
+        band = dict(lower=values - 20, upper=values + 20)
+        suite.bench(f'chart.forecast.{days}d',
+                    lambda dates=dates, values=values, band=band:
+                    forecast_charts.forecast_figure(dates, values, 'Forecast', style=style, **band))
+        # The same figure validated as plotly does by default, i.e. without the cached layout
+        suite.bench(f'chart.forecast.{days}d.validated',
+                    lambda dates=dates, values=values, band=band:
+                    go.Figure(forecast_charts.forecast_figure(dates, values, 'Forecast', style=style, **band)))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    versions = {}
+    for name in ['numpy', 'pandas', 'pyarrow', 'duckdb', 'statsmodels', 'prophet', 'streamlit']:
+        module = sys.modules.get(name)
+        if module is None:
+            try:
+                module = __import__(name)
+            except ImportError:
+                continue
+        versions[name] = getattr(module, '__version__', None)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+    }
+
+
+def run(rows, repeat=DEFAULT_REPEAT, work_dir=BENCH_DIR, backend='auto', only=None,
+        horizons=(30, 365), seed=0):
+    """Run the suite on ``rows`` synthetic bookings and return the result document."""
+    suite = Suite(repeat, only)
+    csv_path = prepare_csv(rows, work_dir, seed)
+    store_root = os.path.join(work_dir, f'store_{rows}')
+    shm_root = os.path.join(work_dir, f'shm_{rows}')
+    heavy = max(1, repeat // 2)
+
+    suite.bench('load.read_csv', lambda: pd.read_csv(csv_path), repeat=heavy, warmup=0)
+    suite.bench('load.build_store', lambda: booking_store.build_store(csv_path, store_root), repeat=heavy, warmup=0)
+    if not os.path.exists(os.path.join(store_root, booking_store.MARKER_FILE)):
+        booking_store.build_store(csv_path, store_root)
+    suite.bench('load.publish', lambda: shared_dataset.publish(store_root, shm_root), repeat=heavy, warmup=0,
+                setup=lambda: shutil.rmtree(shm_root, ignore_errors=True))
+    version_dir = shared_dataset.publish(store_root, shm_root)
+    suite.bench('load.load_data', lambda: shared_dataset.attach(version_dir))
+
+    df = shared_dataset.attach(version_dir)
+    hotel, year = 'City Hotel', int(df['arrival_date_year'].mode()[0])
+    suite.bench('filter.attach_selection', lambda: shared_dataset.attach(version_dir, [hotel], [year]))
+    suite.bench('filter.mask_frame', lambda: df[(df['hotel'] == hotel) & (df['arrival_date_year'] == year)])
+
+    query = query_backend.get_backend(backend)
+    for name, func in page_benchmarks(df, version_dir, query).items():
+        suite.bench(name, func)
+
+    if suite.wanted('model') or suite.wanted('forecast'):
+        bench_prophet(suite, horizons)
+        bench_sarimax(suite, df, horizons, work_dir)
+    if suite.wanted('chart'):
+        bench_charts(suite, horizons)
+
+    return {
+        'meta': {
+            'rows': rows,
+            'repeat': repeat,
+            'backend': type(query).__name__,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            **_environment(),
+        },
+        'results': suite.results,
+        'skipped': suite.skipped,
+    }
+
+
+def save(document, path=None):
+    """Write a result document to ``path`` (default under ``RESULTS_DIR``) and return the path."""
+    if path is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{document['meta']['rows']}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare(base, new, threshold=REGRESSION_THRESHOLD, noise_floor=NOISE_FLOOR):
+    """Compare two result documents by median time.
+
+    Returns:
+        pd.DataFrame: One row per benchmark in both, with the ratio and a status of
+        ``regression``, ``improvement`` or ``ok``.
+    """
+    rows = []
+    for name in base['results']:
+        if name not in new['results']:
+            continue
+        before = base['results'][name]['median_s']
+        after = new['results'][name]['median_s']
+        ratio = after / before if before else np.inf
+        status = 'ok'
+        if abs(after - before) > noise_floor:
+            if ratio > 1 + threshold:
+                status = 'regression'
+            elif ratio < 1 - threshold:
+                status = 'improvement'
+        rows.append({'benchmark': name, 'base_ms': before * 1000, 'new_ms': after * 1000,
+                     'ratio': ratio, 'status': status})
+    return pd.DataFrame(rows, columns=['benchmark', 'base_ms', 'new_ms', 'ratio', 'status'])
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the suite and save the results as JSON')
+    run_parser.add_argument('--rows', default='100k', help='Dataset size: 100k, 1m, 10m or a row count')
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument('--backend', default='auto', help='Query backend: auto, pandas or duckdb')
+    run_parser.add_argument('--only', default=None, help='Comma-separated benchmark name prefixes, e.g. load,page')
+    run_parser.add_argument('--work-dir', default=BENCH_DIR, help='Where synthetic data and stores are kept')
+    run_parser.add_argument('--out', default=None, help='Result file (default benchmark_results/<time>-<rows>.json)')
+    run_parser.add_argument('--seed', type=int, default=0)
+
+    compare_parser = commands.add_parser('compare', help='Flag regressions between two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                                help='Relative slowdown of the median that counts as a regression')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        only = args.only.split(',') if args.only else None
+        document = run(synthetic_bookings.parse_size(args.rows), args.repeat, args.work_dir, args.backend,
+                       only, seed=args.seed)
+        print(f'Results written to {save(document, args.out)}')
+        return 0
+
+    base, new = _load(args.base), _load(args.new)
+    if base['meta']['rows'] != new['meta']['rows']:
+        print(f"Warning: comparing runs at different scales ({base['meta']['rows']:,} vs {new['meta']['rows']:,} rows)")
+    table = compare(base, new, args.threshold)
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 120):
+        print(table.to_string(index=False))
+    regressions = table[table['status'] == 'regression']
+    if len(regressions):
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions['benchmark'])}")
+        return 1
+    print('\nNo regressions.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Partitioned on-disk storage for the hotel bookings data.
+
+The raw ``hotel_bookings.csv`` is split into one Parquet file per
+(hotel, arrival_date_year) partition using a hive-style directory layout::
+
+    bookings_store/
+        hotel=City Hotel/arrival_date_year=2016/part-0.parquet
+        hotel=Resort Hotel/arrival_date_year=2017/part-0.parquet
+        ...
+
+The dashboard lists the partitions to populate its sidebar filters and then
+reads only the partitions matching the current selection, instead of parsing
+the whole CSV and filtering afterwards.
+
+Build (or rebuild) the store from the command line with::
+
+    python booking_store.py hotel_bookings.csv
+"""
+import os
+import sys
+
+import pandas as pd
+
+import dataset_profile
+import derived_columns
+
+CSV_PATH = 'hotel_bookings.csv'
+STORE_DIR = 'bookings_store'
+PARTITION_COLS = ['hotel', 'arrival_date_year']
+PART_FILE = 'part-0.parquet'
+MARKER_FILE = '_SUCCESS'
+
+
+def prepare_bookings(df):
+    """Apply the dashboard's standard cleaning and eager derived columns to raw bookings."""
+    for col in ['children', 'adults', 'babies']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # 'total people', 'total stayed', 'total_revenue', ... (see derived_columns)
+    derived_columns.materialize(df)
+
+    if 'reservation_status_date' in df.columns:
+        df['reservation_status_date'] = pd.to_datetime(df['reservation_status_date'], errors='coerce')
+    if 'arrival_date' in df.columns:
+        df['arrival_date'] = pd.to_datetime(df['arrival_date'], errors='coerce')
+
+    return df
+
+
+def partition_path(root, hotel, year):
+    """Return the directory holding the partition for ``hotel`` and ``year``."""
+    return os.path.join(root, f'hotel={hotel}', f'arrival_date_year={int(year)}')
+
+
+def write_partitioned(df, root=STORE_DIR):
+    """Write prepared bookings as one Parquet file per (hotel, year) partition.
+
+    Each file is written to a temporary name and renamed into place, so readers
+    never observe a half-written partition.
+    """
+    missing = [col for col in PARTITION_COLS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Cannot partition bookings, missing columns: {missing}")
+
+    os.makedirs(root, exist_ok=True)
+    for (hotel, year), part in df.groupby(PARTITION_COLS, sort=True):
+        part_dir = partition_path(root, hotel, year)
+        os.makedirs(part_dir, exist_ok=True)
+        tmp_path = os.path.join(part_dir, PART_FILE + '.tmp')
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(part_dir, PART_FILE))
+        # Profile each partition at ingest so the Overview page can merge partials
+        dataset_profile.write_profile(part, os.path.join(part_dir, PART_FILE))
+
+    with open(os.path.join(root, MARKER_FILE), 'w') as f:
+        f.write(f"{len(df)}\n")
+    return root
+
+
+def build_store(csv_path=CSV_PATH, root=STORE_DIR):
+    """Parse ``csv_path`` once and write it out as a partitioned store."""
+    df = prepare_bookings(pd.read_csv(csv_path))
+    return write_partitioned(df, root)
+
+
+def ensure_store(csv_path=CSV_PATH, root=STORE_DIR):
+    """Return ``root``, (re)building it from ``csv_path`` if missing or stale.
+
+    Raises:
+        FileNotFoundError: if neither the store nor the source CSV exist.
+    """
+    marker = os.path.join(root, MARKER_FILE)
+    if os.path.exists(marker):
+        if not os.path.exists(csv_path) or os.path.getmtime(csv_path) <= os.path.getmtime(marker):
+            return root
+    elif not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+    return build_store(csv_path, root)
+
+
+def list_partitions(root=STORE_DIR, part_file=PART_FILE):
+    """List the partitions in ``root`` without reading any booking rows.
+
+    Returns:
+        pd.DataFrame: One row per partition with columns ``hotel``,
+        ``arrival_date_year`` and ``path``.
+    """
+    rows = []
+    for hotel_entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if not (hotel_entry.is_dir() and hotel_entry.name.startswith('hotel=')):
+            continue
+        hotel = hotel_entry.name[len('hotel='):]
+        for year_entry in sorted(os.scandir(hotel_entry.path), key=lambda e: e.name):
+            if not (year_entry.is_dir() and year_entry.name.startswith('arrival_date_year=')):
+                continue
+            path = os.path.join(year_entry.path, part_file)
+            if os.path.exists(path):
+                year = int(year_entry.name[len('arrival_date_year='):])
+                rows.append({'hotel': hotel, 'arrival_date_year': year, 'path': path})
+    return pd.DataFrame(rows, columns=['hotel', 'arrival_date_year', 'path'])
+
+
+def select_partitions(partitions, hotels=None, years=None):
+    """Filter a partition listing; an empty or ``None`` selection means "all"."""
+    mask = pd.Series(True, index=partitions.index)
+    if hotels:
+        mask &= partitions['hotel'].isin(hotels)
+    if years:
+        mask &= partitions['arrival_date_year'].isin([int(y) for y in years])
+    return partitions[mask]
+
+
+def read_partitions(root=STORE_DIR, hotels=None, years=None, columns=None):
+    """Read only the partitions matching the hotel/year selection.
+
+    Args:
+        root (str): Store directory.
+        hotels (list): Hotels to include; empty or ``None`` for all.
+        years (list): Arrival years to include; empty or ``None`` for all.
+        columns (list): Optional subset of columns to read.
+
+    Returns:
+        pd.DataFrame: Concatenated bookings from the selected partitions.
+    """
+    selected = select_partitions(list_partitions(root), hotels, years)
+    if selected.empty:
+        return pd.DataFrame(columns=columns)
+    frames = [pd.read_parquet(path, columns=columns) for path in selected['path']]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    root = sys.argv[2] if len(sys.argv) > 2 else STORE_DIR
+    build_store(csv_path, root)
+    print(list_partitions(root).to_string(index=False))
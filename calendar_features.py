@@ -0,0 +1,156 @@
+"""Cached seasonality and holiday features for Prophet.
+
+Prophet rebuilds its Fourier seasonality terms and holiday indicators on
+every ``fit``, and twice on every ``predict`` (components and uncertainty).
+With country holidays, as in the notebook's ``add_country_holidays(
+country_name='PT')`` variant, the features are most of a ``predict`` without
+uncertainty samples: about 20 of 22 ms for 60 days.
+
+Here the features are built once over ``START`` to ``END`` and sliced by
+date afterwards:
+
+- Fourier terms are cached per (period, order), shared by every model.
+- Country calendars are cached per country (and per set of training
+  years), so a multi-country portfolio builds each calendar once.
+- Holiday indicator matrices are cached per holiday config: the country,
+  the custom holidays, the prior scale and the holidays seen in training.
+
+:func:`attach` makes a Prophet model use the cache in place of
+``make_all_seasonality_features``, for ``fit`` and ``predict``. Models
+with conditional seasonalities, extra regressors or sub-daily dates fall
+back to Prophet's own features.
+
+Cached holiday windows that cross a year boundary also mark the adjacent
+year. Prophet only marks them when both years are in the frame. The
+notebook's calendars have no windows, so the features match Prophet's
+exactly.
+"""
+import functools
+import hashlib
+import types
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp('2000-01-01')
+END = pd.Timestamp('2035-12-31')
+DATES = pd.Series(pd.date_range(START, END))
+
+
+@functools.lru_cache(maxsize=32)
+def fourier_terms(period, order):
+    """Prophet's Fourier series over ``DATES``, ``(days, 2 * order)``."""
+    from prophet import Prophet
+    return Prophet.fourier_series(DATES, period, order)
+
+
+@functools.lru_cache(maxsize=64)
+def country_calendar(country, years=None):
+    """Built-in holidays of ``country`` for ``years`` (a tuple), by default every year of ``DATES``."""
+    from prophet.make_holidays import make_holidays_df
+    years = list(years) if years is not None else list(range(START.year, END.year + 1))
+    return make_holidays_df(year_list=years, country=country)
+
+
+def _fingerprint(holidays):
+    if holidays is None:
+        return None
+    return hashlib.sha1(pd.util.hash_pandas_object(holidays, index=False).to_numpy().tobytes()).hexdigest()
+
+
+# (country, custom holidays fingerprint, prior scale, holiday names) -> (features, prior scales)
+_holiday_blocks = {}
+
+
+def _holiday_names(model, dates):
+    # The holidays Prophet would record as seen in training on `dates`
+    if model.train_holiday_names is not None:
+        return list(model.train_holiday_names)
+    frames = [model.holidays] if model.holidays is not None else []
+    if model.country_holidays is not None:
+        # Same years, in the same order, as Prophet's construct_holiday_dataframe, so the
+        # holidays are recorded in the same order
+        frames.append(country_calendar(model.country_holidays, tuple({int(year) for year in dates.dt.year.unique()})))
+    if not frames:
+        return []
+    return list(pd.unique(pd.concat(frames, sort=False)['holiday']))
+
+
+def holiday_block(model, names):
+    """Holiday indicators of ``model`` over ``DATES`` for the holidays ``names``."""
+    key = (model.country_holidays, _fingerprint(model.holidays), model.holidays_prior_scale, tuple(names))
+    if key not in _holiday_blocks:
+        frames = [model.holidays] if model.holidays is not None else []
+        if model.country_holidays is not None:
+            frames.append(country_calendar(model.country_holidays))
+        holidays = pd.concat(frames, sort=False)
+        holidays = holidays[holidays['holiday'].isin(names)]
+        # Holidays seen in training but not in the calendar still get (all-zero) columns
+        missing = pd.DataFrame({'holiday': [name for name in names if name not in set(holidays['holiday'])]})
+        holidays = pd.concat([holidays, missing], sort=False).reset_index(drop=True)
+        # make_holiday_features records the training holidays on first use; they are set by the caller
+        scratch = types.SimpleNamespace(train_holiday_names=pd.Series(names),
+                                        holidays_prior_scale=model.holidays_prior_scale)
+        features, priors, _ = type(model).make_holiday_features(scratch, DATES, holidays)
+        _holiday_blocks[key] = (features, priors)
+    return _holiday_blocks[key]
+
+
+def _cacheable(model, df):
+    if model.extra_regressors or any(props['condition_name'] for props in model.seasonalities.values()):
+        return False
+    ds = df['ds']
+    return bool(len(ds)) and ds.min() >= START and ds.max() <= END and (ds == ds.dt.normalize()).all()
+
+
+def seasonality_features(model, df):
+    """Drop-in for ``Prophet.make_all_seasonality_features`` that slices the cached matrices."""
+    if not _cacheable(model, df):
+        return type(model).make_all_seasonality_features(model, df)
+    rows = (df['ds'] - START).dt.days.to_numpy()
+    seasonal_features, prior_scales = [], []
+    modes = {'additive': [], 'multiplicative': []}
+    for name, props in model.seasonalities.items():
+        terms = fourier_terms(props['period'], props['fourier_order'])[rows]
+        seasonal_features.append(pd.DataFrame(terms, columns=[f'{name}_delim_{i + 1}' for i in range(terms.shape[1])]))
+        prior_scales.extend([props['prior_scale']] * terms.shape[1])
+        modes[props['mode']].append(name)
+    names = _holiday_names(model, df['ds'])
+    if names:
+        features, priors = holiday_block(model, names)
+        if model.train_holiday_names is None:
+            model.train_holiday_names = pd.Series(names)
+        seasonal_features.append(features.iloc[rows].reset_index(drop=True))
+        prior_scales.extend(priors)
+        modes[model.holidays_mode].extend(names)
+    if not seasonal_features:
+        seasonal_features.append(pd.DataFrame({'zeros': np.zeros(df.shape[0])}))
+        prior_scales.append(1.0)
+    seasonal_features = pd.concat(seasonal_features, axis=1)
+    component_cols, modes = model.regressor_column_matrix(seasonal_features, modes)
+    return seasonal_features, prior_scales, component_cols, modes
+
+
+class _CachedFeatures:
+    # Stands in for the bound make_all_seasonality_features. Unlike a method bound with
+    # types.MethodType, it pickles with the model (joblib.dump, process pools)
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, df):
+        return seasonality_features(self.model, df)
+
+
+def attach(model):
+    """Make ``model`` build its features from the cache; returns the model.
+
+    The model stays picklable and is still attached when loaded again.
+    """
+    model.make_all_seasonality_features = _CachedFeatures(model)
+    return model
+
+
+def detach(model):
+    """Undo :func:`attach`."""
+    model.__dict__.pop('make_all_seasonality_features', None)
+    return model
@@ -0,0 +1,145 @@
+"""Per-country index for the Geographic drill-down.
+
+:class:`CountryIndex` sorts row positions by factorized country code once and
+keeps the offset of each country's run, so the rows of any one country are a
+slice of a precomputed array. It also precomputes the per-country summary
+table (bookings, cancellation rate, ADR, lead time and stay duration) with
+``np.bincount`` over the same codes, so selecting a country in the drill-down
+reads a cached row instead of rescanning the selection.
+
+:meth:`CountryIndex.append` folds in rows appended to the selection: their
+positions are inserted at the end of each country's run and the summary sums
+and counts are extended with the new rows' bincounts.
+"""
+import numpy as np
+import pandas as pd
+
+SUMMARY_MEASURES = [
+    ('Cancellation_Rate', 'is_canceled'),
+    ('Avg_ADR', 'adr'),
+    ('Avg_Lead_Time', 'lead_time'),
+    ('Avg_Stay_Duration', 'total stayed'),
+]
+
+
+class CountryIndex:
+    """Row positions and summary statistics per country."""
+
+    def __init__(self, df, codes=None, column='country'):
+        """
+        Args:
+            df (pd.DataFrame): Bookings for the current selection.
+            codes (tuple): Optional precomputed ``(codes, uniques)`` from
+                ``pd.factorize(df[column], sort=True)``, e.g.
+                :meth:`agg_engine.AggregationEngine.codes`.
+            column (str): Column to index by.
+        """
+        self.df = df
+        self.column = column
+        if codes is None:
+            codes, uniques = pd.factorize(df[column], sort=True)
+        else:
+            codes, uniques = codes
+        self.countries = uniques
+        self._positions = {country: i for i, country in enumerate(uniques)}
+
+        order = np.argsort(codes, kind='stable')
+        self._order = order[codes[order] >= 0]
+        self._sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self._offsets = np.concatenate(([0], np.cumsum(self._sizes)))
+        self._totals = self._accumulate(df, codes)
+        self.summary = self._summarize()
+
+    def _accumulate(self, df, codes):
+        # Per-country (count, sum) of the non-null values of each summary measure
+        totals = {}
+        valid_rows = codes >= 0
+        for _, col in SUMMARY_MEASURES:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                valid = valid_rows & ~np.isnan(values)
+                totals[col] = (np.bincount(codes[valid], minlength=len(self.countries)),
+                               np.bincount(codes[valid], weights=values[valid], minlength=len(self.countries)))
+        return totals
+
+    def _summarize(self):
+        # Same columns as query_backend.summary_spec(column, ...), with the same count fallback
+        summary = {self.column: self.countries, 'Total_Bookings': self._sizes}
+        for name, col in SUMMARY_MEASURES:
+            if col not in self._totals:
+                summary[name] = self._sizes
+                continue
+            counts, sums = self._totals[col]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                summary[name] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        return pd.DataFrame(summary)
+
+    def append(self, new_rows, codes=None, df=None):
+        """Extend the index with rows appended to its frame.
+
+        Args:
+            new_rows (pd.DataFrame): The appended rows, with the frame's columns.
+            codes (tuple): Optional ``(codes, uniques)`` of the extended frame,
+                e.g. from :meth:`agg_engine.AggregationEngine.codes` after its
+                own ``append``.
+            df (pd.DataFrame): The extended frame, if the caller already built it.
+        """
+        start = len(self.df)
+        df = df if df is not None else pd.concat([self.df, new_rows], ignore_index=True)
+        if codes is None:
+            new_codes = pd.Index(self.countries).get_indexer(new_rows[self.column])
+            uniques = self.countries
+            if ((new_codes < 0) & new_rows[self.column].notna().to_numpy()).any():
+                uniques = None
+        else:
+            new_codes, uniques = codes[0][start:], codes[1]
+        if uniques is None or len(uniques) != len(self.countries):
+            # A new country shifts every run; sort again
+            self.__init__(df, codes=codes, column=self.column)
+            return self
+
+        self.df = df
+        new_codes = np.asarray(new_codes, dtype=np.intp)
+        order = np.argsort(new_codes, kind='stable')
+        order = order[new_codes[order] >= 0]
+        # Each new row goes at the end of its country's run, after the rows already there
+        self._order = np.insert(self._order, self._offsets[new_codes[order] + 1], start + order)
+        new_sizes = np.bincount(new_codes[new_codes >= 0], minlength=len(self.countries))
+        self._sizes = self._sizes + new_sizes
+        self._offsets = np.concatenate(([0], np.cumsum(self._sizes)))
+        self._totals = {col: (self._totals[col][0] + counts, self._totals[col][1] + sums)
+                        for col, (counts, sums) in self._accumulate(new_rows, new_codes).items()}
+        self.summary = self._summarize()
+        return self
+
+    def __contains__(self, country):
+        return country in self._positions
+
+    def rows(self, country):
+        """Positions (for ``df.iloc``) of the rows for ``country``, as a view."""
+        i = self._positions[country]
+        return self._order[self._offsets[i]:self._offsets[i + 1]]
+
+    def frame(self, country):
+        """The bookings for ``country`` only."""
+        return self.df.iloc[self.rows(country)]
+
+    def frames(self, countries, columns=None):
+        """The bookings for several countries (e.g. a top-N), in their original order.
+
+        Only the selected rows, and only ``columns`` if given, are gathered.
+        """
+        positions = [self.rows(country) for country in countries if country in self]
+        positions = np.sort(np.concatenate(positions)) if positions else np.empty(0, dtype=np.intp)
+        if columns is None:
+            return self.df.iloc[positions]
+        columns = list(columns)
+        indexer = self.df.columns.get_indexer(columns)
+        if (indexer < 0).any():
+            raise KeyError(f'{[c for c, i in zip(columns, indexer) if i < 0]} not in the bookings columns')
+        # Rows and columns in one take, so columns are never copied for the unselected rows
+        return self.df.iloc[positions, indexer]
+
+    def stats(self, country):
+        """Cached summary row for ``country`` as a Series."""
+        return self.summary.iloc[self._positions[country]]
@@ -1,9 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import os
 import plotly.express as px
 import plotly.graph_objects as go
 import warnings
+import agg_engine
+import booking_store
+import country_index
+import dataset_profile
+import derived_columns
+import instrumentation
+import live_ingest
+import metrics
+import quantile_sketch
+import query_backend
+import ranking
+import shared_dataset
+from query_backend import AggSpec, summary_spec
 warnings.filterwarnings('ignore')
 
 # Set page configuration
@@ -13,6 +27,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+instrumentation.start_run('dashboard')
+metrics.start_server('dashboard')
 
 # Custom CSS for a professional dark theme
 st.markdown("""
@@ -114,32 +130,134 @@ st.markdown("""
 # Title
 st.markdown('<p class="main-header">🏨 Hotel Booking Analytics Dashboard</p>', unsafe_allow_html=True)
 st.markdown("Check out the [Forecasting App](https://prohotelytics.streamlit.app/)")
-# Define a single function to load the data from a static file
-@st.cache_data
-def load_data():
-    # Load the data from the local file system
-    df = pd.read_csv('hotel_bookings.csv')
-    
-    # Data preprocessing steps
-    for col in ['children', 'adults', 'babies']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    if all(col in df.columns for col in ['adults', 'children', 'babies']):
-        df['total people'] = df['adults'] + df['children'] + df['babies']
-    
-    if all(col in df.columns for col in ['stays_in_weekend_nights', 'stays_in_week_nights']):
-        df['total stayed'] = df['stays_in_weekend_nights'] + df['stays_in_week_nights']
-        
-    if 'reservation_status_date' in df.columns:
-        df['reservation_status_date'] = pd.to_datetime(df['reservation_status_date'], errors='coerce')
-    if 'arrival_date' in df.columns:
-        df['arrival_date'] = pd.to_datetime(df['arrival_date'], errors='coerce')
-    
-    return df
+# Publish the partitioned store to shared memory once per host; sessions attach to it read-only
+@instrumentation.timed()
+@metrics.track_cache('load_shared_dataset', st.cache_resource(max_entries=1))
+def load_shared_dataset(source_version):
+    # `source_version` keys the cache, so a changed CSV or rebuilt store is republished without a restart
+    with metrics.DATASET_LOAD_SECONDS.labels(stage='publish').time():
+        root = booking_store.ensure_store(booking_store.CSV_PATH, booking_store.STORE_DIR)
+        return shared_dataset.publish(root)
+
+def dataset_source_version():
+    paths = [booking_store.CSV_PATH, os.path.join(booking_store.STORE_DIR, booking_store.MARKER_FILE)]
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in paths)
+
+@instrumentation.timed()
+@metrics.track_cache('load_partition_index', st.cache_data)
+def load_partition_index(version_dir):
+    return shared_dataset.list_partitions(version_dir)
+
+# Frames and everything built on them, per selection; bounded by the memory of private (non-mapped) copies
+SELECTION_CACHE = shared_dataset.SelectionCache(
+    int(os.environ.get('DASHBOARD_SELECTION_CACHE_MB', '512')) * 1024 * 1024
+)
+
+@instrumentation.timed()
+@metrics.track_cache('load_data', SELECTION_CACHE('load_data'))
+def load_data(version_dir, hotels, years):
+    # Attach only the (hotel, year) partitions matching the current filter selection.
+    # Every session gets the same frame instead of a pickled copy each.
+    with metrics.DATASET_LOAD_SECONDS.labels(stage='attach').time():
+        return shared_dataset.attach(version_dir, list(hotels), list(years))
+
+@instrumentation.timed()
+@metrics.track_cache('load_agg_engine', SELECTION_CACHE('load_agg_engine'))
+def load_agg_engine(version_dir, hotels, years):
+    # Factorizes the categorical columns once per selection; builder results are cached inside
+    return agg_engine.AggregationEngine(load_data(version_dir, hotels, years))
+
+@instrumentation.timed()
+@metrics.track_cache('load_country_index', SELECTION_CACHE('load_country_index'))
+def load_country_index(version_dir, hotels, years):
+    # Per-country row offsets and summary rows, reusing the engine's country codes
+    engine = load_agg_engine(version_dir, hotels, years)
+    return country_index.CountryIndex(engine.df, codes=engine.codes('country'))
+
+@instrumentation.timed()
+@metrics.track_cache('load_derived_column', SELECTION_CACHE('load_derived_column'))
+def load_derived_column(version_dir, hotels, years, name):
+    # Lazy derived columns (see derived_columns) are computed once per selection and shared
+    return derived_columns.compute(load_data(version_dir, hotels, years), name)
+
+@instrumentation.timed()
+@metrics.track_cache('load_profile', st.cache_resource(max_entries=32))
+def load_profile(version_dir, hotels, years):
+    # Merge the per-partition profiles computed at ingest; no booking rows are scanned
+    partitions = booking_store.select_partitions(shared_dataset.list_partitions(version_dir), list(hotels), list(years))
+    return dataset_profile.load_profile(partitions)
+
+@instrumentation.timed()
+@metrics.track_cache('load_sketch_index', SELECTION_CACHE('load_sketch_index'))
+def load_sketch_index(version_dir, hotels, years):
+    # Quantile sketches per numeric column, built once per selection
+    return quantile_sketch.SketchIndex(load_data(version_dir, hotels, years))
+
+class CachedSelection:
+    """Views of a static (hotel, year) selection, cached and shared across sessions."""
+
+    def __init__(self, key):
+        self.key = key
+
+    @property
+    def frame(self):
+        return load_data(*self.key)
+
+    def profile(self):
+        return load_profile(*self.key)
+
+    def sketch_index(self):
+        return load_sketch_index(*self.key)
+
+    def agg_engine(self):
+        return load_agg_engine(*self.key)
+
+    def country_index(self):
+        return load_country_index(*self.key)
+
+    def derived_column(self, name):
+        return load_derived_column(*self.key, name)
+
+@metrics.track_cache('load_live_bookings', st.cache_resource(max_entries=8))
+def load_live_bookings(version_dir, hotels, years):
+    # One live view per selection, shared by every session; records are folded in as they arrive
+    return live_ingest.LiveBookings(
+        load_data(version_dir, hotels, years), load_profile(version_dir, hotels, years), hotels, years
+    )
+
+@st.fragment(run_every=live_ingest.POLL_SECONDS)
+def poll_live_bookings(live):
+    # Runs on a timer; a full rerun is only triggered when new records have arrived
+    if live.poll() or live.seq != st.session_state.get('live_seq'):
+        st.rerun()
+    st.caption(f"🟢 Live: {live.live_rows:,} new records")
+
+def sketch_box_figure(sketches, title, x_label=None, y_label=None):
+    # Box plot drawn from precomputed sketch quartiles instead of shipping every row to the browser
+    stats = [sketch.box_stats() for sketch in sketches.values()]
+    fig = go.Figure(go.Box(
+        x=[str(label) for label in sketches] if x_label else None,
+        q1=[s['q1'] for s in stats],
+        median=[s['median'] for s in stats],
+        q3=[s['q3'] for s in stats],
+        lowerfence=[s['lowerfence'] for s in stats],
+        upperfence=[s['upperfence'] for s in stats],
+        showlegend=False
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+@st.cache_resource
+def get_query_backend():
+    # One shared engine per process; DuckDB when installed, pandas otherwise
+    return query_backend.get_backend()
 
 try:
-    data = load_data()
+    version_dir = load_shared_dataset(dataset_source_version())
+    partitions = load_partition_index(version_dir)
+    query = instrumentation.Traced(
+        get_query_backend(), ['aggregate'], label=lambda df, spec: f"aggregate by {', '.join(spec.by)}"
+    )
     
     # Sidebar for navigation and filters
     st.sidebar.title("🎛️ Dashboard Controls")
@@ -155,31 +273,48 @@ try:
     st.sidebar.subheader("🔍 Global Filters")
     
     # Hotel filter
-    if 'hotel' in data.columns:
-        selected_hotels = st.sidebar.multiselect(
-            "Select Hotels",
-            data['hotel'].unique(),
-            default=list(data['hotel'].unique())
-        )
-    else:
-        selected_hotels = []
+    hotel_options = list(partitions['hotel'].unique())
+    selected_hotels = st.sidebar.multiselect(
+        "Select Hotels",
+        hotel_options,
+        default=hotel_options
+    )
         
     # Year filter
-    if 'arrival_date_year' in data.columns:
-        selected_years = st.sidebar.multiselect(
-            "Select Years",
-            sorted(data['arrival_date_year'].unique()),
-            default=sorted(data['arrival_date_year'].unique())
-        )
-    else:
-        selected_years = []
+    year_options = sorted(partitions['arrival_date_year'].unique())
+    selected_years = st.sidebar.multiselect(
+        "Select Years",
+        year_options,
+        default=year_options
+    )
+        
+    # Medians, percentiles and box plots come from quantile sketches unless exact mode is on
+    exact_stats = st.sidebar.checkbox(
+        "Exact statistics",
+        value=False,
+        help="Compute medians, percentiles and box plots from every row instead of quantile sketches (about 1% rank error)"
+    )
         
-    # Filter data based on selections
-    filtered_data = data.copy()
-    if selected_hotels and 'hotel' in data.columns:
-        filtered_data = filtered_data[filtered_data['hotel'].isin(selected_hotels)]
-    if selected_years and 'arrival_date_year' in data.columns:
-        filtered_data = filtered_data[filtered_data['arrival_date_year'].isin(selected_years)]
+    # Fold in bookings appended to the live drop directory since the store was built
+    live_mode = st.sidebar.checkbox(
+        "Live mode",
+        value=False,
+        help=f"Pick up new booking records from '{live_ingest.LIVE_DIR}' every {live_ingest.POLL_SECONDS:g} seconds"
+    )
+        
+    # Load only the partitions matching the selections
+    selection_key = (version_dir, tuple(sorted(selected_hotels)), tuple(sorted(selected_years)))
+    if live_mode:
+        selection = load_live_bookings(*selection_key)
+        with instrumentation.span('live poll', 'load') as record:
+            record['records'] = selection.poll()
+        st.session_state['live_seq'] = selection.seq
+        with st.sidebar:
+            poll_live_bookings(selection)
+    else:
+        selection = CachedSelection(selection_key)
+    filtered_data = selection.frame
+    metrics.record_rerun('dashboard', rows=len(filtered_data))
         
     if filtered_data.empty:
         st.warning("No data found for the selected filters. Please adjust your selections.")
@@ -192,28 +327,29 @@ try:
             st.markdown("---")
             
             st.subheader("Key Performance Indicators")
+            profile = selection.profile()
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric("Total Bookings", f"{len(filtered_data):,}")
+                st.metric("Total Bookings", f"{profile.rows:,}")
             
             with col2:
-                if 'is_canceled' in filtered_data.columns:
-                    cancellation_rate = (filtered_data['is_canceled'].sum() / len(filtered_data)) * 100
+                if 'is_canceled' in profile.sketches:
+                    cancellation_rate = profile.rate('is_canceled') * 100
                     st.metric("Cancellation Rate", f"{cancellation_rate:.1f}%")
                 else:
                     st.metric("Cancellation Rate", "N/A")
             
             with col3:
-                if 'adr' in filtered_data.columns:
-                    avg_adr = filtered_data['adr'].mean()
+                if 'adr' in profile.sketches:
+                    avg_adr = profile.mean('adr')
                     st.metric("Average ADR", f"${avg_adr:.2f}")
                 else:
                     st.metric("Average ADR", "N/A")
             
             with col4:
-                if 'lead_time' in filtered_data.columns:
-                    avg_lead_time = filtered_data['lead_time'].mean()
+                if 'lead_time' in profile.sketches:
+                    avg_lead_time = profile.mean('lead_time')
                     st.metric("Avg Lead Time", f"{avg_lead_time:.0f} days")
                 else:
                     st.metric("Avg Lead Time", "N/A")
@@ -227,12 +363,12 @@ try:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.write("**Dataset Shape:**", filtered_data.shape)
-                    st.write("**Columns:**", len(filtered_data.columns))
+                    st.write("**Dataset Shape:**", (profile.rows, len(profile.columns)))
+                    st.write("**Columns:**", len(profile.columns))
                     
                     # Missing values
                     st.write("**Missing Values:**")
-                    missing_vals = filtered_data.isnull().sum()
+                    missing_vals = profile.null_counts
                     if missing_vals.sum() == 0:
                         st.success("No missing values found! ✅")
                     else:
@@ -240,24 +376,27 @@ try:
                             missing_df = pd.DataFrame({
                                 'Column': missing_vals.index,
                                 'Missing Count': missing_vals.values,
-                                'Missing %': (missing_vals.values / len(filtered_data) * 100).round(2)
+                                'Missing %': (missing_vals.values / profile.rows * 100).round(2)
                             })
                             st.dataframe(missing_df[missing_df['Missing Count'] > 0], use_container_width=True)
                 
                 with col2:
                     st.write("**Data Types:**")
                     dtypes_df = pd.DataFrame({
-                        'Column': filtered_data.dtypes.index,
-                        'Data Type': filtered_data.dtypes.values
+                        'Column': profile.dtypes.index,
+                        'Data Type': profile.dtypes.values
                     })
                     st.dataframe(dtypes_df.head(15), use_container_width=True)
             
             # Quick statistics for numerical columns
             st.subheader("📊 Numerical Columns Statistics")
             with st.container(border=True):
-                numeric_cols = filtered_data.select_dtypes(include=[np.number]).columns
+                numeric_cols = profile.numeric_columns
                 if len(numeric_cols) > 0:
-                    st.dataframe(filtered_data[numeric_cols].describe(), use_container_width=True)
+                    if exact_stats:
+                        st.dataframe(filtered_data[numeric_cols].describe(), use_container_width=True)
+                    else:
+                        st.dataframe(profile.describe(), use_container_width=True)
                 else:
                     st.info("No numerical columns found in the dataset.")
             
@@ -286,14 +425,18 @@ try:
                             title='Lead Time Distribution',
                             labels={'lead_time': 'Lead Time (days)', 'count': 'Frequency'}
                         )
-                        st.plotly_chart(fig1, use_container_width=True)
+                        instrumentation.plotly_chart(fig1, use_container_width=True)
                     with col2:
-                        fig1b = px.box(
-                            filtered_data,
-                            y='lead_time',
-                            title='Lead Time Box Plot'
-                        )
-                        st.plotly_chart(fig1b, use_container_width=True)
+                        if exact_stats:
+                            fig1b = px.box(
+                                filtered_data,
+                                y='lead_time',
+                                title='Lead Time Box Plot'
+                            )
+                        else:
+                            sketches = selection.sketch_index().columns
+                            fig1b = sketch_box_figure({'lead_time': sketches['lead_time']}, 'Lead Time Box Plot', y_label='lead_time')
+                        instrumentation.plotly_chart(fig1b, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -306,14 +449,18 @@ try:
                             title='Average Daily Rate (ADR) Distribution',
                             labels={'adr': 'ADR ($)', 'count': 'Frequency'}
                         )
-                        st.plotly_chart(fig2, use_container_width=True)
+                        instrumentation.plotly_chart(fig2, use_container_width=True)
                     with col2:
-                        fig2b = px.box(
-                            filtered_data,
-                            y='adr',
-                            title='ADR Box Plot'
-                        )
-                        st.plotly_chart(fig2b, use_container_width=True)
+                        if exact_stats:
+                            fig2b = px.box(
+                                filtered_data,
+                                y='adr',
+                                title='ADR Box Plot'
+                            )
+                        else:
+                            sketches = selection.sketch_index().columns
+                            fig2b = sketch_box_figure({'adr': sketches['adr']}, 'ADR Box Plot', y_label='adr')
+                        instrumentation.plotly_chart(fig2b, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -324,7 +471,7 @@ try:
                             x='total people',
                             title='Total People per Booking Distribution'
                         )
-                        st.plotly_chart(fig3, use_container_width=True)
+                        instrumentation.plotly_chart(fig3, use_container_width=True)
                 
                 if 'total stayed' in filtered_data.columns:
                     with col2:
@@ -334,7 +481,7 @@ try:
                             title='Total Stay Duration Distribution',
                             labels={'total stayed': 'Total Nights Stayed'}
                         )
-                        st.plotly_chart(fig4, use_container_width=True)
+                        instrumentation.plotly_chart(fig4, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -345,7 +492,7 @@ try:
                             x='stays_in_weekend_nights',
                             title='Weekend Nights Distribution'
                         )
-                        st.plotly_chart(fig5, use_container_width=True)
+                        instrumentation.plotly_chart(fig5, use_container_width=True)
                 
                 if 'stays_in_week_nights' in filtered_data.columns:
                     with col2:
@@ -354,7 +501,7 @@ try:
                             x='stays_in_week_nights',
                             title='Week Nights Distribution'
                         )
-                        st.plotly_chart(fig6, use_container_width=True)
+                        instrumentation.plotly_chart(fig6, use_container_width=True)
             
             with tab2:
                 st.subheader("Categorical Variable Distributions")
@@ -369,7 +516,7 @@ try:
                             names=hotel_counts.index,
                             title='Hotel Type Distribution'
                         )
-                        st.plotly_chart(fig7, use_container_width=True)
+                        instrumentation.plotly_chart(fig7, use_container_width=True)
                 
                 if 'is_canceled' in filtered_data.columns:
                     with col2:
@@ -379,7 +526,7 @@ try:
                             names=['Not Canceled', 'Canceled'],
                             title='Booking Cancellation Distribution'
                         )
-                        st.plotly_chart(fig8, use_container_width=True)
+                        instrumentation.plotly_chart(fig8, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -392,7 +539,7 @@ try:
                             orientation='h',
                             title='Market Segment Distribution'
                         )
-                        st.plotly_chart(fig9, use_container_width=True)
+                        instrumentation.plotly_chart(fig9, use_container_width=True)
                 
                 if 'customer_type' in filtered_data.columns:
                     with col2:
@@ -403,7 +550,7 @@ try:
                             title='Customer Type Distribution'
                         )
                         fig10.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig10, use_container_width=True)
+                        instrumentation.plotly_chart(fig10, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -415,7 +562,7 @@ try:
                             names=meal_counts.index,
                             title='Meal Preference Distribution'
                         )
-                        st.plotly_chart(fig11, use_container_width=True)
+                        instrumentation.plotly_chart(fig11, use_container_width=True)
                 
                 if 'distribution_channel' in filtered_data.columns:
                     with col2:
@@ -426,7 +573,7 @@ try:
                             title='Distribution Channel Usage'
                         )
                         fig12.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig12, use_container_width=True)
+                        instrumentation.plotly_chart(fig12, use_container_width=True)
             
             with tab3:
                 st.subheader("Key Metrics and Insights")
@@ -440,7 +587,7 @@ try:
                         st.metric("Most Popular Hotel", most_popular_hotel, f"{hotel_percentage:.1f}% of bookings")
                     
                     if 'total_of_special_requests' in filtered_data.columns:
-                        avg_special_requests = filtered_data['total_of_special_requests'].mean()
+                        avg_special_requests = selection.profile().mean('total_of_special_requests')
                         st.metric("Avg Special Requests", f"{avg_special_requests:.2f}", "per booking")
                 
                 with metrics_col2:
@@ -450,16 +597,16 @@ try:
                         st.metric("Peak Month", most_popular_month, f"{month_percentage:.1f}% of arrivals")
                     
                     if 'is_repeated_guest' in filtered_data.columns:
-                        repeat_rate = (filtered_data['is_repeated_guest'].sum()/len(filtered_data)*100)
+                        repeat_rate = selection.profile().rate('is_repeated_guest') * 100
                         st.metric("Repeat Guest Rate", f"{repeat_rate:.1f}%", "returning customers")
                 
                 with metrics_col3:
                     if 'adults' in filtered_data.columns:
-                        avg_adults = filtered_data['adults'].mean()
+                        avg_adults = selection.profile().mean('adults')
                         st.metric("Avg Adults per Booking", f"{avg_adults:.1f}", "adults")
                     
                     if 'required_car_parking_spaces' in filtered_data.columns:
-                        parking_rate = (filtered_data['required_car_parking_spaces'].sum()/len(filtered_data)*100)
+                        parking_rate = selection.profile().rate('required_car_parking_spaces') * 100
                         st.metric("Parking Request Rate", f"{parking_rate:.1f}%", "need parking")
         
         # Bivariate Analysis Page
@@ -482,7 +629,7 @@ try:
                         aspect='auto'
                     )
                     fig_corr.update_layout(height=600)
-                    st.plotly_chart(fig_corr, use_container_width=True)
+                    instrumentation.plotly_chart(fig_corr, use_container_width=True)
                     
                     st.subheader("Strongest Correlations")
                     corr_pairs = []
@@ -515,7 +662,7 @@ try:
                             title='ADR vs Lead Time',
                             opacity=0.6
                         )
-                        st.plotly_chart(fig1, use_container_width=True)
+                        instrumentation.plotly_chart(fig1, use_container_width=True)
                 
                 if 'adr' in filtered_data.columns and 'total stayed' in filtered_data.columns:
                     with col2:
@@ -526,26 +673,17 @@ try:
                             title='ADR vs Total Stayed',
                             opacity=0.6
                         )
-                        st.plotly_chart(fig2, use_container_width=True)
+                        instrumentation.plotly_chart(fig2, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
                 if 'is_canceled' in filtered_data.columns and 'lead_time' in filtered_data.columns:
                     with col1:
-                        filtered_data_copy = filtered_data.copy()
                         # Calculate bins dynamically to handle data variations
-                        bins_count = min(10, len(filtered_data_copy['lead_time'].unique()))
+                        bins_count = min(10, filtered_data['lead_time'].nunique())
                         if bins_count > 1:
-                            bins = pd.cut(filtered_data_copy['lead_time'], bins=bins_count, retbins=True, labels=False, duplicates='drop')[1]
-                            labels = [f'{int(bins[i])}-{int(bins[i+1])}' for i in range(len(bins)-1)]
-                            filtered_data_copy['lead_time_bin'] = pd.cut(
-                                filtered_data_copy['lead_time'],
-                                bins=bins,
-                                labels=labels,
-                                right=False,
-                                include_lowest=True
-                            )
-                            cancel_by_leadtime = filtered_data_copy.groupby('lead_time_bin')['is_canceled'].mean().reset_index()
+                            lead_time_bin = selection.derived_column('lead_time_bin')
+                            cancel_by_leadtime = filtered_data['is_canceled'].groupby(lead_time_bin).mean().reset_index()
                             
                             fig3 = px.bar(
                                 cancel_by_leadtime,
@@ -555,7 +693,7 @@ try:
                             )
                             fig3.update_xaxes(tickangle=45)
                             fig3.update_yaxes(tickformat=".0%")
-                            st.plotly_chart(fig3, use_container_width=True)
+                            instrumentation.plotly_chart(fig3, use_container_width=True)
                         else:
                             st.info("Not enough unique values in 'lead_time' to create bins.")
 
@@ -570,29 +708,46 @@ try:
                             title='Reservation Status by Hotel Type',
                             barmode='group'
                         )
-                        st.plotly_chart(fig4, use_container_width=True)
+                        instrumentation.plotly_chart(fig4, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
 
                 if 'booking_changes' in filtered_data.columns and 'adr' in filtered_data.columns:
                     with col1:
-                        fig5 = px.box(
-                            filtered_data,
-                            x='booking_changes',
-                            y='adr',
-                            title='ADR Distribution by Number of Booking Changes'
-                        )
-                        st.plotly_chart(fig5, use_container_width=True)
+                        if exact_stats:
+                            fig5 = px.box(
+                                filtered_data,
+                                x='booking_changes',
+                                y='adr',
+                                title='ADR Distribution by Number of Booking Changes'
+                            )
+                        else:
+                            fig5 = sketch_box_figure(
+                                selection.sketch_index().group_sketches('booking_changes', 'adr'),
+                                'ADR Distribution by Number of Booking Changes',
+                                x_label='booking_changes',
+                                y_label='adr'
+                            )
+                        instrumentation.plotly_chart(fig5, use_container_width=True)
                 
                 if 'total stayed' in filtered_data.columns and 'total_of_special_requests' in filtered_data.columns:
                     with col2:
+                        if exact_stats:
+                            violin_data = filtered_data
+                        else:
+                            # A fixed grid of sketch quantiles per group stands in for the raw rows
+                            quantile_grid = np.linspace(0, 1, 201)
+                            violin_data = pd.concat([
+                                pd.DataFrame({'total_of_special_requests': group, 'total stayed': sketch.quantiles(quantile_grid)})
+                                for group, sketch in selection.sketch_index().group_sketches('total_of_special_requests', 'total stayed').items()
+                            ], ignore_index=True)
                         fig6 = px.violin(
-                            filtered_data,
+                            violin_data,
                             x='total_of_special_requests',
                             y='total stayed',
                             title='Stay Duration vs Special Requests'
                         )
-                        st.plotly_chart(fig6, use_container_width=True)
+                        instrumentation.plotly_chart(fig6, use_container_width=True)
             
             with tab3:
                 st.subheader("Comparative Analysis")
@@ -627,7 +782,7 @@ try:
                             opacity=0.6
                         )
                     
-                    st.plotly_chart(fig_interactive, use_container_width=True)
+                    instrumentation.plotly_chart(fig_interactive, use_container_width=True)
         
         # Time Series Analysis Page
         elif page == "📅 Time Series":
@@ -653,7 +808,7 @@ try:
                             title='Monthly Booking Volume'
                         )
                         fig1.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig1, use_container_width=True)
+                        instrumentation.plotly_chart(fig1, use_container_width=True)
                     with col2:
                         fig2 = px.line(
                             monthly_bookings,
@@ -662,7 +817,7 @@ try:
                             title='Monthly Booking Trend Line'
                         )
                         fig2.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig2, use_container_width=True)
+                        instrumentation.plotly_chart(fig2, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
 
@@ -677,7 +832,7 @@ try:
                             title='Average ADR Trend by Month'
                         )
                         fig3.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig3, use_container_width=True)
+                        instrumentation.plotly_chart(fig3, use_container_width=True)
                 
                 if 'is_canceled' in filtered_data.columns and 'arrival_date_month' in filtered_data.columns:
                     with col2:
@@ -690,7 +845,7 @@ try:
                         )
                         fig4.update_xaxes(tickangle=45)
                         fig4.update_yaxes(tickformat='.2%')
-                        st.plotly_chart(fig4, use_container_width=True)
+                        instrumentation.plotly_chart(fig4, use_container_width=True)
             
             with tab2:
                 st.subheader("Seasonal Patterns")
@@ -706,7 +861,7 @@ try:
                             y='bookings',
                             title='Bookings by Week Number'
                         )
-                        st.plotly_chart(fig5, use_container_width=True)
+                        instrumentation.plotly_chart(fig5, use_container_width=True)
                 
                 if 'arrival_date_day_of_month' in filtered_data.columns:
                     with col2:
@@ -717,7 +872,7 @@ try:
                             y='bookings',
                             title='Bookings by Day of Month'
                         )
-                        st.plotly_chart(fig6, use_container_width=True)
+                        instrumentation.plotly_chart(fig6, use_container_width=True)
                 
                 if 'arrival_date_year' in filtered_data.columns and 'arrival_date_month' in filtered_data.columns:
                     yearly_monthly = filtered_data.groupby(['arrival_date_year', 'arrival_date_month']).size().reset_index(name='bookings')
@@ -735,7 +890,7 @@ try:
                         title='Monthly Bookings Comparison Across Years'
                     )
                     fig7.update_xaxes(tickangle=45)
-                    st.plotly_chart(fig7, use_container_width=True)
+                    instrumentation.plotly_chart(fig7, use_container_width=True)
             
             with tab3:
                 st.subheader("Time-based Insights")
@@ -754,7 +909,7 @@ try:
                             title='Average Stay Duration by Month'
                         )
                         fig8.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig8, use_container_width=True)
+                        instrumentation.plotly_chart(fig8, use_container_width=True)
                 
                 if 'lead_time' in filtered_data.columns and 'arrival_date_month' in filtered_data.columns:
                     with col2:
@@ -768,7 +923,7 @@ try:
                             title='Average Lead Time by Month'
                         )
                         fig9.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig9, use_container_width=True)
+                        instrumentation.plotly_chart(fig9, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
@@ -782,13 +937,16 @@ try:
                             names=['Weekend Nights', 'Weekday Nights'],
                             title='Total Weekend vs Weekday Nights Distribution'
                         )
-                        st.plotly_chart(fig10, use_container_width=True)
+                        instrumentation.plotly_chart(fig10, use_container_width=True)
                     
                     with col2:
-                        monthly_nights = filtered_data.groupby('arrival_date_month').agg(
-                            stays_in_weekend_nights=('stays_in_weekend_nights', 'sum'),
-                            stays_in_week_nights=('stays_in_week_nights', 'sum')
-                        ).reindex(month_order).reset_index().fillna(0)
+                        monthly_nights = query.aggregate(filtered_data, AggSpec(
+                            by=('arrival_date_month',),
+                            measures=(
+                                ('stays_in_weekend_nights', 'stays_in_weekend_nights', 'sum'),
+                                ('stays_in_week_nights', 'stays_in_week_nights', 'sum'),
+                            )
+                        )).set_index('arrival_date_month').reindex(month_order).reset_index().fillna(0)
                         
                         fig11 = go.Figure()
                         fig11.add_trace(go.Bar(
@@ -808,18 +966,12 @@ try:
                             barmode='stack',
                             xaxis_tickangle=45
                         )
-                        st.plotly_chart(fig11, use_container_width=True)
+                        instrumentation.plotly_chart(fig11, use_container_width=True)
                 
                 st.subheader("📈 Time-based Summary Statistics")
                 
                 if 'arrival_date_month' in filtered_data.columns:
-                    month_stats = filtered_data.groupby('arrival_date_month').agg(
-                        Total_Bookings=('hotel', 'count'),
-                        Cancellation_Rate=('is_canceled', 'mean') if 'is_canceled' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_ADR=('adr', 'mean') if 'adr' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Lead_Time=('lead_time', 'mean') if 'lead_time' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Stay_Duration=('total stayed', 'mean') if 'total stayed' in filtered_data.columns else ('hotel', 'count')
-                    ).reset_index()
+                    month_stats = query.aggregate(filtered_data, summary_spec('arrival_date_month', filtered_data.columns))
                     
                     month_order_dict = {
                         'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
@@ -842,7 +994,7 @@ try:
                 st.subheader("Country-wise Booking Analysis")
                 
                 if 'country' in filtered_data.columns:
-                    top_countries = filtered_data['country'].value_counts().head(15)
+                    top_countries = ranking.top_counts(*selection.agg_engine().codes('country'), 15, index_name='country')
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -853,22 +1005,24 @@ try:
                             title='Top 15 Countries by Booking Volume',
                             labels={'x': 'Number of Bookings', 'y': 'Country'}
                         )
-                        st.plotly_chart(fig1, use_container_width=True)
+                        instrumentation.plotly_chart(fig1, use_container_width=True)
                     with col2:
                         fig2 = px.pie(
                             values=top_countries.head(10).values,
                             names=top_countries.head(10).index,
                             title='Top 10 Countries Distribution'
                         )
-                        st.plotly_chart(fig2, use_container_width=True)
+                        instrumentation.plotly_chart(fig2, use_container_width=True)
                     
                     col1, col2 = st.columns(2)
                     
                     if 'adr' in filtered_data.columns:
                         with col1:
-                            country_adr = filtered_data.groupby('country')['adr'].agg(['mean', 'count']).reset_index()
-                            country_adr = country_adr[country_adr['count'] >= 50]
-                            country_adr = country_adr.sort_values('mean', ascending=False).head(15)
+                            country_adr = query.aggregate(filtered_data, AggSpec(
+                                by=('country',),
+                                measures=(('mean', 'adr', 'mean'), ('count', 'adr', 'count'))
+                            ))
+                            country_adr = ranking.top_rows(country_adr, 'mean', 15, min_count=50)
                             
                             fig3 = px.bar(
                                 country_adr,
@@ -878,16 +1032,15 @@ try:
                                 title='Average ADR by Country (min 50 bookings)',
                                 labels={'mean': 'Average ADR ($)', 'country': 'Country'}
                             )
-                            st.plotly_chart(fig3, use_container_width=True)
+                            instrumentation.plotly_chart(fig3, use_container_width=True)
                     
                     if 'is_canceled' in filtered_data.columns:
                         with col2:
-                            country_cancel = filtered_data.groupby('country').agg(
-                                cancel_rate=('is_canceled', 'mean'),
-                                count=('is_canceled', 'count')
-                            ).reset_index()
-                            country_cancel = country_cancel[country_cancel['count'] >= 50]
-                            country_cancel = country_cancel.sort_values('cancel_rate', ascending=False).head(15)
+                            country_cancel = query.aggregate(filtered_data, AggSpec(
+                                by=('country',),
+                                measures=(('cancel_rate', 'is_canceled', 'mean'), ('count', 'is_canceled', 'count'))
+                            ))
+                            country_cancel = ranking.top_rows(country_cancel, 'cancel_rate', 15, min_count=50)
                             
                             fig4 = px.bar(
                                 country_cancel,
@@ -898,14 +1051,17 @@ try:
                                 labels={'cancel_rate': 'Cancellation Rate', 'country': 'Country'}
                             )
                             fig4.update_xaxes(tickformat='.2%')
-                            st.plotly_chart(fig4, use_container_width=True)
+                            instrumentation.plotly_chart(fig4, use_container_width=True)
             
             with tab2:
                 st.subheader("Regional Booking Patterns")
                 
                 if 'country' in filtered_data.columns and 'arrival_date_month' in filtered_data.columns:
-                    top_5_countries = filtered_data['country'].value_counts().head(5).index
-                    top_countries_data = filtered_data[filtered_data['country'].isin(top_5_countries)]
+                    top_5_countries = ranking.top_counts(*selection.agg_engine().codes('country'), 5, index_name='country').index
+                    # Gather only the top countries' rows from the country index instead of masking the full frame
+                    top_countries_data = selection.country_index().frames(
+                        top_5_countries, columns=['arrival_date_month', 'country']
+                    )
                     
                     monthly_country = top_countries_data.groupby(['arrival_date_month', 'country']).size().reset_index(name='bookings')
                     month_order_dict = {month: i for i, month in enumerate(['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'])}
@@ -920,18 +1076,17 @@ try:
                         title='Monthly Booking Trends - Top 5 Countries'
                     )
                     fig5.update_xaxes(tickangle=45)
-                    st.plotly_chart(fig5, use_container_width=True)
+                    instrumentation.plotly_chart(fig5, use_container_width=True)
                 
                 col1, col2 = st.columns(2)
                 
                 if 'lead_time' in filtered_data.columns and 'country' in filtered_data.columns:
                     with col1:
-                        country_leadtime = filtered_data.groupby('country').agg(
-                            avg_lead_time=('lead_time', 'mean'),
-                            count=('lead_time', 'count')
-                        ).reset_index()
-                        country_leadtime = country_leadtime[country_leadtime['count'] >= 50]
-                        country_leadtime = country_leadtime.sort_values('avg_lead_time', ascending=False).head(15)
+                        country_leadtime = query.aggregate(filtered_data, AggSpec(
+                            by=('country',),
+                            measures=(('avg_lead_time', 'lead_time', 'mean'), ('count', 'lead_time', 'count'))
+                        ))
+                        country_leadtime = ranking.top_rows(country_leadtime, 'avg_lead_time', 15, min_count=50)
                         
                         fig6 = px.bar(
                             country_leadtime,
@@ -941,16 +1096,15 @@ try:
                             title='Average Lead Time by Country (min 50 bookings)',
                             labels={'avg_lead_time': 'Average Lead Time (days)', 'country': 'Country'}
                         )
-                        st.plotly_chart(fig6, use_container_width=True)
+                        instrumentation.plotly_chart(fig6, use_container_width=True)
                 
                 if 'total stayed' in filtered_data.columns and 'country' in filtered_data.columns:
                     with col2:
-                        country_stay = filtered_data.groupby('country').agg(
-                            avg_stay=('total stayed', 'mean'),
-                            count=('total stayed', 'count')
-                        ).reset_index()
-                        country_stay = country_stay[country_stay['count'] >= 50]
-                        country_stay = country_stay.sort_values('avg_stay', ascending=False).head(15)
+                        country_stay = query.aggregate(filtered_data, AggSpec(
+                            by=('country',),
+                            measures=(('avg_stay', 'total stayed', 'mean'), ('count', 'total stayed', 'count'))
+                        ))
+                        country_stay = ranking.top_rows(country_stay, 'avg_stay', 15, min_count=50)
                         
                         fig7 = px.bar(
                             country_stay,
@@ -960,50 +1114,45 @@ try:
                             title='Average Stay Duration by Country (min 50 bookings)',
                             labels={'avg_stay': 'Average Stay (nights)', 'country': 'Country'}
                         )
-                        st.plotly_chart(fig7, use_container_width=True)
+                        instrumentation.plotly_chart(fig7, use_container_width=True)
             
             with tab3:
                 st.subheader("Geographic Insights")
                 
                 if 'country' in filtered_data.columns:
-                    country_stats = filtered_data.groupby('country').agg(
-                        Total_Bookings=('hotel', 'count'),
-                        Cancellation_Rate=('is_canceled', 'mean') if 'is_canceled' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_ADR=('adr', 'mean') if 'adr' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Lead_Time=('lead_time', 'mean') if 'lead_time' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Stay_Duration=('total stayed', 'mean') if 'total stayed' in filtered_data.columns else ('hotel', 'count')
-                    ).reset_index()
-                    
-                    country_stats = country_stats[country_stats['Total_Bookings'] >= 20]
-                    country_stats = country_stats.sort_values('Total_Bookings', ascending=False)
+                    countries = selection.country_index()
+                    country_stats = ranking.top_rows(
+                        countries.summary, 'Total_Bookings', 20, min_count=20, count_column='Total_Bookings'
+                    )
                     
                     st.subheader("Country Statistics Summary")
-                    st.dataframe(country_stats.head(20), use_container_width=True)
+                    st.dataframe(country_stats, use_container_width=True)
                     
                     st.subheader("Detailed Country Analysis")
                     selected_country = st.selectbox(
                         "Select a country for detailed analysis:",
-                        country_stats['country'].head(20).tolist() if not country_stats.empty else [],
+                        country_stats['country'].tolist() if not country_stats.empty else [],
                         key="country_select"
                     )
                     
                     if selected_country:
-                        country_data = filtered_data[filtered_data['country'] == selected_country]
+                        # Precomputed summary row for the country; no scan over the selection
+                        country_summary = countries.stats(selected_country)
                         
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Total Bookings", len(country_data))
+                            st.metric("Total Bookings", int(country_summary['Total_Bookings']))
                         with col2:
-                            if 'is_canceled' in country_data.columns:
-                                cancel_rate = (country_data['is_canceled'].mean() * 100)
+                            if 'is_canceled' in filtered_data.columns:
+                                cancel_rate = (country_summary['Cancellation_Rate'] * 100)
                                 st.metric("Cancellation Rate", f"{cancel_rate:.1f}%")
                         with col3:
-                            if 'adr' in country_data.columns:
-                                avg_adr = country_data['adr'].mean()
+                            if 'adr' in filtered_data.columns:
+                                avg_adr = country_summary['Avg_ADR']
                                 st.metric("Average ADR", f"${avg_adr:.2f}")
                         with col4:
-                            if 'lead_time' in country_data.columns:
-                                avg_lead = country_data['lead_time'].mean()
+                            if 'lead_time' in filtered_data.columns:
+                                avg_lead = country_summary['Avg_Lead_Time']
                                 st.metric("Avg Lead Time", f"{avg_lead:.0f} days")
         
         # Advanced Analytics Page
@@ -1016,12 +1165,7 @@ try:
                 st.subheader("Customer Segmentation Analysis")
                 
                 if 'market_segment' in filtered_data.columns:
-                    segment_stats = filtered_data.groupby('market_segment').agg(
-                        Total_Bookings=('hotel', 'count'),
-                        Cancellation_Rate=('is_canceled', 'mean') if 'is_canceled' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_ADR=('adr', 'mean') if 'adr' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Lead_Time=('lead_time', 'mean') if 'lead_time' in filtered_data.columns else ('hotel', 'count')
-                    ).reset_index()
+                    segment_stats = query.aggregate(filtered_data, summary_spec('market_segment', filtered_data.columns, with_stay=False))
                     
                     col1, col2 = st.columns(2)
                     
@@ -1034,7 +1178,7 @@ try:
                                 title='Average ADR by Market Segment'
                             )
                             fig1.update_xaxes(tickangle=45)
-                            st.plotly_chart(fig1, use_container_width=True)
+                            instrumentation.plotly_chart(fig1, use_container_width=True)
                     
                     with col2:
                         if 'Cancellation_Rate' in segment_stats.columns:
@@ -1046,15 +1190,10 @@ try:
                             )
                             fig2.update_xaxes(tickangle=45)
                             fig2.update_yaxes(tickformat='.2%')
-                            st.plotly_chart(fig2, use_container_width=True)
+                            instrumentation.plotly_chart(fig2, use_container_width=True)
                 
                 if 'customer_type' in filtered_data.columns:
-                    customer_stats = filtered_data.groupby('customer_type').agg(
-                        Total_Bookings=('hotel', 'count'),
-                        Cancellation_Rate=('is_canceled', 'mean') if 'is_canceled' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_ADR=('adr', 'mean') if 'adr' in filtered_data.columns else ('hotel', 'count'),
-                        Avg_Lead_Time=('lead_time', 'mean') if 'lead_time' in filtered_data.columns else ('hotel', 'count')
-                    ).reset_index()
+                    customer_stats = query.aggregate(filtered_data, summary_spec('customer_type', filtered_data.columns, with_stay=False))
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -1065,7 +1204,7 @@ try:
                                 y='Avg_Lead_Time',
                                 title='Average Lead Time by Customer Type'
                             )
-                            st.plotly_chart(fig3, use_container_width=True)
+                            instrumentation.plotly_chart(fig3, use_container_width=True)
                     with col2:
                         if 'Total_Bookings' in customer_stats.columns:
                             fig4 = px.pie(
@@ -1074,26 +1213,29 @@ try:
                                 names='customer_type',
                                 title='Booking Distribution by Customer Type'
                             )
-                            st.plotly_chart(fig4, use_container_width=True)
+                            instrumentation.plotly_chart(fig4, use_container_width=True)
             
             with tab2:
                 st.subheader("Revenue Analysis")
                 
                 if 'adr' in filtered_data.columns and 'total stayed' in filtered_data.columns:
-                    filtered_data_copy = filtered_data.copy()
-                    filtered_data_copy['total_revenue'] = filtered_data_copy['adr'] * filtered_data_copy['total stayed']
+                    # total_revenue is materialised at ingest; older stores derive it on the fly
+                    revenue_data = derived_columns.with_columns(filtered_data, ['total_revenue'])
                     
                     if 'hotel' in filtered_data.columns:
                         col1, col2 = st.columns(2)
                         with col1:
-                            revenue_by_hotel = filtered_data_copy.groupby('hotel')['total_revenue'].agg(['sum', 'mean']).reset_index()
+                            revenue_by_hotel = query.aggregate(revenue_data, AggSpec(
+                                by=('hotel',),
+                                measures=(('sum', 'total_revenue', 'sum'), ('mean', 'total_revenue', 'mean'))
+                            ))
                             fig1 = px.bar(
                                 revenue_by_hotel,
                                 x='hotel',
                                 y='sum',
                                 title='Total Revenue by Hotel Type'
                             )
-                            st.plotly_chart(fig1, use_container_width=True)
+                            instrumentation.plotly_chart(fig1, use_container_width=True)
                         with col2:
                             fig2 = px.bar(
                                 revenue_by_hotel,
@@ -1101,12 +1243,12 @@ try:
                                 y='mean',
                                 title='Average Revenue per Booking by Hotel Type'
                             )
-                            st.plotly_chart(fig2, use_container_width=True)
+                            instrumentation.plotly_chart(fig2, use_container_width=True)
                     
                     if 'arrival_date_month' in filtered_data.columns:
                         month_order = ['January', 'February', 'March', 'April', 'May', 'June',
                                        'July', 'August', 'September', 'October', 'November', 'December']
-                        monthly_revenue = filtered_data_copy.groupby('arrival_date_month')['total_revenue'].sum().reindex(month_order).reset_index()
+                        monthly_revenue = revenue_data.groupby('arrival_date_month')['total_revenue'].sum().reindex(month_order).reset_index()
                         
                         fig3 = px.line(
                             monthly_revenue,
@@ -1115,25 +1257,28 @@ try:
                             title='Monthly Revenue Trend'
                         )
                         fig3.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig3, use_container_width=True)
+                        instrumentation.plotly_chart(fig3, use_container_width=True)
                     
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
-                        total_revenue = filtered_data_copy['total_revenue'].sum()
+                        total_revenue = revenue_data['total_revenue'].sum()
                         st.metric("Total Revenue", f"${total_revenue:,.2f}")
                     with col2:
-                        avg_revenue_per_booking = filtered_data_copy['total_revenue'].mean()
+                        avg_revenue_per_booking = revenue_data['total_revenue'].mean()
                         st.metric("Avg Revenue/Booking", f"${avg_revenue_per_booking:.2f}")
                     with col3:
                         if 'is_canceled' in filtered_data.columns:
-                            lost_revenue = filtered_data_copy[filtered_data_copy['is_canceled'] == 1]['total_revenue'].sum()
+                            lost_revenue = revenue_data[revenue_data['is_canceled'] == 1]['total_revenue'].sum()
                             st.metric("Potential Lost Revenue", f"${lost_revenue:,.2f}")
                     with col4:
-                        revenue_per_night = filtered_data_copy['adr'].mean()
+                        revenue_per_night = revenue_data['adr'].mean()
                         st.metric("Avg Revenue/Night", f"${revenue_per_night:.2f}")
 
             with tab3:
                 st.subheader("Custom Analysis Builder")
+                builder_engine = instrumentation.Traced(
+                    selection.agg_engine(), ['aggregate'], label=lambda by, column, func: f"{func}({column}) by {by}"
+                )
                 
                 analysis_type = st.selectbox(
                     "Select Analysis Type",
@@ -1162,7 +1307,7 @@ try:
                                 names=var_counts.index,
                                 title=f'Distribution of {selected_cat_var}'
                             )
-                        st.plotly_chart(fig, use_container_width=True)
+                        instrumentation.plotly_chart(fig, use_container_width=True)
                 
                 elif analysis_type == "Comparison Analysis":
                     col1, col2, col3 = st.columns(3)
@@ -1175,14 +1320,10 @@ try:
                     with col3:
                         agg_function = st.selectbox("Aggregation Function", ["mean", "sum", "median", "count"], key="comp_agg_func")
                     if selected_num_var and selected_group_var:
-                        if agg_function == "mean":
-                            grouped_data = filtered_data.groupby(selected_group_var)[selected_num_var].mean().reset_index()
-                        elif agg_function == "sum":
-                            grouped_data = filtered_data.groupby(selected_group_var)[selected_num_var].sum().reset_index()
-                        elif agg_function == "median":
-                            grouped_data = filtered_data.groupby(selected_group_var)[selected_num_var].median().reset_index()
+                        if agg_function == "median" and not exact_stats:
+                            grouped_data = selection.sketch_index().group_quantile(selected_group_var, selected_num_var, 0.5)
                         else:
-                            grouped_data = filtered_data.groupby(selected_group_var)[selected_num_var].count().reset_index()
+                            grouped_data = builder_engine.aggregate(selected_group_var, selected_num_var, agg_function)
                         fig = px.bar(
                             grouped_data,
                             x=selected_group_var,
@@ -1190,7 +1331,7 @@ try:
                             title=f'{agg_function.title()} of {selected_num_var} by {selected_group_var}'
                         )
                         fig.update_xaxes(tickangle=45)
-                        st.plotly_chart(fig, use_container_width=True)
+                        instrumentation.plotly_chart(fig, use_container_width=True)
                 
                 elif analysis_type == "Trend Analysis":
                     if 'arrival_date_month' in filtered_data.columns:
@@ -1202,12 +1343,9 @@ try:
                             trend_agg = st.selectbox("Aggregation for Trend", ["mean", "sum", "count"], key="trend_agg_func")
                         if selected_trend_var:
                             month_order = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-                            if trend_agg == "mean":
-                                trend_data = filtered_data.groupby('arrival_date_month')[selected_trend_var].mean().reindex(month_order).reset_index()
-                            elif trend_agg == "sum":
-                                trend_data = filtered_data.groupby('arrival_date_month')[selected_trend_var].sum().reindex(month_order).reset_index()
-                            else:
-                                trend_data = filtered_data.groupby('arrival_date_month')[selected_trend_var].count().reindex(month_order).reset_index()
+                            trend_data = builder_engine.aggregate(
+                                'arrival_date_month', selected_trend_var, trend_agg
+                            ).set_index('arrival_date_month').reindex(month_order).reset_index()
                             fig = px.line(
                                 trend_data,
                                 x='arrival_date_month',
@@ -1215,7 +1353,7 @@ try:
                                 title=f'{trend_agg.title()} of {selected_trend_var} Over Months'
                             )
                             fig.update_xaxes(tickangle=45)
-                            st.plotly_chart(fig, use_container_width=True)
+                            instrumentation.plotly_chart(fig, use_container_width=True)
                 
                 st.subheader("📥 Data Export")
                 export_data = st.selectbox(
@@ -1235,7 +1373,10 @@ try:
                         )
                     elif export_data == "Summary Statistics":
                         numeric_cols = filtered_data.select_dtypes(include=[np.number]).columns
-                        summary_stats = filtered_data[numeric_cols].describe()
+                        if exact_stats:
+                            summary_stats = filtered_data[numeric_cols].describe()
+                        else:
+                            summary_stats = selection.profile().describe(list(numeric_cols))
                         csv = summary_stats.to_csv().encode('utf-8')
                         st.download_button(
                             label="Download Summary Statistics as CSV",
@@ -1245,13 +1386,7 @@ try:
                         )
                     elif export_data == "Country Analysis":
                         if 'country' in filtered_data.columns:
-                            country_stats_export = filtered_data.groupby('country').agg(
-                                Total_Bookings=('hotel', 'count'),
-                                Cancellation_Rate=('is_canceled', 'mean') if 'is_canceled' in filtered_data.columns else ('hotel', 'count'),
-                                Avg_ADR=('adr', 'mean') if 'adr' in filtered_data.columns else ('hotel', 'count'),
-                                Avg_Lead_Time=('lead_time', 'mean') if 'lead_time' in filtered_data.columns else ('hotel', 'count'),
-                                Avg_Stay_Duration=('total stayed', 'mean') if 'total stayed' in filtered_data.columns else ('hotel', 'count')
-                            ).reset_index()
+                            country_stats_export = selection.country_index().summary
                             csv = country_stats_export.to_csv(index=False).encode('utf-8')
                             st.download_button(
                                 label="Download Country Analysis as CSV",
@@ -1304,4 +1439,6 @@ st.sidebar.markdown("""
 """)
 
 # Footer
-st.markdown("---")
\ No newline at end of file
+st.markdown("---")
+
+instrumentation.render_panel()
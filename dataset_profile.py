@@ -0,0 +1,131 @@
+"""Per-partition dataset profiles for the Overview page.
+
+A :class:`DatasetProfile` holds everything the Overview page shows about a
+set of bookings as mergeable partial aggregates: row count, null counts and
+dtypes per column, and a :class:`quantile_sketch.KLLSketch` per numeric column
+(which carries exact count, sum, min and max alongside its quantiles). KPI
+rates and averages are derived from those sums.
+
+One profile is computed per (hotel, year) partition when the store is
+written and saved next to the partition's data file. The dashboard merges the
+profiles of the selected partitions, so the Overview costs O(partitions)
+rather than a scan over every row.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from quantile_sketch import DEFAULT_K, KLLSketch
+
+PROFILE_FILE = 'profile.joblib'
+
+
+class DatasetProfile:
+    """Mergeable summary of a bookings frame."""
+
+    def __init__(self, rows=0, null_counts=None, dtypes=None, sketches=None):
+        self.rows = rows
+        self.null_counts = null_counts if null_counts is not None else pd.Series(dtype='int64')
+        self.dtypes = dtypes if dtypes is not None else pd.Series(dtype='object')
+        self.sketches = sketches or {}
+
+    @classmethod
+    def from_frame(cls, df, k=DEFAULT_K):
+        """Profile ``df`` in a single pass over its columns."""
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        return cls(
+            rows=len(df),
+            null_counts=df.isnull().sum(),
+            dtypes=df.dtypes.astype(str),
+            sketches={
+                col: KLLSketch(k).update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+                for col in numeric_cols
+            },
+        )
+
+    @property
+    def columns(self):
+        return list(self.dtypes.index)
+
+    @property
+    def numeric_columns(self):
+        return list(self.sketches)
+
+    def merge(self, other):
+        """Return a new profile combining ``self`` and ``other``; neither is modified."""
+        sketches = {}
+        for col in list(self.sketches) + [c for c in other.sketches if c not in self.sketches]:
+            parts = [part for part in (self.sketches.get(col), other.sketches.get(col)) if part is not None]
+            merged = KLLSketch(parts[0].k)
+            for part in parts:
+                merged.merge(part)
+            sketches[col] = merged
+        columns = list(self.dtypes.index) + [c for c in other.dtypes.index if c not in self.dtypes.index]
+        return DatasetProfile(
+            rows=self.rows + other.rows,
+            null_counts=self.null_counts.add(other.null_counts, fill_value=0).astype('int64')[columns],
+            dtypes=self.dtypes.combine_first(other.dtypes)[columns],
+            sketches=sketches,
+        )
+
+    def total(self, col):
+        """Exact sum of a numeric column."""
+        return self.sketches[col].sum
+
+    def mean(self, col):
+        """Exact mean of a numeric column, skipping nulls."""
+        return self.sketches[col].mean()
+
+    def rate(self, col):
+        """Column sum per row, e.g. cancellation or parking-request rate."""
+        return self.sketches[col].sum / self.rows if self.rows else np.nan
+
+    def describe(self, columns=None):
+        """Sketch-based equivalent of ``df[columns].describe()``."""
+        columns = self.numeric_columns if columns is None else columns
+        return pd.DataFrame({col: self.sketches[col].describe() for col in columns})
+
+
+def merge_profiles(profiles):
+    """Merge an iterable of profiles into one."""
+    result = DatasetProfile()
+    for profile in profiles:
+        result = result.merge(profile)
+    return result
+
+
+def _read_partition(path):
+    if path.endswith('.arrow'):
+        return ipc.open_file(pa.memory_map(path, 'r')).read_all().to_pandas()
+    return pd.read_parquet(path)
+
+
+def profile_path(data_path):
+    """Return the profile file stored next to a partition data file."""
+    return os.path.join(os.path.dirname(data_path), PROFILE_FILE)
+
+
+def write_profile(df, data_path):
+    """Profile a partition frame and save it next to ``data_path``."""
+    profile = DatasetProfile.from_frame(df)
+    path = profile_path(data_path)
+    joblib.dump(profile, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return profile
+
+
+def partition_profile(data_path):
+    """Load a partition's profile, building it from the data file if it is missing or stale."""
+    path = profile_path(data_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(data_path):
+        return joblib.load(path)
+    return write_profile(_read_partition(data_path), data_path)
+
+
+def load_profile(partitions):
+    """Merge the profiles of every partition in a partition listing."""
+    return merge_profiles(partition_profile(path) for path in partitions['path'])
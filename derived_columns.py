@@ -0,0 +1,113 @@
+"""Registry of derived booking columns.
+
+Each derived column is declared once with the columns it depends on and a
+vectorized function that computes it. Eager columns are materialised at
+ingest (see :func:`booking_store.prepare_bookings`) and stored alongside the
+base columns; lazy ones depend on the current selection and are computed on
+first use. Pages refer to derived columns by name instead of copying the
+whole frame to add a column on every rerun.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DerivedColumn:
+    """A named column computed from other (base or derived) columns.
+
+    Attributes:
+        name (str): Column name.
+        depends_on (tuple): Columns the function reads.
+        func (callable): ``func(df) -> pd.Series``, given a frame holding the dependencies.
+        eager (bool): Materialise at ingest rather than on first use.
+    """
+    name: str
+    depends_on: tuple
+    func: object
+    eager: bool = True
+
+
+REGISTRY = {}
+
+
+def register(name, depends_on, eager=True):
+    """Decorator registering ``func`` as the definition of derived column ``name``."""
+    def decorator(func):
+        REGISTRY[name] = DerivedColumn(name, tuple(depends_on), func, eager)
+        return func
+    return decorator
+
+
+def available(df, name):
+    """True if ``name`` is present in ``df`` or can be derived from its columns."""
+    if name in df.columns:
+        return True
+    column = REGISTRY.get(name)
+    return column is not None and all(available(df, dep) for dep in column.depends_on)
+
+
+def compute(df, name):
+    """Return column ``name`` as a Series, deriving it (and its dependencies) if needed.
+
+    ``df`` itself is never modified.
+    """
+    if name in df.columns:
+        return df[name]
+    if name not in REGISTRY:
+        raise KeyError(f"'{name}' is neither a column nor a registered derived column")
+    column = REGISTRY[name]
+    missing = [dep for dep in column.depends_on if dep not in df.columns]
+    if missing:
+        df = df.assign(**{dep: compute(df, dep) for dep in missing})
+    return column.func(df).rename(name)
+
+
+def with_columns(df, names):
+    """Return ``df`` with the derived columns ``names`` present.
+
+    ``df`` is returned unchanged when they already exist; otherwise the columns
+    are added to a copy-on-write view rather than a full copy.
+    """
+    missing = [name for name in names if name not in df.columns]
+    if not missing:
+        return df
+    return df.assign(**{name: compute(df, name) for name in missing})
+
+
+def materialize(df, names=None):
+    """Add every eager derived column that ``df`` can support, in place, at ingest."""
+    names = [name for name, column in REGISTRY.items() if column.eager] if names is None else names
+    for name in names:
+        if name not in df.columns and available(df, name):
+            df[name] = compute(df, name)
+    return df
+
+
+@register('total people', ['adults', 'children', 'babies'])
+def _total_people(df):
+    return df['adults'] + df['children'] + df['babies']
+
+
+@register('total stayed', ['stays_in_weekend_nights', 'stays_in_week_nights'])
+def _total_stayed(df):
+    return df['stays_in_weekend_nights'] + df['stays_in_week_nights']
+
+
+@register('total_revenue', ['adr', 'total stayed'])
+def _total_revenue(df):
+    return df['adr'] * df['total stayed']
+
+
+@register('lead_time_bin', ['lead_time'], eager=False)
+def _lead_time_bin(df):
+    # Up to 10 equal-width bins over the selection's lead times, labelled by their edges.
+    # Edges are computed exactly as pd.cut(lead_time, bins=n) does, so one cut pass suffices.
+    lead_time = df['lead_time']
+    bins_count = min(10, lead_time.nunique())
+    low, high = float(lead_time.min()), float(lead_time.max())
+    edges = np.linspace(low, high, bins_count + 1)
+    edges[0] -= (high - low) * 0.001
+    labels = [f'{int(edges[i])}-{int(edges[i + 1])}' for i in range(len(edges) - 1)]
+    return pd.cut(lead_time, bins=edges, labels=labels, right=False, include_lowest=True)
@@ -0,0 +1,186 @@
+"""Weighted ensemble of the served SARIMAX and Prophet forecasters.
+
+The notebook's ``combinedResults`` table has SARIMA and Prophet variants
+each winning on different metrics. Here both served models
+(``model.joblib`` and ``prophetmodel.joblib``) are blended per day:
+
+- Each member forecasts from its own last training day, in blocks of
+  ``BLOCK`` days, and the result is cached per model file version. Later
+  requests inside the cached horizon only slice it.
+- Members are forecast concurrently, so a request costs about as much as
+  its slowest member, and nothing once the horizon is cached.
+- Weights are learned from rolling-origin backtests (:mod:`backtest`): per
+  step ahead, each member's weight is proportional to ``1 / MAE``. Without
+  a weights file the members are weighted equally.
+- The blended interval is the weighted average of the members' 95% bounds.
+
+Usage:
+    python ensemble.py --bookings hotel_bookings.csv --learn
+    python ensemble.py --start 2017-09-15 --end 2017-10-15
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import backtest
+import guest_series
+import sarimax_updater
+
+MEMBERS = {'sarimax': sarimax_updater.MODEL_PATH, 'prophet': 'prophetmodel.joblib'}
+WEIGHTS_PATH = 'ensemble_weights.json'
+# Member forecasts are extended in blocks, so nearby requests share one cached horizon
+BLOCK = 91
+BACKTEST_CONFIGS = {'sarimax': {'refit': False}, 'prophet': {}}
+
+
+@functools.lru_cache(maxsize=4)
+def load_member(path, modified):
+    # `modified` keys the cache, so a retrained or advanced model is picked up
+    return joblib.load(path)
+
+
+def training_end(name, model):
+    """Last day a member was trained on."""
+    if name == 'prophet':
+        return pd.Timestamp(model.history['ds'].max())
+    return sarimax_updater.last_observed(model)
+
+
+def _sarimax_forecast(model, steps):
+    forecast = model.get_forecast(steps=steps)
+    bounds = forecast.conf_int(alpha=0.05).to_numpy()
+    return np.column_stack([forecast.predicted_mean.to_numpy(), bounds])
+
+
+def _prophet_forecast(model, steps):
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    first = training_end('prophet', model) + pd.Timedelta(days=1)
+    future = pd.DataFrame({'ds': pd.date_range(first, periods=steps)})
+    return model.predict(future)[['yhat', 'yhat_lower', 'yhat_upper']].to_numpy()
+
+
+FORECASTERS = {'sarimax': _sarimax_forecast, 'prophet': _prophet_forecast}
+
+
+@functools.lru_cache(maxsize=16)
+def member_forecast(name, path, modified, steps):
+    """A member's forecast for the ``steps`` days after its training end.
+
+    Returns:
+        pd.DataFrame: ``yhat``, ``lower`` and ``upper`` indexed by date.
+    """
+    model = load_member(path, modified)
+    first = training_end(name, model) + pd.Timedelta(days=1)
+    values = FORECASTERS[name](model, steps)
+    return pd.DataFrame(values, index=pd.date_range(first, periods=steps), columns=['yhat', 'lower', 'upper'])
+
+
+def learn_weights(series, members=MEMBERS, horizon=backtest.HORIZON, period=backtest.PERIOD,
+                  initial=backtest.INITIAL_DAYS, workers=None, path=WEIGHTS_PATH):
+    """Backtest every member and save inverse-MAE weights per step ahead.
+
+    Args:
+        series (pd.Series): Daily guests with a daily ``DatetimeIndex``.
+        members (dict): Member name -> model path; only the names are used.
+        horizon, period, initial, workers: Passed to :func:`backtest.run`.
+        path (str): Output JSON file, or None to skip saving.
+
+    Returns:
+        dict: ``horizon``, and per member the ``mae`` and ``weight`` of each step.
+    """
+    mae = {}
+    for name in members:
+        result = backtest.run(series, name, BACKTEST_CONFIGS.get(name), horizon, period, initial, workers)
+        mae[name] = result['metrics']['mae'].to_numpy()
+    inverse = np.vstack([1.0 / mae[name] for name in members])
+    weights = inverse / inverse.sum(axis=0)
+    learned = {
+        'horizon': horizon,
+        'mae': {name: mae[name].tolist() for name in members},
+        'weight': {name: weights[i].tolist() for i, name in enumerate(members)},
+    }
+    if path:
+        with open(path, 'w') as handle:
+            json.dump(learned, handle, indent=2)
+    return learned
+
+
+def load_weights(path=WEIGHTS_PATH):
+    """Learned weights, or None if :func:`learn_weights` has not been run."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def _step_weights(learned, name, steps):
+    # Inverse MAE at each step ahead; steps past the backtest horizon use its last step
+    if learned is None or name not in learned['mae']:
+        return np.ones(len(steps))
+    mae = np.asarray(learned['mae'][name])
+    return 1.0 / mae[np.clip(steps, 1, len(mae)) - 1]
+
+
+def forecast(start, end, members=MEMBERS, weights_path=WEIGHTS_PATH):
+    """Blended forecast for ``start`` to ``end``.
+
+    Args:
+        start, end: First and last forecast day; ``start`` must be after
+            every member's training end.
+        members (dict): Member name -> model path.
+        weights_path (str): JSON from :func:`learn_weights`.
+
+    Returns:
+        pd.DataFrame: ``yhat``, ``lower``, ``upper`` and, per member, its
+        ``{name}_yhat`` and ``{name}_weight``, indexed by date.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    dates = pd.date_range(start, end)
+    modified = {name: os.path.getmtime(path) for name, path in members.items()}
+    ends = {name: training_end(name, load_member(path, modified[name])) for name, path in members.items()}
+    latest = max(ends.values())
+    if start <= latest:
+        raise ValueError(f'Start date must be after {latest.date()}, the last training day of the ensemble')
+    # Round the horizon up to whole blocks so the cache is reused across requests
+    steps = {name: -(-(end - ends[name]).days // BLOCK) * BLOCK for name in members}
+    with ThreadPoolExecutor(max_workers=len(members)) as pool:
+        futures = {name: pool.submit(member_forecast, name, path, modified[name], steps[name])
+                   for name, path in members.items()}
+        forecasts = {name: future.result().loc[start:end] for name, future in futures.items()}
+
+    learned = load_weights(weights_path)
+    raw = np.vstack([_step_weights(learned, name, (dates - ends[name]).days.to_numpy()) for name in members])
+    weights = raw / raw.sum(axis=0)
+    blend = pd.DataFrame(index=dates)
+    for column in ['yhat', 'lower', 'upper']:
+        values = np.vstack([forecasts[name][column].to_numpy() for name in members])
+        blend[column] = (weights * values).sum(axis=0)
+    for i, name in enumerate(members):
+        blend[f'{name}_yhat'] = forecasts[name]['yhat'].to_numpy()
+        blend[f'{name}_weight'] = weights[i]
+    return blend
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Blend the SARIMAX and Prophet forecasts.')
+    parser.add_argument('--bookings', default=None, help='CSV of bookings, needed with --learn')
+    parser.add_argument('--learn', action='store_true', help='Learn member weights from backtests')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    args = parser.parse_args()
+    if args.learn:
+        if not args.bookings:
+            parser.error('--learn needs --bookings')
+        learned = learn_weights(guest_series.daily_guests(pd.read_csv(args.bookings)), workers=args.workers)
+        for name, weight in learned['weight'].items():
+            print(f'{name}: mean MAE {np.mean(learned["mae"][name]):.2f}, mean weight {np.mean(weight):.3f}')
+    if args.start and args.end:
+        print(forecast(args.start, args.end).to_string(float_format='{:.1f}'.format))
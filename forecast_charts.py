@@ -0,0 +1,226 @@
+"""Forecast figures for the Prophet and SARIMAX apps.
+
+Building a styled ``go.Figure`` validates the whole layout, including the
+expanded dark template, on every rerun. Instead, the layout of each style and
+the styling of its traces are validated once and cached as plain dicts; each
+rerun fills in the trace data and title and builds the figure from them
+without validating again.
+
+Long horizons are decimated before plotting: Largest-Triangle-Three-Buckets
+(LTTB) keeps the visual shape of the curve with at most ``MAX_POINTS`` points,
+and min/max decimation is available for spiky series. Every plotted point is
+a real forecast value, and its hover also gives the number of days it stands
+for and the exact minimum and maximum forecast over them, so no peak is
+hidden and the days in between are never sent to the browser. Markers and
+spline smoothing are dropped above ``MARKER_THRESHOLD`` points, where they
+only cost rendering time.
+"""
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+MAX_POINTS = 1000
+MARKER_THRESHOLD = 180
+
+
+@dataclass(frozen=True)
+class ChartStyle:
+    """Colours and fonts of a forecast chart.
+
+    Attributes:
+        line (str): Forecast line colour.
+        marker (str): Marker fill colour.
+        marker_outline (str): Marker outline colour.
+        band (str): Confidence band fill colour.
+        area (str): Optional fill between the line and the axis.
+        title_font (str): Title font family.
+        title_size (int): Title font size.
+    """
+    line: str
+    marker: str
+    marker_outline: str
+    band: str = None
+    area: str = None
+    title_font: str = 'Inter'
+    title_size: int = 20
+
+
+STYLES = {
+    'Luxury Gold': ChartStyle('#FFD700', '#FFD700', 'rgba(255,255,255,0.8)', 'rgba(255, 215, 0, 0.15)'),
+    'Emerald Premium': ChartStyle('#50C878', '#50C878', 'rgba(255,255,255,0.8)', 'rgba(80, 200, 120, 0.15)'),
+    'Coral Elegance': ChartStyle('#FF6B6B', '#FF6B6B', 'rgba(255,255,255,0.8)', 'rgba(255, 107, 107, 0.15)'),
+    'Teal Sophistication': ChartStyle('#14B8A6', '#14B8A6', 'rgba(255,255,255,0.8)', 'rgba(20, 184, 166, 0.15)'),
+}
+SARIMAX_STYLE = ChartStyle(
+    '#FFD700', '#FFA500', '#FFD700', area='rgba(255, 215, 0, 0.1)', title_font='Arial Black', title_size=22
+)
+
+
+def lttb_indices(y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Points are taken as evenly spaced, as daily forecasts are. The first and
+    last points are always kept.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (edges[i + 1] + next_end - 1) / 2.0
+        next_y = y[edges[i + 1]:next_end].mean()
+        candidates = np.arange(start, end)
+        areas = np.abs((previous - next_x) * (y[candidates] - y[previous])
+                       - (previous - candidates) * (next_y - y[previous]))
+        previous = candidates[np.argmax(areas)]
+        kept[i + 1] = previous
+    return kept
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of each of ``(n_out - 2) // 2`` equal buckets, plus both ends."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    starts = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(int)[:-1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    order = np.lexsort((y, bucket))
+    first = np.searchsorted(bucket[order], np.arange(len(starts)), side='left')
+    last = np.searchsorted(bucket[order], np.arange(len(starts)), side='right') - 1
+    return np.unique(np.concatenate([order[first], order[last], [0, n - 1]]))
+
+
+def decimate(y, max_points=MAX_POINTS, method='lttb'):
+    """Indices of at most ``max_points`` points representing ``y``."""
+    if len(y) <= max_points:
+        return np.arange(len(y))
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    return lttb_indices(y, max_points)
+
+
+def _bucket_bounds(kept, n):
+    # Each kept point stands for the days up to halfway to its neighbours
+    mid = (kept[:-1] + kept[1:] + 1) // 2
+    return np.concatenate(([0], mid)), np.concatenate((mid, [n]))
+
+
+@functools.lru_cache(maxsize=None)
+def _layout(style):
+    # Validated once, with the dark template expanded; the dict is only ever read
+    return go.Layout(
+        title={
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': style.title_size, 'color': '#ffffff', 'family': style.title_font}
+        },
+        xaxis_title="Date",
+        yaxis_title="Number of Guests",
+        hovermode='x unified',
+        height=500,
+        template='plotly_dark',
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(color='#ffffff')
+        ),
+        paper_bgcolor='rgba(26, 26, 26, 0.9)',
+        plot_bgcolor='rgba(45, 45, 45, 0.9)',
+        xaxis=dict(gridcolor='rgba(255, 255, 255, 0.1)', color='#ffffff'),
+        yaxis=dict(gridcolor='rgba(255, 255, 255, 0.1)', color='#ffffff')
+    ).to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _traces(style, confidence, markers):
+    # Trace styling without data, validated once; forecast_figure copies and fills them in
+    traces = []
+    if confidence:
+        traces.append(go.Scatter(
+            fill=None, mode='lines', line_color='rgba(0,0,0,0)', showlegend=False, hoverinfo='skip'
+        ))
+        traces.append(go.Scatter(
+            fill='tonexty', mode='lines', line_color='rgba(0,0,0,0)', name='95% Confidence Interval',
+            fillcolor=style.band
+        ))
+    traces.append(go.Scatter(
+        mode='lines+markers' if markers else 'lines',
+        line=dict(color=style.line, width=4 if markers else 2, shape='spline' if markers else 'linear'),
+        marker=dict(size=8, color=style.marker, line=dict(width=2, color=style.marker_outline)) if markers else None,
+        fill='tonexty' if style.area else None,
+        fillcolor=style.area,
+    ))
+    return tuple(trace.to_plotly_json() for trace in traces)
+
+
+def _figure(layout, traces):
+    # The layout and trace styling were validated when cached and the data is ours, so the
+    # figure skips plotly's validation; re-validating the dark template dominates the build time
+    return go.Figure(data=[go.Scatter(trace, _validate=False) for trace in traces], layout=layout, _validate=False)
+
+
+def forecast_figure(dates, values, title, style=SARIMAX_STYLE, lower=None, upper=None,
+                    name='Predicted Guests', hover='<b>Date:</b> %{x}<br><b>Guests:</b> %{y:.0f}',
+                    max_points=MAX_POINTS, method='lttb'):
+    """Forecast line chart from the cached layout and traces for ``style``.
+
+    Args:
+        dates (array-like): Forecast dates.
+        values (array-like): Forecast values.
+        title (str): Chart title.
+        style (ChartStyle): Colours and fonts, e.g. ``STYLES['Luxury Gold']``.
+        lower (array-like): Optional lower confidence bound, drawn with ``upper``.
+        upper (array-like): Optional upper confidence bound.
+        name (str): Legend name of the forecast line.
+        hover (str): Hover template for a point, without ``<extra>``.
+        max_points (int): Decimate to at most this many points.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        go.Figure
+    """
+    dates = pd.DatetimeIndex(dates)
+    values = np.asarray(values, dtype=np.float64)
+    kept = decimate(values, max_points, method)
+    decimated = len(kept) < len(values)
+    confidence = lower is not None and upper is not None
+    markers = len(kept) <= MARKER_THRESHOLD
+
+    layout = dict(_layout(style))
+    layout['title'] = dict(layout['title'], text=title)
+    traces = [dict(trace) for trace in _traces(style, confidence, markers)]
+    x = dates[kept]
+    if confidence:
+        lower, upper = np.asarray(lower, dtype=np.float64), np.asarray(upper, dtype=np.float64)
+        if decimated:
+            # The band is the envelope of each bucket, so no day's interval is cut off
+            starts, _ = _bucket_bounds(kept, len(values))
+            lower, upper = np.minimum.reduceat(lower, starts), np.maximum.reduceat(upper, starts)
+        traces[0].update(x=x, y=upper)
+        traces[1].update(x=x, y=lower)
+
+    traces[-1].update(x=x, y=values[kept], name=name, hovertemplate=hover + '<extra></extra>')
+    if decimated:
+        # The drawn line only approximates the days between its points; each point's hover also
+        # gives the exact range of the forecasts it stands for
+        starts, ends = _bucket_bounds(kept, len(values))
+        traces[-1]['customdata'] = np.column_stack(
+            (ends - starts, np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)))
+        traces[-1]['hovertemplate'] = (hover + '<br>%{customdata[0]}-day range: %{customdata[1]:.0f} – '
+                                       '%{customdata[2]:.0f}<extra></extra>')
+    return _figure(layout, traces)
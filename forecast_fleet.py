@@ -0,0 +1,461 @@
+"""Forecast fleets: one SARIMAX or Prophet model per hotel, segment or channel series.
+
+All series are built from the bookings in one pass
+(:func:`guest_series.daily_guests_by`), then fitted in worker processes, one
+per series and at most ``workers`` at a time. Every series is fitted in
+isolation: an error, a crashed worker or a timeout marks that series failed
+in the registry and the rest of the fleet is unaffected. A worker that runs
+out of time is killed with its whole process group, which includes the
+cmdstan process of a Prophet fit.
+
+The registry is one joblib file per model kind and stays compact. A SARIMAX
+entry keeps only the fitted parameters and the training series; the results
+are rebuilt on first use by running the Kalman filter with fixed parameters,
+a fraction of a second per series instead of a refit. A Prophet entry keeps the model as Prophet's JSON
+serialisation, without the Stan fit object. Series that were skipped or
+failed keep their training series, so reconciliation can give them a
+seasonal naive forecast instead of dropping their demand.
+
+Usage:
+    python forecast_fleet.py --bookings hotel_bookings.csv --kind sarimax
+    python forecast_fleet.py --bookings hotel_bookings.csv --kind prophet --workers 8 --timeout 120
+"""
+import argparse
+import functools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import forecast_charts
+import guest_series
+import model_store
+import reconciliation
+
+FLEET_DIR = os.environ.get('DASHBOARD_FLEET_DIR', 'fleet')
+LEVELS = [(), ('hotel',), ('market_segment',), ('distribution_channel',), ('hotel', 'market_segment')]
+# Model settings of the served models (notebook SARIMA01 and the tuned Prophet)
+SPECS = {
+    'sarimax': {'order': (0, 1, 6), 'seasonal_order': (0, 1, 1, 7)},
+    'prophet': {
+        'interval_width': 0.95, 'weekly_seasonality': True,
+        'changepoint_prior_scale': 0.001, 'seasonality_prior_scale': 0.1,
+    },
+}
+DEFAULT_TIMEOUT = 300
+# Series with fewer days of arrivals than this are not fitted
+MIN_ACTIVE_DAYS = 60
+# Series without a fitted model are forecast by each weekday's mean over this many recent weeks
+NAIVE_WEEKS = 4
+ALL_SERIES = 'All series'
+RECONCILIATION_LABELS = {
+    'bottom_up': 'Bottom-up', 'top_down': 'Top-down', 'ols': 'OLS', 'wls': 'Structural WLS', 'mint': 'MinT (shrinkage)',
+}
+
+
+def registry_path(kind, directory=FLEET_DIR):
+    """Path of the registry file for a model kind."""
+    return os.path.join(directory, f'{kind}_fleet.joblib')
+
+
+def _fit_sarimax(series, spec):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    results = SARIMAX(series, order=spec['order'], seasonal_order=spec['seasonal_order']).fit(disp=False)
+    return {'params': results.params.to_numpy(), 'series': series.to_numpy(dtype=np.float64)}
+
+
+def _fit_prophet(series, spec):
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    model = Prophet(**spec).fit(pd.DataFrame({'ds': series.index, 'y': series.to_numpy()}))
+    return {'model_json': model_to_json(model)}
+
+
+FITTERS = {'sarimax': _fit_sarimax, 'prophet': _fit_prophet}
+
+
+def _entry(kind, key, series, spec):
+    return {'kind': kind, 'key': key, 'start': series.index[0], 'end': series.index[-1], 'spec': spec}
+
+
+def fit_series(kind, key, series, spec):
+    """Fit one series; never raises.
+
+    Returns:
+        dict: Registry entry with ``status`` 'ok' or 'failed'.
+    """
+    entry = _entry(kind, key, series, spec)
+    start = time.perf_counter()
+    try:
+        entry.update(FITTERS[kind](series, spec))
+        entry['status'] = 'ok'
+    except Exception as e:
+        entry.update(status='failed', error=f'{type(e).__name__}: {e}')
+    entry['fit_seconds'] = time.perf_counter() - start
+    return entry
+
+
+def _fit_worker(conn, kind, key, series, spec):
+    # A process group of its own, so a timeout can also stop the processes the fit started
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    conn.send(fit_series(kind, key, series, spec))
+    conn.close()
+
+
+def _kill(process):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+    process.join()
+
+
+def _receive(receiver):
+    # The worker's entry, or None if it has not sent one (or exited before sending a whole one)
+    if not receiver.poll():
+        return None
+    try:
+        return receiver.recv()
+    except EOFError:
+        return None
+
+
+def _fit_all(kind, jobs, spec, workers, timeout):
+    # Series key -> entry; one worker process per series, at most `workers` running at once
+    context = multiprocessing.get_context()
+    pending = list(jobs.items())
+    running = {}
+    entries = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            key, series = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_fit_worker, args=(sender, kind, key, series, spec), daemon=True)
+            process.start()
+            sender.close()
+            running[key] = (process, receiver, time.monotonic(), series)
+        receivers = [receiver for _, receiver, _, _ in running.values()]
+        sentinels = [process.sentinel for process, _, _, _ in running.values()]
+        waits = [timeout - (time.monotonic() - started) for _, _, started, _ in running.values()] if timeout else []
+        multiprocessing.connection.wait(receivers + sentinels, timeout=max(min(waits), 0) if waits else None)
+        for key, (process, receiver, started, series) in list(running.items()):
+            entry = _receive(receiver)
+            if entry is None and not process.is_alive():
+                # It may have sent its result and exited since the poll above
+                entry = _receive(receiver)
+                if entry is None:
+                    # Killed or crashed (e.g. out of memory) without sending a result
+                    process.join()
+                    entry = dict(_entry(kind, key, series, spec), status='failed',
+                                 error=f'Worker exited with code {process.exitcode}')
+            elif entry is None and timeout and time.monotonic() - started >= timeout:
+                _kill(process)
+                entry = dict(_entry(kind, key, series, spec), status='timeout', error=f'No fit within {timeout} s',
+                             fit_seconds=time.monotonic() - started)
+            if entry is not None:
+                entries[key] = entry
+                process.join()
+                receiver.close()
+                del running[key]
+    return entries
+
+
+def train_fleet(df, kind='sarimax', levels=LEVELS, spec=None, workers=None, timeout=DEFAULT_TIMEOUT,
+                train_end=None, path=None):
+    """Fit one model per series and save the fleet registry.
+
+    Args:
+        df (pd.DataFrame): Bookings.
+        kind (str): 'sarimax' or 'prophet'.
+        levels (list): Groupings, as for :func:`guest_series.daily_guests_by`.
+        spec (dict): Model settings; defaults to ``SPECS[kind]``.
+        workers (int): Worker processes; defaults to the CPU count.
+        timeout (float): Seconds allowed per series.
+        train_end (str): Last training date; defaults to the last arrival.
+        path (str): Registry file; defaults to :func:`registry_path`.
+
+    Returns:
+        dict: Series key -> registry entry.
+    """
+    spec = spec or SPECS[kind]
+    table = guest_series.daily_guests_by(df, levels)
+    if train_end is not None:
+        table = table.loc[:train_end]
+    entries = {}
+    jobs = {}
+    for key in table.columns:
+        series = table[key]
+        if (series > 0).sum() < MIN_ACTIVE_DAYS:
+            entries[key] = dict(_entry(kind, key, series, spec), status='skipped',
+                                error=f'Fewer than {MIN_ACTIVE_DAYS} days with arrivals')
+        else:
+            jobs[key] = series
+    entries.update(_fit_all(kind, jobs, spec, workers or os.cpu_count() or 1, timeout))
+    entries = {key: entries[key] for key in table.columns}
+    for key, entry in entries.items():
+        if entry['status'] != 'ok':
+            # Kept for the naive forecast that stands in for the series (see Fleet.forecast)
+            entry['series'] = table[key].to_numpy(dtype=np.float64)
+    path = path or registry_path(kind)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    model_store.save_model(entries, path)
+    return entries
+
+
+def _training_series(entry):
+    return pd.Series(entry['series'].astype(np.float64), index=pd.date_range(entry['start'], entry['end'], freq='D'))
+
+
+def _naive(entry):
+    # No fitted model, but the training series is known
+    return entry['status'] != 'ok' and 'series' in entry
+
+
+def naive_forecast(series, dates):
+    """Seasonal naive forecast: each weekday's mean over the last ``NAIVE_WEEKS`` weeks of ``series``."""
+    recent = series.iloc[-7 * NAIVE_WEEKS:]
+    profile = recent.groupby(recent.index.dayofweek).mean()
+    return profile.reindex(dates.dayofweek, fill_value=0.0).to_numpy()
+
+
+class Fleet:
+    """Fitted fleet loaded from a registry, with batch forecasting.
+
+    Models are rebuilt from their registry entries on first use and kept.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._models = {}
+
+    @classmethod
+    def load(cls, path):
+        return cls(joblib.load(path))
+
+    @property
+    def keys(self):
+        """Keys of the series with a fitted model."""
+        return [key for key, entry in self.entries.items() if entry['status'] == 'ok']
+
+    def summary(self):
+        """One row per series: status, training period, fit time and error."""
+        rows = [{
+            'Series': key,
+            'Status': entry['status'],
+            'Trained Until': entry.get('end'),
+            'Fit Seconds': entry.get('fit_seconds'),
+            'Error': entry.get('error', ''),
+        } for key, entry in self.entries.items()]
+        return pd.DataFrame(rows)
+
+    @property
+    def naive_keys(self):
+        """Keys of the series without a fitted model that get a naive forecast instead."""
+        return [key for key, entry in self.entries.items() if _naive(entry)]
+
+    def model(self, key):
+        """Fitted SARIMAX results or Prophet model of one series."""
+        if key not in self._models:
+            entry = self.entries[key]
+            if entry['kind'] == 'sarimax':
+                from statsmodels.tsa.statespace.sarimax import SARIMAX
+                spec = entry['spec']
+                model = SARIMAX(_training_series(entry), order=spec['order'], seasonal_order=spec['seasonal_order'])
+                self._models[key] = model.filter(entry['params'])
+            else:
+                from prophet.serialize import model_from_json
+                model = model_from_json(entry['model_json'])
+                # Point forecasts only: skip the trend simulations behind the intervals
+                model.uncertainty_samples = 0
+                self._models[key] = model
+        return self._models[key]
+
+    def history(self, keys=None):
+        """Training actuals of ``keys`` (default: all fitted series), dates x series."""
+        columns = {}
+        for key in keys or self.keys:
+            entry = self.entries[key]
+            if entry['kind'] == 'sarimax' or _naive(entry):
+                columns[key] = _training_series(entry)
+            else:
+                columns[key] = self.model(key).history.set_index('ds')['y']
+        return pd.DataFrame(columns)
+
+    def residuals(self, keys=None):
+        """In-sample one-step residuals of ``keys``, dates x series.
+
+        The first differencing window of a SARIMAX fit is dropped; its
+        residuals only reflect the diffuse initialisation. Series with a
+        naive forecast get the residuals of a seasonal naive one, the change
+        from the same weekday a week earlier.
+        """
+        columns = {}
+        for key in keys or self.keys:
+            entry = self.entries[key]
+            if _naive(entry):
+                columns[key] = _training_series(entry).diff(7).iloc[7:]
+                continue
+            model = self.model(key)
+            if entry['kind'] == 'sarimax':
+                order, seasonal = entry['spec']['order'], entry['spec']['seasonal_order']
+                columns[key] = model.resid.iloc[order[1] + seasonal[1] * seasonal[3]:]
+            else:
+                history = model.history
+                fitted = model.predict(history[['ds']])['yhat'].to_numpy()
+                columns[key] = pd.Series(history['y'].to_numpy() - fitted, index=history['ds'])
+        return pd.DataFrame(columns)
+
+    def forecast(self, start, end, keys=None):
+        """Point forecasts of ``keys`` (default: all fitted series) for ``start``..``end``.
+
+        Keys in :attr:`naive_keys` get a seasonal naive forecast (:func:`naive_forecast`).
+
+        Returns:
+            pd.DataFrame: Dates by series key.
+        """
+        dates = pd.date_range(start, end, freq='D')
+        columns = {}
+        for key in keys or self.keys:
+            entry = self.entries[key]
+            if _naive(entry):
+                columns[key] = naive_forecast(_training_series(entry), dates)
+                continue
+            model = self.model(key)
+            if entry['kind'] == 'sarimax':
+                steps = (dates[-1] - entry['end']).days
+                columns[key] = model.forecast(steps=steps).to_numpy()[-len(dates):]
+            else:
+                columns[key] = model.predict(pd.DataFrame({'ds': dates}))['yhat'].to_numpy()
+        return pd.DataFrame(columns, index=dates)
+
+
+def fleet_hierarchy(fleet):
+    """Reconciliation hierarchy over the fleet's levels.
+
+    Returns:
+        reconciliation.Hierarchy: The hierarchy, or None without a bottom
+        level or if a node has neither a fitted model nor a naive forecast
+        (registries trained before naive forecasts were kept).
+    """
+    bottom = LEVELS[-1]
+    levels = [level for level in LEVELS if set(level) <= set(bottom)]
+    hierarchy = reconciliation.Hierarchy.from_keys(fleet.entries, levels)
+    forecastable = set(fleet.keys) | set(fleet.naive_keys)
+    if not hierarchy.bottom or not set(hierarchy.nodes) <= forecastable:
+        return None
+    return hierarchy
+
+
+def reconcile_fleet(fleet, hierarchy, forecasts, method):
+    """``forecasts`` with the hierarchy's series replaced by their reconciled values.
+
+    Nodes without a fitted model (skipped as too sparse, or failed) take part
+    with their naive forecast, so their demand is neither dropped nor pulled
+    to zero.
+
+    Returns:
+        tuple: ``(forecasts, filled)``, the reconciled forecasts and the
+        nodes that were given a naive forecast.
+    """
+    filled = [key for key in hierarchy.nodes if key not in forecasts.columns]
+    if filled:
+        forecasts = pd.concat([forecasts, fleet.forecast(forecasts.index[0], forecasts.index[-1], filled)], axis=1)
+    residuals = fleet.residuals(hierarchy.nodes) if method == 'mint' else None
+    history = fleet.history(hierarchy.nodes) if method == 'top_down' else None
+    reconciled = hierarchy.reconcile(forecasts, method, residuals=residuals, history=history)
+    forecasts = forecasts.copy()
+    for key in hierarchy.nodes:
+        forecasts[key] = reconciled[key]
+    return forecasts, filled
+
+
+@functools.lru_cache(maxsize=2)
+def load_fleet(path, modified):
+    """Fleet from ``path``; ``modified`` keys the cache so a retrained fleet is picked up."""
+    return Fleet.load(path)
+
+
+def render_fleet_section(kind, start_date, end_date, style=forecast_charts.SARIMAX_STYLE):
+    """Per-series forecasts for the forecast apps, if a fleet of ``kind`` has been trained.
+
+    Users pick one series to chart, or see the whole fleet as a table.
+    """
+    # Imported here, so training workers and the command line do not load Streamlit
+    import streamlit as st
+
+    import instrumentation
+    path = registry_path(kind)
+    if not os.path.exists(path):
+        return
+    fleet = load_fleet(path, os.path.getmtime(path))
+    if not fleet.keys:
+        return
+    st.markdown("## 🧩 Forecasts by Hotel, Segment and Channel")
+    choice = st.selectbox("Series", [ALL_SERIES] + fleet.keys, key=f'{kind}_fleet_series')
+    last_trained = min(fleet.entries[key]['end'] for key in fleet.keys)
+    if start_date <= last_trained:
+        st.info(f"Series forecasts start after {last_trained.strftime('%B %d, %Y')} (end of fleet training data)")
+        return
+    if choice == ALL_SERIES:
+        forecasts = fleet.forecast(start_date, end_date)
+        hierarchy = fleet_hierarchy(fleet)
+        if hierarchy is not None:
+            method = st.selectbox(
+                "Reconciliation", ['None'] + list(RECONCILIATION_LABELS),
+                format_func=lambda name: RECONCILIATION_LABELS.get(name, name),
+                key=f'{kind}_fleet_reconciliation',
+                help="Make hotel and segment forecasts add up to the total",
+            )
+            if method != 'None':
+                forecasts, filled = reconcile_fleet(fleet, hierarchy, forecasts, method)
+                if filled:
+                    st.caption(f"Seasonal naive forecasts stand in for {len(filled)} series without a fitted "
+                               f"model: {', '.join(filled)}")
+        table = pd.DataFrame({
+            'Series': forecasts.columns,
+            'Total Guests': forecasts.sum().round().astype(int).to_numpy(),
+            'Average Daily Guests': forecasts.mean().round(1).to_numpy(),
+            'Peak Day': forecasts.idxmax().dt.strftime('%b %d').to_numpy(),
+        })
+        st.dataframe(table, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download All Series (CSV)",
+            data=forecasts.round(1).rename_axis('Date').to_csv(),
+            file_name=f"fleet_forecast_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.csv",
+            mime="text/csv",
+            key=f'{kind}_fleet_download',
+        )
+    else:
+        forecast = fleet.forecast(start_date, end_date, [choice])[choice]
+        fig = forecast_charts.forecast_figure(forecast.index, forecast.to_numpy(), choice, style=style)
+        instrumentation.plotly_chart(fig, use_container_width=True)
+    with st.expander("Fleet status"):
+        st.dataframe(fleet.summary(), use_container_width=True, hide_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fit one forecasting model per hotel, segment and channel series.')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings with the hotel_bookings.csv columns')
+    parser.add_argument('--kind', choices=sorted(SPECS), default='sarimax')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Seconds allowed per series')
+    parser.add_argument('--train-end', default=None, help='Last training date, e.g. 2017-08-31')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    fleet = train_fleet(pd.read_csv(args.bookings), args.kind, workers=args.workers, timeout=args.timeout,
+                        train_end=args.train_end)
+    statuses = pd.Series([entry['status'] for entry in fleet.values()]).value_counts()
+    print(f"{len(fleet)} series in {time.perf_counter() - start:.1f} s: "
+          + ', '.join(f'{count} {status}' for status, count in statuses.items()))
+    print(registry_path(args.kind))
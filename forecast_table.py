@@ -0,0 +1,72 @@
+"""Colour-coded forecast table for the SARIMAX app.
+
+The demand tier of each forecast day (high, medium or low relative to the
+period average) is computed once as a vectorized column. Only the page of
+rows being shown is styled, in a single ``Styler.apply`` pass that maps tiers
+to CSS, so tables covering thousands of forecast days render as quickly as a
+two-week one.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+TIERS = ['High', 'Medium', 'Low']
+TIER_STYLES = {
+    'High': 'background-color: #d4edda; color: #155724',
+    'Medium': 'background-color: #fff3cd; color: #856404',
+    'Low': 'background-color: #f8d7da; color: #721c24',
+}
+EXPORT_COLUMNS = ['Date', 'Predicted Guests', 'Day of Week', 'Month']
+PAGE_SIZE = 31
+
+
+def demand_tier(values, average, band=0.1):
+    """Tier per value: 'High' above ``average * (1 + band)``, 'Low' below ``average * (1 - band)``."""
+    values = np.asarray(values)
+    tiers = np.select([values > average * (1 + band), values < average * (1 - band)], ['High', 'Low'], 'Medium')
+    return pd.Categorical(tiers, categories=TIERS)
+
+
+def build_forecast_table(forecast, average):
+    """Forecast series -> display frame with a 'Demand' tier column."""
+    guests = forecast.to_numpy().astype(int)
+    return pd.DataFrame({
+        'Date': forecast.index.strftime('%A, %B %d, %Y'),
+        'Predicted Guests': guests,
+        'Demand': demand_tier(guests, average),
+        'Day of Week': forecast.index.strftime('%A'),
+        'Month': forecast.index.strftime('%B'),
+    })
+
+
+def _tier_css(page):
+    # One CSS string per cell, from the tier column; only 'Predicted Guests' is coloured
+    css = pd.DataFrame('', index=page.index, columns=page.columns)
+    tier_css = page['Demand'].astype(object).map(TIER_STYLES).fillna('')
+    css['Predicted Guests'] = tier_css
+    css['Demand'] = tier_css
+    return css
+
+
+def style_page(page):
+    """Style one page of the table in a single vectorized pass."""
+    return page.style.apply(_tier_css, axis=None).format({'Predicted Guests': '{:,}'})
+
+
+def render_forecast_table(table, key='forecast_table', page_size=PAGE_SIZE):
+    """Show ``table`` paginated, styling only the visible page."""
+    pages = max(1, -(-len(table) // page_size))
+    page_number = 1
+    if pages > 1:
+        page_number = st.number_input(
+            f'Page (of {pages})', min_value=1, max_value=pages, value=1, step=1, key=f'{key}_page'
+        )
+    start = (page_number - 1) * page_size
+    page = table.iloc[start:start + page_size]
+    st.dataframe(style_page(page), use_container_width=True, hide_index=True)
+    if pages > 1:
+        counts = table['Demand'].value_counts().reindex(TIERS)
+        st.caption(
+            f"Rows {start + 1:,}-{start + len(page):,} of {len(table):,} • "
+            f"High {counts['High']:,} • Medium {counts['Medium']:,} • Low {counts['Low']:,}"
+        )
@@ -0,0 +1,86 @@
+"""Daily guest series built from bookings, as the forecasting notebook does.
+
+Cancelled bookings and bookings without guests are dropped, adults and
+children are summed per arrival date, and the result is resampled to a daily
+frequency so days without arrivals count as zero guests. This is the series
+the SARIMAX and Prophet models are trained on.
+
+:func:`daily_guests_by` builds the same series per group (hotel, market
+segment, ...) for many groups at once, with one grouped aggregation per
+level of grouping.
+"""
+import pandas as pd
+
+MONTH_NUMBERS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
+    'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12,
+}
+TOTAL = 'total'
+
+
+def arrival_dates(df):
+    """Arrival date of each booking from the year, month name and day columns."""
+    return pd.to_datetime(pd.DataFrame({
+        'year': df['arrival_date_year'],
+        'month': df['arrival_date_month'].map(MONTH_NUMBERS),
+        'day': df['arrival_date_day_of_month'],
+    }))
+
+
+def _guests(df):
+    # Guests per kept booking, and their arrival dates
+    kept = df[df['is_canceled'] == 0]
+    guests = kept['adults'] + kept['children'].fillna(0)
+    guests = guests[guests > 0]
+    return kept.loc[guests.index], guests, arrival_dates(kept.loc[guests.index])
+
+
+def series_key(columns, values):
+    """Name of the series for one group, e.g. ``'hotel=City Hotel|market_segment=Groups'``."""
+    if not columns:
+        return TOTAL
+    return '|'.join(f'{column}={value}' for column, value in zip(columns, values))
+
+
+def daily_guests(df):
+    """Daily guests from non-cancelled bookings.
+
+    Args:
+        df (pd.DataFrame): Bookings with the ``hotel_bookings.csv`` columns.
+
+    Returns:
+        pd.Series: Guests per arrival date, with a daily ``DatetimeIndex``.
+    """
+    _, guests, arrival = _guests(df)
+    series = guests.groupby(arrival).sum()
+    return series.resample('D').sum()
+
+
+def daily_guests_by(df, levels):
+    """Daily guests per group, for several levels of grouping.
+
+    Args:
+        df (pd.DataFrame): Bookings with the ``hotel_bookings.csv`` columns.
+        levels (list): Tuples of columns to group by, e.g.
+            ``[(), ('hotel',), ('hotel', 'market_segment')]``. The empty
+            tuple gives the total.
+
+    Returns:
+        pd.DataFrame: One column per series, named by :func:`series_key`,
+        over one shared daily ``DatetimeIndex``. Days without arrivals are 0.
+    """
+    kept, guests, arrival = _guests(df)
+    frames = []
+    for columns in levels:
+        columns = list(columns)
+        if not columns:
+            frames.append(guests.groupby(arrival).sum().rename(TOTAL).to_frame())
+            continue
+        keys = [arrival.rename('date')] + [kept[column] for column in columns]
+        wide = guests.groupby(keys, observed=True).sum().unstack(columns)
+        wide.columns = [series_key(columns, values if isinstance(values, tuple) else (values,))
+                        for values in wide.columns]
+        frames.append(wide)
+    table = pd.concat(frames, axis=1)
+    days = pd.date_range(arrival.min(), arrival.max(), freq='D')
+    return table.reindex(days).fillna(0)
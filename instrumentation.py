@@ -0,0 +1,207 @@
+"""Timing spans and a debug panel for the Streamlit apps.
+
+Each data load, aggregation and chart is wrapped in a named span that records
+its wall time, the size of what it produced, the change in resident memory,
+and the gap since the previous span in the same script run (which is where
+untraced work such as figure construction shows up). Spans are kept per
+script run and shown in an opt-in sidebar panel. Each span is also logged
+as one JSON object per line on the ``prohotelytics.perf`` logger; set
+``DASHBOARD_PERF_LOG`` to a file path, or to ``-`` for stderr, to write them
+out.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PERF_LOG = os.environ.get('DASHBOARD_PERF_LOG', '')
+PANEL_KEY = 'perf_panel'
+
+logger = logging.getLogger('prohotelytics.perf')
+_run = contextvars.ContextVar('perf_run', default=None)
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def configure_logging(target=PERF_LOG):
+    """Send span records to ``target`` ('-' for stderr, else a file path); idempotent."""
+    if not target or logger.handlers:
+        return
+    handler = logging.StreamHandler() if target == '-' else logging.FileHandler(target)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _rss():
+    # Current resident set size in bytes; /proc is Linux-only, elsewhere memory deltas are skipped
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+def payload_size(obj):
+    """Approximate in-memory size in bytes of a result, or None if unknown."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, str)):
+        return len(obj)
+    return None
+
+
+def start_run(app, **fields):
+    """Begin collecting spans for one script run of ``app``."""
+    configure_logging()
+    now = time.perf_counter()
+    _run.set({
+        'app': app,
+        'fields': fields,
+        'start': now,
+        'last': now,
+        'spans': [],
+        'detailed': bool(st.session_state.get(PANEL_KEY)),
+    })
+
+
+def spans():
+    """Span records collected so far in the current script run."""
+    run = _run.get()
+    return run['spans'] if run else []
+
+
+@contextmanager
+def span(name, kind='compute', **fields):
+    """Time a block; the yielded dict can be given extra fields such as ``payload_bytes``."""
+    run = _run.get()
+    record = {'span': name, 'kind': kind}
+    record.update(fields)
+    rss_before = _rss()
+    start = time.perf_counter()
+    if run is not None:
+        record['gap_ms'] = round((start - run['last']) * 1000, 3)
+    try:
+        yield record
+    finally:
+        end = time.perf_counter()
+        rss_after = _rss()
+        record['ms'] = round((end - start) * 1000, 3)
+        if rss_before is not None and rss_after is not None:
+            record['rss_delta_mb'] = round((rss_after - rss_before) / 2 ** 20, 3)
+        if run is not None:
+            run['last'] = end
+            run['spans'].append(record)
+            record = dict(run['fields'], app=run['app'], **record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, default=str))
+
+
+def timed(name=None, kind='load'):
+    """Decorator recording a span, with the result's payload size, around each call."""
+    def decorator(func):
+        span_name = name or getattr(func, '__name__', 'call')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind) as record:
+                result = func(*args, **kwargs)
+                record['payload_bytes'] = payload_size(result)
+            return result
+        return wrapper
+    return decorator
+
+
+class Traced:
+    """Proxy recording a span around each call of the named methods of ``target``.
+
+    Args:
+        target: Object to wrap, e.g. a query backend.
+        methods (list): Method names to trace; other attributes pass through.
+        kind (str): Span kind.
+        label (callable): Optional ``label(*args, **kwargs) -> str`` naming each span.
+    """
+
+    def __init__(self, target, methods, kind='aggregate', label=None):
+        self._target = target
+        self._methods = set(methods)
+        self._kind = kind
+        self._label = label
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in self._methods:
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            label = self._label(*args, **kwargs) if self._label else f'{type(self._target).__name__}.{name}'
+            with span(label, self._kind) as record:
+                result = attr(*args, **kwargs)
+                record['payload_bytes'] = payload_size(result)
+            return result
+        return call
+
+
+def _trace_points(trace):
+    for attr in ('x', 'y', 'values', 'z'):
+        values = getattr(trace, attr, None)
+        if values is not None:
+            return len(values)
+    return 0
+
+
+def plotly_chart(fig, **kwargs):
+    """``st.plotly_chart`` inside a span named after the figure title.
+
+    Records the number of plotted points; with the debug panel open, also the
+    size of the serialized figure.
+    """
+    title = fig.layout.title.text or 'chart'
+    points = sum(_trace_points(trace) for trace in fig.data)
+    with span(title, 'chart', points=points) as record:
+        run = _run.get()
+        if run is not None and run['detailed']:
+            record['payload_bytes'] = len(fig.to_json())
+        return st.plotly_chart(fig, **kwargs)
+
+
+def render_panel():
+    """Draw the opt-in 'Performance' panel in the sidebar and log the run total."""
+    run = _run.get()
+    if run is None:
+        return
+    total_ms = round((time.perf_counter() - run['start']) * 1000, 3)
+    with span('script', 'run', total_ms=total_ms):
+        pass
+    if not st.sidebar.checkbox('🛠️ Performance panel', key=PANEL_KEY,
+                               help='Show timing, payload size and memory change per load, aggregation and chart'):
+        return
+    with st.sidebar.expander('⏱️ Timings for this run', expanded=True):
+        st.metric('Script run', f'{total_ms:,.0f} ms')
+        table = pd.DataFrame(run['spans'][:-1])
+        if table.empty:
+            st.caption('No spans recorded.')
+            return
+        by_kind = table.groupby('kind')['ms'].agg(['count', 'sum']).round(1)
+        st.dataframe(by_kind, use_container_width=True)
+        columns = [c for c in ['span', 'kind', 'ms', 'gap_ms', 'payload_bytes', 'points', 'rss_delta_mb']
+                   if c in table.columns]
+        st.dataframe(table[columns].sort_values('ms', ascending=False), use_container_width=True, hide_index=True)
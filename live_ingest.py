@@ -0,0 +1,228 @@
+"""Append-only live ingestion for the analytics dashboard.
+
+New and updated bookings are written as CSV records to files in a drop
+directory (``DASHBOARD_LIVE_DIR``, ``live_bookings/`` by default). Each file
+is an append-only log: a header line followed by records, one per line.
+Files may be dropped in whole (write to a temporary name, then rename) or
+appended to in place; :class:`LogTail` remembers a byte offset per file and
+parses only the complete lines written since the last poll.
+
+:class:`LiveBookings` holds the shared base selection from the partitioned
+store plus the rows ingested since, and folds each batch of new rows into the
+selection's profile and quantile sketches incrementally. Records carrying a
+``booking_id`` replace any earlier live record with the same id; bookings in
+the base store have no id and are never updated in place. The aggregation
+engine and country index are extended with the new rows' codes and
+bincounts as well. Only a batch that replaces earlier live records, whose
+old values cannot be retracted, rebuilds them (and the live part of the
+profile). Lazy derived columns depend on the whole selection and are
+recomputed on first use after a change.
+
+Once the live records have been merged into ``hotel_bookings.csv`` and the
+store rebuilt, clear the drop directory so they are not counted twice.
+"""
+import copy
+import csv
+import glob
+import io
+import os
+import threading
+
+import pandas as pd
+
+import agg_engine
+import booking_store
+import country_index
+import dataset_profile
+import derived_columns
+import quantile_sketch
+
+LIVE_DIR = os.environ.get('DASHBOARD_LIVE_DIR', 'live_bookings')
+POLL_SECONDS = float(os.environ.get('DASHBOARD_LIVE_POLL_SECONDS', '5'))
+KEY_COLUMN = 'booking_id'
+
+
+class LogTail:
+    """Follows the append-only CSV logs in a drop directory."""
+
+    def __init__(self, directory=LIVE_DIR, pattern='*.csv'):
+        self.directory = directory
+        self.pattern = pattern
+        self.offsets = {}
+        self.headers = {}
+
+    def read_new(self):
+        """Parse the records appended to any log since the last call.
+
+        Returns:
+            pd.DataFrame: New records in log order; empty if there are none.
+        """
+        frames = []
+        for path in sorted(glob.glob(os.path.join(self.directory, self.pattern))):
+            size = os.path.getsize(path)
+            offset = self.offsets.get(path, 0)
+            if size < offset:
+                # Truncated or replaced: read it again from the start
+                offset = 0
+                self.headers.pop(path, None)
+            if size == offset:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(size - offset)
+            # A record still being written has no trailing newline yet; leave it for the next poll
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                continue
+            self.offsets[path] = offset + end
+            chunk = chunk[:end]
+            if path not in self.headers:
+                header, _, chunk = chunk.partition(b'\n')
+                self.headers[path] = next(csv.reader([header.decode('utf-8').strip()]))
+            if chunk.strip():
+                frames.append(pd.read_csv(io.BytesIO(chunk), names=self.headers[path], header=None))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+
+class LiveBookings:
+    """A store selection plus the live records ingested for it.
+
+    Exposes the same views as the dashboard's cached static selection:
+    ``frame``, ``profile()``, ``sketch_index()``, ``agg_engine()``,
+    ``country_index()`` and ``derived_column(name)``.
+    """
+
+    def __init__(self, base, base_profile, hotels=(), years=(), tail=None):
+        """
+        Args:
+            base (pd.DataFrame): Read-only bookings for the selection.
+            base_profile (dataset_profile.DatasetProfile): Profile of ``base``.
+            hotels (tuple): Selected hotels; empty means all.
+            years (tuple): Selected arrival years; empty means all.
+            tail (LogTail): Source of new records, the default drop directory if omitted.
+        """
+        self.base = base
+        self.base_profile = base_profile
+        self.hotels = tuple(hotels)
+        self.years = tuple(years)
+        self.tail = tail or LogTail()
+        self.live = pd.DataFrame(columns=base.columns)
+        self.seq = 0
+        self._profile = base_profile
+        self._sketches = None
+        self._frame = None
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _select(self, rows):
+        rows = booking_store.prepare_bookings(rows)
+        if self.hotels and 'hotel' in rows.columns:
+            rows = rows[rows['hotel'].isin(self.hotels)]
+        if self.years and 'arrival_date_year' in rows.columns:
+            rows = rows[rows['arrival_date_year'].isin(self.years)]
+        columns = list(self.base.columns) + ([KEY_COLUMN] if KEY_COLUMN in rows.columns else [])
+        return rows.reindex(columns=columns).reset_index(drop=True)
+
+    def poll(self):
+        """Ingest any new records and fold them into the cached aggregates.
+
+        Safe to call from several sessions at once; each record is ingested once.
+
+        Returns:
+            int: Number of records ingested for this selection.
+        """
+        with self._lock:
+            new = self.tail.read_new()
+            if new.empty:
+                return 0
+            new = self._select(new)
+            if new.empty:
+                return 0
+
+            replaced = False
+            if KEY_COLUMN in new.columns:
+                new = new.drop_duplicates(KEY_COLUMN, keep='last')
+                if KEY_COLUMN in self.live.columns:
+                    stale = self.live[KEY_COLUMN].isin(new[KEY_COLUMN].dropna())
+                    replaced = bool(stale.any())
+                    self.live = self.live[~stale]
+            self.live = pd.concat([self.live, new], ignore_index=True) if len(self.live) else new
+
+            new_rows = new[self.base.columns]
+            if replaced:
+                # Sketches cannot retract values, so updates rebuild them; the profile is re-merged
+                self._profile = self.base_profile.merge(
+                    dataset_profile.DatasetProfile.from_frame(self.live[self.base.columns]))
+                self._sketches = None
+                self._frame = None
+                self._memo = {}
+            else:
+                self._profile = self._profile.merge(dataset_profile.DatasetProfile.from_frame(new_rows))
+                self._append(new_rows)
+            self.seq += 1
+            return len(new)
+
+    def _append(self, new_rows):
+        # Extend the frame once and fold the new rows into everything built on it
+        if self._frame is None:
+            self._sketches = None
+            self._memo = {}
+            return
+        frame = pd.concat([self._frame, new_rows], ignore_index=True)
+        # Extended copies: sessions still rendering the previous version keep a consistent view
+        if self._sketches is not None:
+            self._sketches = copy.copy(self._sketches).append(new_rows, df=frame)
+        memo = {}
+        engine = self._memo.get('agg_engine')
+        if engine is not None:
+            engine = memo['agg_engine'] = copy.copy(engine).append(new_rows, df=frame)
+            index = self._memo.get('country_index')
+            if index is not None:
+                memo['country_index'] = copy.copy(index).append(new_rows, codes=engine.codes('country'), df=frame)
+        # Lazy derived columns depend on the whole selection (e.g. its lead time range)
+        self._memo = memo
+        self._frame = frame
+
+    @property
+    def live_rows(self):
+        return len(self.live)
+
+    @property
+    def frame(self):
+        """Base and live bookings as one frame, rebuilt once per change."""
+        frame = self._frame
+        if frame is None:
+            frame = self.base
+            if len(self.live):
+                frame = pd.concat([self.base, self.live[self.base.columns]], ignore_index=True)
+            self._frame = frame
+        return frame
+
+    def profile(self):
+        return self._profile
+
+    def sketch_index(self):
+        with self._lock:
+            if self._sketches is None:
+                self._sketches = quantile_sketch.SketchIndex(self.frame)
+            return self._sketches
+
+    def _memoized(self, key, build):
+        # Cleared on every change, so nothing built for an older version is kept alive
+        memo = self._memo
+        if key not in memo:
+            memo[key] = build()
+        return memo[key]
+
+    def agg_engine(self):
+        return self._memoized('agg_engine', lambda: agg_engine.AggregationEngine(self.frame))
+
+    def country_index(self):
+        engine = self.agg_engine()
+        return self._memoized(
+            'country_index', lambda: country_index.CountryIndex(engine.df, codes=engine.codes('country')))
+
+    def derived_column(self, name):
+        return self._memoized(('derived', name), lambda: derived_columns.compute(self.frame, name))
@@ -0,0 +1,346 @@
+"""Process-wide metrics in Prometheus text format.
+
+A small registry of counters, gauges and histograms for the apps' hot paths:
+model load time, forecast latency per model, cache hit ratios, dataset load
+time, rows scanned per rerun and active sessions. :func:`start_server`
+serves them at ``http://127.0.0.1:<port>/metrics`` from a daemon thread, once
+per process. Each app has its own default port (see ``DEFAULT_PORTS``);
+``DASHBOARD_METRICS_PORT`` overrides it and ``0`` disables the endpoint.
+
+To check locally, run an app and ``curl http://127.0.0.1:9464/metrics``.
+"""
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get('DASHBOARD_METRICS_HOST', '127.0.0.1')
+DEFAULT_PORTS = {'dashboard': 9464, 'sarimax_app': 9465, 'prophet_app': 9466}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SESSION_TIMEOUT = 300
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    """Base for a metric family with optional labels."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labels):
+        """Return the child for one combination of label values."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f'{self.name} has labels {self.labelnames}; use .labels(...)')
+        return self.labels()
+
+    def collect(self):
+        """Yield exposition lines for this family."""
+        yield f'# HELP {self.name} {_escape(self.documentation)}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(self.name, self.labelnames, key)
+
+
+class _Value:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labelnames, key):
+        yield f'{name}{_format_labels(labelnames, key)} {_format_value(self.get())}'
+
+    def get(self):
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeValue(_Value):
+    def __init__(self):
+        super().__init__()
+        self._function = None
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Compute the value with ``function()`` at scrape time."""
+        self._function = function
+
+    def get(self):
+        return float(self._function()) if self._function is not None else self._value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time of a block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labelnames, key):
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f'{name}_bucket{_format_labels(labelnames, key, [("le", _format_value(bound))])} {cumulative}'
+        yield f'{name}_bucket{_format_labels(labelnames, key, [("le", "+Inf")])} {count}'
+        yield f'{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}'
+        yield f'{name}_count{_format_labels(labelnames, key)} {count}'
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        """The whole registry in Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.collect()]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+MODEL_LOAD_SECONDS = Histogram(
+    'prohotelytics_model_load_seconds', 'Time to load a forecasting model from disk.', ['model'])
+FORECAST_SECONDS = Histogram(
+    'prohotelytics_forecast_seconds', 'Forecast latency per model.', ['model'])
+CACHE_REQUESTS = Counter(
+    'prohotelytics_cache_requests_total', 'Cached loader calls by result (hit or miss).', ['cache', 'result'])
+DATASET_LOAD_SECONDS = Histogram(
+    'prohotelytics_dataset_load_seconds', 'Time to publish or attach booking data (cache misses only).', ['stage'])
+ROWS_SCANNED = Histogram(
+    'prohotelytics_rows_scanned', 'Booking rows in the selection read by each rerun.', ['app'],
+    buckets=(1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6, 1e7))
+RERUNS = Counter('prohotelytics_reruns_total', 'Script reruns.', ['app'])
+ACTIVE_SESSIONS = Gauge(
+    'prohotelytics_active_sessions', f'Sessions that reran within the last {SESSION_TIMEOUT} seconds.', ['app'])
+
+_cache_state = threading.local()
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def track_cache(name, cache):
+    """Apply a Streamlit cache decorator and count its hits and misses.
+
+    Usage: ``@metrics.track_cache('load_data', st.cache_resource(max_entries=32))``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            _cache_state.miss = True
+            return func(*args, **kwargs)
+        cached = cache(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            outer, _cache_state.miss = getattr(_cache_state, 'miss', False), False
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                CACHE_REQUESTS.labels(cache=name, result='miss' if _cache_state.miss else 'hit').inc()
+                _cache_state.miss = outer
+        call.clear = cached.clear
+        return call
+    return decorator
+
+
+def _count_sessions(app):
+    cutoff = time.monotonic() - SESSION_TIMEOUT
+    with _sessions_lock:
+        for key in [key for key, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[key]
+        return sum(1 for session_app, _ in _sessions if session_app == app)
+
+
+def record_rerun(app, rows=None):
+    """Count a script rerun of ``app`` and mark the current session active."""
+    RERUNS.labels(app=app).inc()
+    if rows is not None:
+        ROWS_SCANNED.labels(app=app).observe(rows)
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    if ctx is not None:
+        with _sessions_lock:
+            _sessions[(app, ctx.session_id)] = time.monotonic()
+    ACTIVE_SESSIONS.labels(app=app).set_function(functools.partial(_count_sessions, app))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_failed_port = None
+_server_lock = threading.Lock()
+
+
+def start_server(app, port=None, host=METRICS_HOST):
+    """Serve the registry on a local port from a daemon thread, once per process.
+
+    A port that could not be bound is not retried on later calls (every
+    Streamlit rerun calls this), so the warning is logged once per process.
+
+    Returns:
+        int: The port being served, or None if disabled or the port is taken.
+    """
+    global _server, _failed_port
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        if _failed_port is not None:
+            return None
+        if port is None:
+            port = int(os.environ.get('DASHBOARD_METRICS_PORT', DEFAULT_PORTS.get(app, 9464)))
+        if port == 0:
+            return None
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            _failed_port = port
+            logger.warning('Metrics endpoint not started on %s:%s: %s', host, port, e)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        return port
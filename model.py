@@ -3,6 +3,13 @@ import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import plotly.express as px
+import os
+import calendar_features
+import forecast_charts
+import forecast_fleet
+import instrumentation
+import metrics
+import scenarios
 
 # Try to import required packages with error handling
 try:
@@ -25,6 +32,9 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+instrumentation.start_run('prophet_app')
+metrics.start_server('prophet_app')
+metrics.record_rerun('prophet_app')
 
 
 # Enhanced CSS with cleaner dark styling (similar to second dashboard)
@@ -347,14 +357,20 @@ st.markdown("Visit the [Analytics Dashboard](https://prohotelyticsdashboard.stre
 st.sidebar.markdown('<div class="sidebar-header"> Forecast Configuration</div>', unsafe_allow_html=True)
 
 # Load model
-@st.cache_resource
-def load_prophet_model():
+@instrumentation.timed()
+@metrics.track_cache('load_prophet_model', st.cache_resource)
+def load_prophet_model(modified=None):
+    # `modified` keys the cache, so a model rewritten by prophet_retrain is picked up
     try:
         model_files = ["prophetmodel.joblib", "prophet_model.joblib", "model.joblib"]
         
         for model_file in model_files:
             try:
-                model = joblib.load(model_file)
+                with metrics.MODEL_LOAD_SECONDS.labels(model='prophet').time():
+                    model = joblib.load(model_file)
+                # Seasonality and holiday features are sliced from a shared cache instead of rebuilt per predict
+                if hasattr(model, 'seasonalities'):
+                    calendar_features.attach(model)
                 # st.sidebar.success(f"✅ Model loaded: {model_file}")
                 return model
             except FileNotFoundError:
@@ -375,7 +391,9 @@ def load_prophet_model():
         st.error(f"❌ Model loading error: {e}")
         return None
 
-model = load_prophet_model()
+model = load_prophet_model(
+    os.path.getmtime("prophetmodel.joblib") if os.path.exists("prophetmodel.joblib") else None
+)
 
 if model is None:
     st.stop()
@@ -441,7 +459,9 @@ if forecast_button or 'forecast_generated' not in st.session_state:
     # Generate forecast
     with st.spinner("🔮 Generating intelligent forecast..."):
         try:
-            forecast = model.predict(future_df)
+            with instrumentation.span('Prophet predict', 'model', steps=len(future_df)), \
+                    metrics.FORECAST_SECONDS.labels(model='prophet').time():
+                forecast = model.predict(future_df)
             
             # Extract predictions
             predictions = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
@@ -516,80 +536,19 @@ if 'predictions' in st.session_state:
     st.markdown('<h2 class="section-header">📈 Interactive Forecast Visualization</h2>', unsafe_allow_html=True)
     
     
-    # Create chart
-    fig = go.Figure()
-    
-    # Color schemes
-    color_schemes = {
-        "Luxury Gold": {"main": "#FFD700", "confidence": "rgba(255, 215, 0, 0.15)"},
-        "Emerald Premium": {"main": "#50C878", "confidence": "rgba(80, 200, 120, 0.15)"},
-        "Coral Elegance": {"main": "#FF6B6B", "confidence": "rgba(255, 107, 107, 0.15)"},
-        "Teal Sophistication": {"main": "#14B8A6", "confidence": "rgba(20, 184, 166, 0.15)"}
-    }
-    
-    colors = color_schemes[chart_style]
-    
-    # Add confidence interval if enabled
-    if show_confidence:
-        fig.add_trace(go.Scatter(
-            x=predictions['Date'],
-            y=predictions['Upper_CI'],
-            fill=None,
-            mode='lines',
-            line_color='rgba(0,0,0,0)',
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=predictions['Date'],
-            y=predictions['Lower_CI'],
-            fill='tonexty',
-            mode='lines',
-            line_color='rgba(0,0,0,0)',
-            name='95% Confidence Interval',
-            fillcolor=colors["confidence"]
-        ))
-    
-    # Add main prediction line
-    fig.add_trace(go.Scatter(
-        x=predictions['Date'],
-        y=predictions['Prediction'],
-        mode='lines+markers',
+    # Cached template per chart style; only the trace data is swapped in, decimated for long horizons
+    fig = forecast_charts.forecast_figure(
+        predictions['Date'],
+        predictions['Prediction'],
+        f'Hotel Guest Demand Forecast ({start_date.strftime("%b %d")} - {end_date.strftime("%b %d, %Y")})',
+        style=forecast_charts.STYLES[chart_style],
+        lower=predictions['Lower_CI'] if show_confidence else None,
+        upper=predictions['Upper_CI'] if show_confidence else None,
         name='Demand Forecast',
-        line=dict(color=colors["main"], width=4, shape='spline'),
-        marker=dict(size=8, color=colors["main"], line=dict(width=2, color='rgba(255,255,255,0.8)')),
-        hovertemplate='<b>%{x|%B %d, %Y}</b><br>Predicted Demand: <b>%{y:.0f} guests</b><extra></extra>'
-    ))
-    
-    # Update layout for dark theme
-    fig.update_layout(
-        title={
-            'text': f'Hotel Guest Demand Forecast ({start_date.strftime("%b %d")} - {end_date.strftime("%b %d, %Y")})',
-            'x': 0.5,
-            'font': {'size': 20, 'color': '#ffffff', 'family': 'Inter'}
-        },
-        xaxis_title="Date",
-        yaxis_title="Number of Guests",
-        hovermode='x unified',
-        height=500,
-        template='plotly_dark',
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1,
-            font=dict(color='#ffffff')
-        ),
-        paper_bgcolor='rgba(26, 26, 26, 0.9)',
-        plot_bgcolor='rgba(45, 45, 45, 0.9)',
-        xaxis=dict(gridcolor='rgba(255, 255, 255, 0.1)', color='#ffffff'),
-        yaxis=dict(gridcolor='rgba(255, 255, 255, 0.1)', color='#ffffff')
+        hover='<b>%{x|%B %d, %Y}</b><br>Predicted Demand: <b>%{y:.0f} guests</b>'
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    instrumentation.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Detailed forecast table
@@ -683,6 +642,18 @@ Model: Facebook Prophet Time Series Forecasting
             <p><strong>Average on {peak_day}:</strong> {day_avg.max():.0f} guests</p>
         </div>
         """, unsafe_allow_html=True)
+    
+    # Probability of exceeding a capacity over the selected period, from simulated demand paths
+    try:
+        scenarios.render_capacity_section('prophet', start_date, end_date)
+    except Exception as e:
+        st.error(f"❌ Error simulating demand scenarios: {e}")
+    
+    # Per hotel, segment and channel forecasts, when a fleet has been trained
+    try:
+        forecast_fleet.render_fleet_section('prophet', start_date, end_date, style=forecast_charts.STYLES[chart_style])
+    except Exception as e:
+        st.error(f"❌ Error loading fleet forecasts: {e}")
 
 # Footer
 st.markdown("---")
@@ -693,4 +664,6 @@ st.markdown(f"""
     <p style="color: #cccccc;">📊 Built with Streamlit & Python | ⚡ Optimized for Performance</p>
     <p style="color: #999999; font-size: 0.9rem;">Last Updated: {datetime.now().strftime('%B %Y')}</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+instrumentation.render_panel()
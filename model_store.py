@@ -0,0 +1,35 @@
+"""Saving fitted models without ever exposing a half-written file.
+
+The apps load ``model.joblib``, ``prophetmodel.joblib`` and the fleet
+registries while the updaters replace them. :func:`save_model` writes to a
+temporary file in the same directory and renames it over the original, so a
+reader sees either the old model or the new one.
+"""
+import os
+import tempfile
+
+import joblib
+
+
+def save_model(model, path):
+    """Write ``model`` to ``path`` atomically.
+
+    Returns:
+        str: ``path``.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.model-', suffix='.joblib.tmp', dir=directory)
+    try:
+        # mkstemp creates the file private; keep the permissions of the model being replaced
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(model, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
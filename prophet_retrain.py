@@ -0,0 +1,238 @@
+"""Warm-started retraining of the Prophet model on newly appended days.
+
+:func:`retrain` fits a copy of the served model, with the same settings, on
+its history plus the new days. When only a few days were added, the Stan
+optimiser starts from the previous fit's parameters (``k``, ``m``,
+``delta``, ``beta``, ``sigma_obs``) instead of Prophet's defaults. The
+report gives the fit time, the log posterior and how far each parameter
+drifted; with ``compare`` it also times a cold fit on the same history.
+
+Prophet fits in scaled units: ``y`` is divided by ``y_scale`` and time is
+measured as a fraction of the history's span. Appending days can change
+both, so the previous parameters are converted to the new scales
+(:func:`rescaled_parameters`) before they are used or compared.
+
+Three things make the warm start converge rather than stall:
+
+- The previous changepoints are kept. A fit places them over the first 80%
+  of its history, so on a longer history they would move and the previous
+  ``delta`` would describe other dates. Kept changepoints never fall in the
+  new days, though, so once ``MAX_WARM_DAYS`` days in total have been added
+  since the last cold fit, the next retrain is cold and places them again.
+- Most ``delta`` sit on the kink of their Laplace prior, where the gradient
+  jumps by ``2 / changepoint_prior_scale``. They start a small step off it
+  (:func:`warm_start`); from the kink itself the line search fails at once.
+- The warm fit uses BFGS. L-BFGS stops within a few iterations of the
+  start, short of the optimum.
+
+On the daily guest history, a warm start from a converged fit reaches the
+optimum in about 20 BFGS iterations where a cold BFGS fit takes about 170
+(roughly 90 ms against 175 ms, most of it cmdstan's start-up). Prophet's
+default cold fit (L-BFGS) is about as fast but often stops well short of the
+optimum on this history, and sometimes falls back to Newton for seconds.
+The shipped model is such a stopped-short fit, so the first warm retrain
+from it takes longer (0.25-0.35 s); weekly retrains after that take
+0.1-0.2 s. For appends longer than ``MAX_WARM_DAYS`` the optimum moves far
+enough that a cold fit is quicker, and a warm fit that fails falls back to
+a cold one. The days added since the last cold fit are kept on the model as
+``warm_days``, so the count survives saving and loading it.
+
+Usage:
+    python prophet_retrain.py --bookings hotel_bookings.csv
+    python prophet_retrain.py --bookings hotel_bookings.csv --compare --dry-run
+    python prophet_retrain.py --bookings hotel_bookings.csv --cold
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from prophet.diagnostics import prophet_copy
+
+import guest_series
+import model_store
+
+MODEL_PATH = 'prophetmodel.joblib'
+PARAMETERS = ['k', 'm', 'delta', 'beta', 'sigma_obs']
+# Longer appends are fitted cold (see the module docstring)
+MAX_WARM_DAYS = 14
+# Deltas start at least this fraction of changepoint_prior_scale away from zero
+KINK_OFFSET = 1e-3
+WARM_ALGORITHM = 'BFGS'
+
+
+def extended_history(model, observations):
+    """The model's history with the ``observations`` after its last date appended.
+
+    Days already in the history keep their values: a bookings file with only
+    the latest records would otherwise replace them with partial totals.
+
+    Returns:
+        pd.DataFrame: Columns ``ds`` and ``y``, sorted by date.
+    """
+    history = model.history[['ds', 'y']]
+    new = pd.DataFrame({'ds': pd.DatetimeIndex(observations.index), 'y': np.asarray(observations, dtype=np.float64)})
+    new = new[new['ds'] > history['ds'].max()]
+    return pd.concat([history, new], ignore_index=True).sort_values('ds', ignore_index=True)
+
+
+def rescaled_parameters(model, history):
+    """The previous model's parameters, converted to the scales of ``history``.
+
+    Args:
+        model (Prophet): The fitted previous model.
+        history (pd.DataFrame): Training frame with ``ds`` and ``y``.
+
+    Returns:
+        dict: Parameters in the units a fit on ``history`` uses.
+    """
+    # An unfitted copy computes y_scale and t_scale exactly as fit() will
+    new_model = prophet_copy(model)
+    new_model.setup_dataframe(history.copy(), initialize_scales=True)
+    y_ratio = model.y_scale / new_model.y_scale
+    t_ratio = new_model.t_scale / model.t_scale
+    params = {name: np.asarray(model.params[name][0], dtype=np.float64) for name in PARAMETERS}
+    # Additive seasonality and holidays are in scaled y; multiplicative ones are relative to the trend
+    additive = model.train_component_cols['additive_terms'].to_numpy() == 1
+    return {
+        # Slopes are per unit of scaled time and scaled y; the intercept only per scaled y
+        'k': float(params['k'][0] * y_ratio * t_ratio),
+        'm': float(params['m'][0] * y_ratio),
+        'delta': params['delta'] * y_ratio * t_ratio,
+        'beta': np.where(additive, params['beta'] * y_ratio, params['beta']),
+        'sigma_obs': float(params['sigma_obs'][0] * y_ratio),
+    }
+
+
+def warm_start(model, history):
+    """Initial values for a warm fit on ``history``.
+
+    The previous parameters from :func:`rescaled_parameters`, with every
+    ``delta`` moved at least ``KINK_OFFSET * changepoint_prior_scale`` off
+    zero, keeping its sign.
+
+    Returns:
+        dict: Initial values for ``Prophet.fit(..., init=...)``.
+    """
+    init = rescaled_parameters(model, history)
+    offset = KINK_OFFSET * model.changepoint_prior_scale
+    delta = init['delta']
+    init['delta'] = np.where(np.abs(delta) < offset, np.where(delta < 0, -offset, offset), delta)
+    return init
+
+
+def _warm_copy(model):
+    new_model = prophet_copy(model)
+    # The previous deltas belong to the previous changepoints
+    new_model.changepoints = model.changepoints.copy()
+    new_model.n_changepoints = len(model.changepoints)
+    # A failed warm fit is retried cold by retrain, not with Prophet's slow Newton fallback
+    new_model.stan_backend.newton_fallback = False
+    return new_model
+
+
+def log_prob(model):
+    """Log posterior at the fitted parameters."""
+    return float(model.params['lp__'][0][0])
+
+
+def parameter_drift(previous, model):
+    """How far each parameter moved from the previous model's.
+
+    Args:
+        previous (dict): Previous parameters from :func:`rescaled_parameters`.
+        model (Prophet): The retrained model.
+
+    Returns:
+        pd.DataFrame: Per parameter, the largest absolute change and the
+        change relative to the previous value's norm.
+    """
+    rows = []
+    for name in PARAMETERS:
+        before = np.atleast_1d(previous[name])
+        after = np.asarray(model.params[name][0], dtype=np.float64)
+        if before.shape != after.shape:
+            rows.append({'parameter': name, 'max_abs_change': np.nan, 'relative_change': np.nan})
+            continue
+        change = after - before
+        norm = np.linalg.norm(before)
+        rows.append({
+            'parameter': name,
+            'max_abs_change': float(np.abs(change).max()),
+            'relative_change': float(np.linalg.norm(change) / norm) if norm else np.nan,
+        })
+    return pd.DataFrame(rows).set_index('parameter')
+
+
+def retrain(model, observations, warm=True, compare=False):
+    """Fit a copy of ``model`` on its history plus ``observations``.
+
+    Args:
+        model (Prophet): The fitted previous model.
+        observations (pd.Series): Daily guests by date. Only dates after the
+            model's history are used.
+        warm (bool): Start from the previous parameters when at most
+            ``MAX_WARM_DAYS`` days were added since the last cold fit. With
+            False, or past that, the fit starts from Prophet's defaults.
+        compare (bool): Also time a cold fit on the same history.
+
+    Returns:
+        tuple: ``(new_model, report)``. The report holds the days added, the
+        fit (``'warm'``, ``'cold'``, or ``'cold after warm failed'``), the
+        days added since the last cold fit (``warm_days``), its time in
+        seconds and log posterior, and the parameter drift frame;
+        with ``compare`` also ``cold_seconds`` and ``cold_log_prob``.
+    """
+    history = extended_history(model, observations)
+    added = int(len(history) - len(model.history))
+    previous = rescaled_parameters(model, history)
+    fit, new_model = 'cold', None
+    start = time.perf_counter()
+    # Models fitted before warm retraining have no count; they were fitted cold
+    warm_days = getattr(model, 'warm_days', 0) + added
+    if warm and warm_days <= MAX_WARM_DAYS:
+        try:
+            new_model = _warm_copy(model).fit(history, init=warm_start(model, history), algorithm=WARM_ALGORITHM)
+            fit = 'warm'
+        except RuntimeError:
+            fit = 'cold after warm failed'
+    if new_model is None:
+        new_model = prophet_copy(model).fit(history)
+        warm_days = 0
+    new_model.warm_days = warm_days
+    report = {
+        'added': added,
+        'fit': fit,
+        'warm_days': warm_days,
+        'fit_seconds': time.perf_counter() - start,
+        'log_prob': log_prob(new_model),
+        'drift': parameter_drift(previous, new_model),
+    }
+    if compare:
+        start = time.perf_counter()
+        cold = prophet_copy(model).fit(history)
+        report['cold_seconds'] = time.perf_counter() - start
+        report['cold_log_prob'] = log_prob(cold)
+    return new_model, report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Retrain the Prophet model on its history plus new bookings.')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings with the hotel_bookings.csv columns')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--cold', action='store_true', help="Fit from Prophet's defaults, not the previous fit")
+    parser.add_argument('--compare', action='store_true', help='Also time a cold fit on the same history')
+    parser.add_argument('--dry-run', action='store_true', help='Report only; do not overwrite the model')
+    args = parser.parse_args()
+    previous = joblib.load(args.model)
+    retrained, summary = retrain(previous, guest_series.daily_guests(pd.read_csv(args.bookings)),
+                                 warm=not args.cold, compare=args.compare)
+    print(f"{summary['fit'].capitalize()} fit with {summary['added']} new days "
+          f"({summary['warm_days']} since the last cold fit): "
+          f"{summary['fit_seconds']:.2f} s, log posterior {summary['log_prob']:.2f}")
+    if args.compare:
+        print(f"Cold fit: {summary['cold_seconds']:.2f} s, log posterior {summary['cold_log_prob']:.2f}")
+    print(summary['drift'].to_string(float_format='{:.4g}'.format))
+    if not args.dry_run:
+        model_store.save_model(retrained, args.model)
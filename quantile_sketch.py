@@ -0,0 +1,219 @@
+"""Mergeable quantile sketches for medians, percentiles and box plots.
+
+:class:`KLLSketch` is a KLL sketch (Karnin, Lang & Liberty, 2016) with
+vectorized NumPy updates. It keeps a few hundred items regardless of how many
+values it has seen, answers any quantile with a normalized rank error of
+roughly ``1.7 / k`` (about 1% at the default ``k=200``), and can be updated
+incrementally or merged with other sketches. Count, mean, standard deviation,
+min and max are tracked exactly alongside the sketch.
+
+:class:`SketchIndex` builds one sketch per numeric column of a frame when it
+is loaded, plus per-group sketches on first request, so the dashboard can
+draw ``describe()`` tables, medians and box plots without sorting full
+columns on every rerun.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 200
+_CAPACITY_DECAY = 2.0 / 3.0
+_DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+class KLLSketch:
+    """Approximate quantiles of a stream of numbers in bounded memory."""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        """Approximate normalized rank error bound of :meth:`quantile`."""
+        return 1.7 / self.k
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def copy(self):
+        """An independent copy; updating it leaves this sketch unchanged."""
+        return copy.deepcopy(self)
+
+    def update(self, values):
+        """Add a batch of values; NaNs are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.sum_sq += float(np.dot(values, values))
+        self.min = float(np.fmin(self.min, values.min()))
+        self.max = float(np.fmax(self.max, values.max()))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch and return ``self``."""
+        if other.count == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = float(np.fmin(self.min, other.min))
+        self.max = float(np.fmax(self.max, other.max))
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays at this level so the promoted half has even weight
+                keep, items = items[:items.size % 2], items[items.size % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lvl.size, 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Return approximate quantiles for each ``q`` in ``qs`` (0 and 1 are exact)."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items, cum_weights = self._weighted_items()
+        targets = qs * cum_weights[-1]
+        idx = np.minimum(np.searchsorted(cum_weights, targets, side='left'), items.size - 1)
+        result = items[idx]
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def mean(self):
+        return self.sum / self.count if self.count else np.nan
+
+    def std(self):
+        """Sample standard deviation (``ddof=1``), as ``pandas.Series.std``."""
+        if self.count < 2:
+            return np.nan
+        var = (self.sum_sq - self.sum * self.sum / self.count) / (self.count - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+    def describe(self):
+        """Return the same statistics as ``pandas.Series.describe()``."""
+        q25, q50, q75 = self.quantiles([0.25, 0.5, 0.75])
+        return pd.Series(
+            [self.count, self.mean(), self.std(), self.min, q25, q50, q75, self.max],
+            index=_DESCRIBE_INDEX,
+        )
+
+    def box_stats(self):
+        """Quartiles and Tukey fences for a box plot.
+
+        The fences are clipped to the exact min/max; the whiskers therefore end
+        at ``q1 - 1.5 IQR`` / ``q3 + 1.5 IQR`` rather than at the most extreme
+        observation inside them.
+        """
+        q1, median, q3 = self.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        return {
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': max(self.min, q1 - 1.5 * iqr),
+            'upperfence': min(self.max, q3 + 1.5 * iqr),
+        }
+
+
+class SketchIndex:
+    """Column and per-group sketches for a loaded bookings frame."""
+
+    def __init__(self, df, k=DEFAULT_K):
+        self.df = df
+        self.k = k
+        self.columns = {
+            col: KLLSketch(k).update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            for col in df.select_dtypes(include=[np.number]).columns
+        }
+        self._groups = {}
+
+    def describe(self, columns=None):
+        """Sketch-based equivalent of ``df[columns].describe()``."""
+        columns = list(self.columns) if columns is None else columns
+        return pd.DataFrame({col: self.columns[col].describe() for col in columns})
+
+    def group_sketches(self, by, column):
+        """Return ``{group_key: KLLSketch}`` for ``column`` grouped by ``by``, built once."""
+        key = (by, column)
+        if key not in self._groups:
+            self._groups[key] = self._build_groups(self.df, by, column)
+        return self._groups[key]
+
+    def _build_groups(self, df, by, column):
+        codes, uniques = pd.factorize(df[by], sort=True)
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return {
+            uniques[i]: KLLSketch(self.k).update(values[order[bounds[i]:bounds[i + 1]]])
+            for i in range(len(uniques))
+        }
+
+    def group_quantile(self, by, column, q=0.5):
+        """Per-group quantile as a frame shaped like ``groupby(by)[column].quantile(q).reset_index()``."""
+        sketches = self.group_sketches(by, column)
+        result = pd.DataFrame({
+            by: list(sketches),
+            column: [sketch.quantile(q) for sketch in sketches.values()],
+        })
+        # Groups first seen in appended rows land at the end of the dict
+        return result.sort_values(by, ignore_index=True)
+
+    def append(self, new_rows, df=None):
+        """Fold newly appended rows into every sketch built so far.
+
+        ``df`` is the extended frame, if the caller already built it. Updated
+        sketches are copies in new dicts, so ``copy.copy(index).append(...)``
+        leaves the original index, and anyone reading it, untouched.
+        """
+        columns = {}
+        for col, sketch in self.columns.items():
+            if col in new_rows.columns:
+                sketch = sketch.copy().update(new_rows[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            columns[col] = sketch
+        groups = {}
+        for (by, column), sketches in list(self._groups.items()):
+            sketches = dict(sketches)
+            for group, sketch in self._build_groups(new_rows, by, column).items():
+                sketches[group] = sketches[group].copy().merge(sketch) if group in sketches else sketch
+            groups[(by, column)] = sketches
+        self.columns, self._groups = columns, groups
+        self.df = df if df is not None else pd.concat([self.df, new_rows], ignore_index=True)
+        return self
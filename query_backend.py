@@ -0,0 +1,161 @@
+"""Pluggable aggregation backends for the analytics dashboard.
+
+Dashboard pages describe the aggregate they need as an :class:`AggSpec`
+(group-by columns plus named measures) and hand it to a backend, instead of
+writing ``groupby().agg()`` calls inline. Two backends are provided:
+
+- ``duckdb``: runs the aggregate as SQL in an embedded, multi-threaded DuckDB
+  engine, scanning the pandas frame in place.
+- ``pandas``: the original single-threaded ``groupby().agg()`` path, used as
+  the fallback when DuckDB is not installed.
+
+The backend is chosen with the ``DASHBOARD_QUERY_BACKEND`` environment variable
+(``auto``, ``duckdb`` or ``pandas``); ``auto`` prefers DuckDB when available.
+"""
+import os
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+AGG_FUNCS = ('count', 'size', 'sum', 'mean', 'median', 'min', 'max')
+
+
+@dataclass(frozen=True)
+class AggSpec:
+    """A grouped aggregate request.
+
+    Attributes:
+        by (tuple): Columns to group by.
+        measures (tuple): ``(output_name, column, func)`` triples, where
+            ``func`` is one of :data:`AGG_FUNCS`.
+    """
+    by: tuple
+    measures: tuple
+
+    def __post_init__(self):
+        for _, _, func in self.measures:
+            if func not in AGG_FUNCS:
+                raise ValueError(f"Unsupported aggregation '{func}', expected one of {AGG_FUNCS}")
+
+
+def summary_spec(by, columns, with_stay=True):
+    """Build the standard booking summary used by the segment/customer/country/month tables.
+
+    Measures whose source column is missing fall back to a booking count, as the
+    dashboard has always done.
+    """
+    def measure(name, column):
+        return (name, column, 'mean') if column in columns else (name, 'hotel', 'count')
+
+    measures = [
+        ('Total_Bookings', 'hotel', 'count'),
+        measure('Cancellation_Rate', 'is_canceled'),
+        measure('Avg_ADR', 'adr'),
+        measure('Avg_Lead_Time', 'lead_time'),
+    ]
+    if with_stay:
+        measures.append(measure('Avg_Stay_Duration', 'total stayed'))
+    return AggSpec(by=(by,), measures=tuple(measures))
+
+
+def single_spec(by, column, func, name=None):
+    """Build a spec for one measure, named after its column unless ``name`` is given."""
+    by = (by,) if isinstance(by, str) else tuple(by)
+    return AggSpec(by=by, measures=((name or column, column, func),))
+
+
+class PandasBackend:
+    """Evaluate specs with ``DataFrame.groupby().agg()``."""
+    name = 'pandas'
+
+    def aggregate(self, df, spec):
+        named = {name: pd.NamedAgg(column=column, aggfunc=func) for name, column, func in spec.measures}
+        return df.groupby(list(spec.by)).agg(**named).reset_index()
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """Evaluate specs as SQL in an in-process DuckDB engine.
+
+    The pandas frame is registered as a view and scanned in place; DuckDB
+    parallelises the scan and hash aggregation across ``threads`` cores.
+    """
+    name = 'duckdb'
+
+    SQL_FUNCS = {
+        'count': 'COUNT({col})',
+        'size': 'COUNT(*)',
+        'sum': 'SUM({col})',
+        'mean': 'AVG({col})',
+        'median': 'MEDIAN({col})',
+        'min': 'MIN({col})',
+        'max': 'MAX({col})',
+    }
+
+    def __init__(self, threads=None):
+        if duckdb is None:
+            raise ImportError("duckdb is not installed. Please add 'duckdb' to your requirements.txt file.")
+        self._con = duckdb.connect(database=':memory:')
+        self._con.execute(f"SET threads TO {int(threads or os.cpu_count() or 1)}")
+        self._local = threading.local()
+
+    def _cursor(self):
+        # DuckDB connections are not safe to share between Streamlit session threads
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._con.cursor()
+        return cursor
+
+    def to_sql(self, spec, table='bookings'):
+        keys = [_quote(col) for col in spec.by]
+        selects = keys + [
+            self.SQL_FUNCS[func].format(col=_quote(column)) + ' AS ' + _quote(name)
+            for name, column, func in spec.measures
+        ]
+        # pandas drops null group keys and sorts by key; match both
+        where = ' AND '.join(f'{key} IS NOT NULL' for key in keys)
+        key_list = ', '.join(keys)
+        return (f"SELECT {', '.join(selects)} FROM {table} WHERE {where} "
+                f"GROUP BY {key_list} ORDER BY {key_list}")
+
+    def aggregate(self, df, spec):
+        cursor = self._cursor()
+        cursor.register('bookings', df)
+        try:
+            result = cursor.execute(self.to_sql(spec)).df()
+        finally:
+            cursor.unregister('bookings')
+        for name, column, func in spec.measures:
+            if func in ('count', 'size'):
+                result[name] = result[name].astype('int64')
+            elif func == 'sum' and pd.api.types.is_integer_dtype(df[column]):
+                # SUM over integers comes back as HUGEINT/float; keep pandas' integer result
+                result[name] = result[name].astype('int64')
+        return result
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'duckdb': DuckDBBackend,
+}
+
+
+def get_backend(name=None):
+    """Return a backend instance by name, falling back to pandas when DuckDB is unavailable."""
+    name = (name or os.environ.get('DASHBOARD_QUERY_BACKEND', 'auto')).lower()
+    if name == 'auto':
+        name = 'duckdb' if duckdb is not None else 'pandas'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend '{name}', expected one of {sorted(BACKENDS)}")
+    if name == 'duckdb' and duckdb is None:
+        return PandasBackend()
+    return BACKENDS[name]()
@@ -0,0 +1,81 @@
+"""Top-N selection for the dashboard's ranking charts.
+
+Rankings are taken with ``np.argpartition``, which finds the N largest values
+in linear time, and only those N are then sorted. Ties are broken by position
+so results are deterministic. Booking counts come straight from factorized
+codes (see :meth:`agg_engine.AggregationEngine.codes`) via ``np.bincount``, so
+no chart sorts the full bookings frame or a full per-group table.
+"""
+import numpy as np
+import pandas as pd
+
+
+def top_k(values, n, ascending=False):
+    """Positions of the ``n`` largest (or smallest) values, in ranked order.
+
+    NaNs are never selected and ties keep their original order.
+
+    Args:
+        values (array-like): Values to rank.
+        n (int): Number of positions to return.
+        ascending (bool): Select the smallest values instead.
+
+    Returns:
+        np.ndarray: Up to ``n`` positions into ``values``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    keys = values if ascending else -values
+    candidates = np.flatnonzero(~np.isnan(keys))
+    if n <= 0 or candidates.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if candidates.size > n:
+        # Everything tied with the n-th value is a candidate, so tie-breaking stays by position
+        kth = keys[candidates[np.argpartition(keys[candidates], n - 1)[n - 1]]]
+        candidates = candidates[keys[candidates] <= kth]
+    order = np.lexsort((candidates, keys[candidates]))
+    return candidates[order[:n]]
+
+
+def top_counts(codes, uniques, n, name='count', index_name=None):
+    """Most frequent values from factorized codes, like ``value_counts().head(n)``.
+
+    Ties are ordered by first appearance in ``codes``, as ``value_counts`` does.
+
+    Args:
+        codes (np.ndarray): Integer codes, -1 for nulls.
+        uniques (array-like): Value for each code.
+        n (int): Number of values to return.
+        name (str): Name of the returned Series.
+        index_name (str): Name of its index, e.g. the counted column; defaults to ``uniques.name``.
+
+    Returns:
+        pd.Series: Counts indexed by value, most frequent first.
+    """
+    valid = codes[codes >= 0]
+    counts = np.bincount(valid, minlength=len(uniques))
+    # Rank codes in first-seen order so top_k's positional tie-break matches value_counts
+    seen, first = np.unique(valid, return_index=True)
+    order = seen[np.argsort(first, kind='stable')]
+    positions = order[top_k(counts[order], n)]
+    index = pd.Index(np.asarray(uniques)[positions], name=index_name or getattr(uniques, 'name', None))
+    return pd.Series(counts[positions], index=index, name=name)
+
+
+def top_rows(table, column, n, ascending=False, min_count=None, count_column='count'):
+    """Top-``n`` rows of an aggregated table, like ``sort_values(column).head(n)``.
+
+    Args:
+        table (pd.DataFrame): Per-group table, e.g. from :mod:`query_backend`.
+        column (str): Column to rank by.
+        n (int): Number of rows to return.
+        ascending (bool): Rank smallest first.
+        min_count (int): Drop rows whose ``count_column`` is below this first.
+        count_column (str): Column holding the group sizes.
+
+    Returns:
+        pd.DataFrame: The selected rows, in ranked order.
+    """
+    values = table[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    if min_count is not None:
+        values = np.where(table[count_column].to_numpy() >= min_count, values, np.nan)
+    return table.iloc[top_k(values, n, ascending=ascending)]
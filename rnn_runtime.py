@@ -0,0 +1,209 @@
+"""NumPy inference for the notebook's SimpleRNN and LSTM forecasters.
+
+The Keras models (``SimpleRNN(32) -> Dense(8) -> Dense(1)`` and
+``LSTM(100) -> Dense(4) -> Dense(1)``, input ``(samples, 1, lookBack)``)
+are exported once to an ``.npz`` file: the weights of every layer, plus a
+JSON description of the layers, the look-back and the min-max scaling.
+:class:`Network` runs the forward pass with NumPy only, so serving needs
+neither TensorFlow nor its start-up time and memory. The file also records
+the Keras version, since ``hard_sigmoid`` is ``0.2x + 0.5`` in Keras 2 and
+``x/6 + 0.5`` in Keras 3.
+
+:meth:`Network.forecast` produces multi-step forecasts recursively, for a
+whole batch of series at once: each step's prediction becomes the newest
+value of that series' input window.
+
+Usage, where the model was trained (TensorFlow installed):
+    rnn_runtime.export_keras(modelLstmInstance, 'lstm_model.npz', scale=(low, high))
+
+and where it is served:
+    network = rnn_runtime.Network.load('lstm_model.npz')
+    network.forecast(daily_guests.to_numpy(), horizon=28)
+"""
+import json
+import sys
+
+import numpy as np
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+# hard_sigmoid changed slope between Keras versions: 0.2x + 0.5 before 3, x/6 + 0.5 from 3
+HARD_SIGMOID = {
+    2: lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    3: lambda x: np.clip(x / 6.0 + 0.5, 0.0, 1.0),
+}
+
+
+def _activation(name, keras_version=None):
+    if name == 'hard_sigmoid':
+        if keras_version is None:
+            raise ValueError("hard_sigmoid differs between Keras 2 and 3; export the model again so the file "
+                             "records its Keras version")
+        return HARD_SIGMOID[2 if int(str(keras_version).split('.')[0]) < 3 else 3]
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation {name!r}; expected one of {sorted(ACTIVATIONS) + ['hard_sigmoid']}")
+    return ACTIVATIONS[name]
+
+
+def _keras_version(model):
+    # Version of the Keras package the model's class comes from (keras, tf_keras, ...)
+    package = sys.modules.get(type(model).__module__.split('.')[0])
+    return getattr(package, '__version__', None)
+
+
+def _layer_spec(layer):
+    # Keras layer -> (description, weights)
+    kind = type(layer).__name__
+    config = layer.get_config()
+    if kind not in ('Dense', 'SimpleRNN', 'LSTM'):
+        raise ValueError(f'Unsupported layer {kind}; only Dense, SimpleRNN and LSTM can be exported')
+    spec = {'type': kind, 'activation': config.get('activation') or 'linear'}
+    if kind == 'LSTM':
+        spec['recurrent_activation'] = config.get('recurrent_activation', 'sigmoid')
+    if kind != 'Dense' and config.get('return_sequences'):
+        raise ValueError('Recurrent layers returning sequences are not supported')
+    return spec, [np.asarray(w, dtype=np.float64) for w in layer.get_weights()]
+
+
+def export_keras(model, path, look_back=None, scale=None, keras_version=None):
+    """Write a trained Keras model's weights and layer description to ``path``.
+
+    Args:
+        model: Keras ``Sequential`` of SimpleRNN/LSTM and Dense layers.
+        path (str): Output ``.npz`` file.
+        look_back (int): Input window; read from the model if not given.
+        scale (tuple): ``(low, high)`` if the model was trained on min-max
+            scaled values, so forecasts are scaled back.
+        keras_version (str): Keras version the model was built with; read
+            from the model's package if not given.
+    """
+    network = Network.from_keras(model, look_back, scale, keras_version)
+    network.save(path)
+    return path
+
+
+class Network:
+    """Forward pass of an exported SimpleRNN/LSTM forecaster.
+
+    Args:
+        layers (list): Layer descriptions, as written by :func:`export_keras`.
+        weights (list): Per layer, the list of weight arrays in Keras order.
+        look_back (int): Length of the input window.
+        scale (tuple): Optional ``(low, high)`` min-max scaling of the series.
+        keras_version (str): Keras version of the exported model, which
+            decides the ``hard_sigmoid`` formula. Without it, layers using
+            ``hard_sigmoid`` are rejected.
+    """
+
+    def __init__(self, layers, weights, look_back, scale=None, keras_version=None):
+        self.layers = layers
+        self.weights = weights
+        self.look_back = int(look_back)
+        self.scale = tuple(scale) if scale is not None else None
+        self.keras_version = keras_version
+        for spec in layers:
+            _activation(spec['activation'], keras_version)
+            if 'recurrent_activation' in spec:
+                _activation(spec['recurrent_activation'], keras_version)
+
+    @classmethod
+    def from_keras(cls, model, look_back=None, scale=None, keras_version=None):
+        specs = [_layer_spec(layer) for layer in model.layers]
+        if look_back is None:
+            look_back = int(model.input_shape[-1])
+        return cls([spec for spec, _ in specs], [weights for _, weights in specs], look_back, scale,
+                   keras_version or _keras_version(model))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            weights = [[data[f'layer{i}_w{j}'] for j in range(spec['n_weights'])]
+                       for i, spec in enumerate(meta['layers'])]
+        return cls(meta['layers'], weights, meta['look_back'], meta.get('scale'), meta.get('keras_version'))
+
+    def save(self, path):
+        arrays = {}
+        layers = []
+        for i, (spec, weights) in enumerate(zip(self.layers, self.weights)):
+            layers.append(dict(spec, n_weights=len(weights)))
+            for j, w in enumerate(weights):
+                arrays[f'layer{i}_w{j}'] = w
+        meta = {'layers': layers, 'look_back': self.look_back, 'scale': self.scale,
+                'keras_version': self.keras_version}
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    def _recurrent(self, spec, weights, x):
+        # x: (batch, timesteps, features) -> last hidden state (batch, units)
+        kernel, recurrent = weights[0], weights[1]
+        bias = weights[2] if len(weights) > 2 else 0.0
+        units = recurrent.shape[0]
+        activation = _activation(spec['activation'], self.keras_version)
+        h = np.zeros((x.shape[0], units))
+        # Input projections for every timestep in one product
+        projected = x @ kernel + bias
+        if spec['type'] == 'SimpleRNN':
+            for t in range(x.shape[1]):
+                h = activation(projected[:, t] + h @ recurrent)
+            return h
+        gate = _activation(spec['recurrent_activation'], self.keras_version)
+        c = np.zeros_like(h)
+        for t in range(x.shape[1]):
+            z = projected[:, t] + h @ recurrent
+            # Keras gate order: input, forget, cell, output
+            i, f, g, o = z[:, :units], z[:, units:2 * units], z[:, 2 * units:3 * units], z[:, 3 * units:]
+            c = gate(f) * c + gate(i) * activation(g)
+            h = gate(o) * activation(c)
+        return h
+
+    def predict(self, x):
+        """One step ahead for a batch of windows.
+
+        Args:
+            x (np.ndarray): Scaled windows, ``(batch, look_back)`` or the
+                Keras input shape ``(batch, 1, look_back)``.
+
+        Returns:
+            np.ndarray: ``(batch,)`` scaled predictions.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 2:
+            x = x[:, np.newaxis, :]
+        out = x
+        for spec, weights in zip(self.layers, self.weights):
+            if spec['type'] == 'Dense':
+                activation = _activation(spec['activation'], self.keras_version)
+                out = activation(out @ weights[0] + (weights[1] if len(weights) > 1 else 0.0))
+            else:
+                out = self._recurrent(spec, weights, out)
+        return out[:, 0]
+
+    def forecast(self, history, horizon):
+        """Recursive multi-step forecasts.
+
+        Args:
+            history (np.ndarray): Unscaled series, 1-d for one series or
+                ``(batch, days)`` for several; at least ``look_back`` days.
+            horizon (int): Days to forecast.
+
+        Returns:
+            np.ndarray: ``(horizon,)`` or ``(batch, horizon)`` unscaled forecasts.
+        """
+        history = np.asarray(history, dtype=np.float64)
+        single = history.ndim == 1
+        history = np.atleast_2d(history)
+        if history.shape[1] < self.look_back:
+            raise ValueError(f'Need at least {self.look_back} days of history, got {history.shape[1]}')
+        low, high = self.scale if self.scale is not None else (0.0, 1.0)
+        span = (high - low) or 1.0
+        # Window buffer: the last look_back days followed by room for every prediction
+        buffer = np.empty((history.shape[0], self.look_back + horizon))
+        buffer[:, :self.look_back] = (history[:, -self.look_back:] - low) / span
+        for step in range(horizon):
+            buffer[:, self.look_back + step] = self.predict(buffer[:, step:step + self.look_back])
+        forecasts = buffer[:, self.look_back:] * span + low
+        return forecasts[0] if single else forecasts
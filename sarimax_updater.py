@@ -0,0 +1,139 @@
+"""Bring the SARIMAX model up to date without refitting it.
+
+``model.joblib`` holds fitted SARIMAX results. New daily guest observations
+are filtered into the results' Kalman filter state with the fitted
+parameters kept as they are (``results.append(..., refit=False)``). This
+takes milliseconds, where a maximum-likelihood refit takes seconds. The
+updated results replace ``model.joblib`` atomically
+(:func:`model_store.save_model`), so a running app never loads a
+half-written model.
+
+Forecasts then start the day after the last observation. The SARIMAX app
+reads that date with :func:`last_observed` instead of assuming a fixed
+training end.
+
+Only complete days are added: arrivals up to ``--until`` (yesterday by
+default), whose cancellations are known. Later arrivals are left for a
+later update, and a missing day between the model's last date and the new
+observations is an error.
+
+Usage:
+    python sarimax_updater.py --bookings hotel_bookings.csv
+    python sarimax_updater.py --bookings hotel_bookings.csv --until 2017-09-30
+    python sarimax_updater.py --bookings live_bookings/today.csv --model model.joblib
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import guest_series
+import model_store
+
+MODEL_PATH = 'model.joblib'
+
+
+def last_observed(results):
+    """Date of the last observation in the model's state.
+
+    Returns:
+        pd.Timestamp: The last date, or None if the model has no date index.
+    """
+    index = getattr(results.model, '_index', None)
+    if isinstance(index, pd.DatetimeIndex) and len(index):
+        return index[-1]
+    return None
+
+
+def yesterday():
+    """The last complete day: arrivals after it have not happened yet."""
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+
+
+def new_observations(results, observations, until=None):
+    """Observations after the model's last date, up to ``until``, as a gap-free daily series.
+
+    Dates already in the model are dropped, and so are dates after ``until``
+    (yesterday by default): bookings for later arrivals may still be
+    cancelled, so those days are not observed yet. The remaining days must
+    follow on from the model's last date without gaps; a missing day is an
+    error rather than zero guests, since it may just not have been loaded.
+
+    Raises:
+        ValueError: If the model has no date index or a day is missing.
+    """
+    observations = observations.sort_index()
+    last = last_observed(results)
+    if last is None:
+        raise ValueError('The model has no date index, so new observations cannot be aligned to it')
+    until = yesterday() if until is None else pd.Timestamp(until)
+    observations = observations[(observations.index > last) & (observations.index <= until)]
+    if observations.empty:
+        return observations.astype(np.float64)
+    days = pd.date_range(last + pd.Timedelta(days=1), observations.index[-1], freq='D')
+    missing = days.difference(observations.index)
+    if len(missing):
+        raise ValueError(f'{len(missing)} days between {days[0]:%Y-%m-%d} and {days[-1]:%Y-%m-%d} have no '
+                         f'observations, starting with {missing[0]:%Y-%m-%d}')
+    return observations.astype(np.float64)
+
+
+def advance(results, observations, until=None):
+    """Filter ``observations`` into ``results`` with the fitted parameters kept.
+
+    Args:
+        results: Fitted SARIMAX results.
+        observations (pd.Series): Daily guests by date, under any name. Only
+            dates after the model's last observation are used.
+        until: Last complete day to accept, yesterday if omitted.
+
+    Returns:
+        tuple: ``(results, added)``, the updated results (or the original ones
+        if nothing was new) and the number of days added.
+    """
+    new = new_observations(results, observations, until)
+    if new.empty:
+        return results, 0
+    return results.append(_like_endog(results, new), refit=False), len(new)
+
+
+def _like_endog(results, new):
+    # statsmodels concatenates the new observations onto the original endog, which needs
+    # the same name (a Series) or column (a DataFrame); e.g. a forecast is named 'predicted_mean'
+    endog = results.model.data.orig_endog
+    if isinstance(endog, pd.DataFrame):
+        return new.to_frame(endog.columns[0])
+    return new.rename(endog.name)
+
+
+def update_model(observations, path=MODEL_PATH, until=None):
+    """Load the model at ``path``, advance it with ``observations`` up to ``until`` and save it back.
+
+    Returns:
+        dict: Days added, the old and new last dates and the update time in seconds.
+    """
+    results = joblib.load(path)
+    before = last_observed(results)
+    start = time.perf_counter()
+    results, added = advance(results, observations, until)
+    seconds = time.perf_counter() - start
+    if added:
+        model_store.save_model(results, path)
+    return {'added': added, 'from': before, 'to': last_observed(results), 'seconds': seconds}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Advance the SARIMAX model with new bookings, without refitting.')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings with the hotel_bookings.csv columns')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--until', type=pd.Timestamp, default=None,
+                        help='Last complete arrival day to add (default: yesterday)')
+    args = parser.parse_args()
+    summary = update_model(guest_series.daily_guests(pd.read_csv(args.bookings)), args.model, args.until)
+    if summary['added']:
+        print(f"Added {summary['added']} days ({summary['from']:%Y-%m-%d} -> {summary['to']:%Y-%m-%d}) "
+              f"in {summary['seconds'] * 1000:.1f} ms")
+    else:
+        print(f"No observations after {summary['from']:%Y-%m-%d}; model unchanged")
@@ -0,0 +1,204 @@
+"""Monte-Carlo demand scenarios for capacity and overbooking questions.
+
+The forecast apps show a point forecast and a band per day, which cannot
+answer questions about a stay window such as "how likely are more than
+4,000 guests over Sept 14-28?". Here thousands of joint sample paths are
+drawn from a served model and kept, so any window's sum has a full
+distribution:
+
+- SARIMAX: paths are simulated from the fitted state-space model, starting
+  from the filtered state at the end of the sample. All paths advance
+  together as one matrix product per day. ``results.simulate(repetitions=n)``
+  draws the same distribution but loops over the repetitions in Python.
+- Prophet: ``predictive_samples`` (trend changes plus observation noise),
+  in batches of ``BATCH`` paths.
+
+Paths are clipped at zero guests. Each simulation is cached per model file
+version and extended in blocks of ``BLOCK`` days. A window query is two
+lookups in the cumulative sums of the paths, so probabilities and
+quantiles for any window cost microseconds.
+
+Usage:
+    python scenarios.py --kind sarimax --start 2017-09-14 --end 2017-09-28 --capacity 4000
+"""
+import argparse
+import copy
+import functools
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import ensemble
+
+DEFAULT_PATHS = 2000
+BATCH = 500
+BLOCK = ensemble.BLOCK
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def sarimax_paths(results, steps, n=DEFAULT_PATHS, seed=None):
+    """Sample paths of a fitted SARIMAX for the ``steps`` days after its sample.
+
+    Returns:
+        np.ndarray: ``(n, steps)`` simulated guests.
+    """
+    rng = np.random.default_rng(seed)
+    ssm = results.model.ssm
+    if not ssm.time_invariant:
+        # Time-varying matrices (e.g. exogenous regressors): statsmodels' own loop
+        return results.simulate(nsimulations=steps, repetitions=n, anchor='end').to_numpy().T
+    Z, d, H = ssm['design'], ssm['obs_intercept'], ssm['obs_cov']
+    T, c, R, Q = ssm['transition'], ssm['state_intercept'], ssm['selection'], ssm['state_cov']
+
+    def factor(cov):
+        # Square root of a covariance that may be singular (differenced states)
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+    mean, cov = results.predicted_state[:, -1], results.predicted_state_cov[:, :, -1]
+    state = mean + rng.standard_normal((n, len(mean))) @ factor(cov).T
+    H_root, Q_root = factor(H), factor(Q)
+    paths = np.empty((n, steps))
+    for t in range(steps):
+        paths[:, t] = (state @ Z.T + d + rng.standard_normal((n, len(d))) @ H_root.T)[:, 0]
+        state = state @ T.T + c + (rng.standard_normal((n, Q.shape[0])) @ Q_root.T) @ R.T
+    return paths
+
+
+def prophet_paths(model, steps, n=DEFAULT_PATHS, seed=None, batch=BATCH):
+    """Predictive sample paths of a fitted Prophet for the ``steps`` days after its history.
+
+    Returns:
+        np.ndarray: ``(n, steps)`` simulated guests.
+    """
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    first = pd.Timestamp(model.history['ds'].max()) + pd.Timedelta(days=1)
+    future = pd.DataFrame({'ds': pd.date_range(first, periods=steps)})
+    # A shallow copy sets the batch size without touching the served model
+    sampler = copy.copy(model)
+    # Prophet samples from numpy's global generator: seed it for these paths only
+    state = np.random.get_state()
+    if seed is not None:
+        np.random.seed(seed)
+    batches = []
+    try:
+        for size in np.diff(np.append(np.arange(0, n, batch), n)):
+            sampler.uncertainty_samples = int(size)
+            batches.append(sampler.predictive_samples(future)['yhat'].T)
+    finally:
+        np.random.set_state(state)
+    return np.vstack(batches)
+
+
+class Scenarios:
+    """Sample paths over consecutive days, with fast window queries.
+
+    Args:
+        paths (np.ndarray): ``(n, days)`` simulated guests; clipped at zero.
+        start: First simulated day.
+    """
+
+    def __init__(self, paths, start):
+        self.paths = np.clip(paths, 0.0, None)
+        self.dates = pd.date_range(pd.Timestamp(start), periods=self.paths.shape[1])
+        # Cumulative sums with a leading zero: a window sum is one subtraction per path
+        self._cumulative = np.concatenate([np.zeros((len(self.paths), 1)), np.cumsum(self.paths, axis=1)], axis=1)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def window_sums(self, start, end):
+        """Total guests over ``start`` to ``end`` (inclusive), one per path."""
+        first = (pd.Timestamp(start) - self.dates[0]).days
+        last = (pd.Timestamp(end) - self.dates[0]).days
+        if first < 0 or last >= len(self.dates) or first > last:
+            raise ValueError(f'Window {pd.Timestamp(start).date()} to {pd.Timestamp(end).date()} is outside '
+                             f'the simulated days {self.dates[0].date()} to {self.dates[-1].date()}')
+        return self._cumulative[:, last + 1] - self._cumulative[:, first]
+
+    def exceedance(self, start, end, capacity):
+        """Probability that total guests over the window exceed ``capacity``."""
+        return float((self.window_sums(start, end) > capacity).mean())
+
+    def quantiles(self, start, end, q=QUANTILES):
+        """Quantiles of total guests over the window."""
+        return pd.Series(np.quantile(self.window_sums(start, end), q), index=list(q))
+
+    def daily_quantiles(self, start, end, q=QUANTILES):
+        """Quantiles of each day's guests, dates x quantiles."""
+        first = (pd.Timestamp(start) - self.dates[0]).days
+        last = (pd.Timestamp(end) - self.dates[0]).days
+        values = np.quantile(self.paths[:, first:last + 1], q, axis=0).T
+        return pd.DataFrame(values, index=self.dates[first:last + 1], columns=list(q))
+
+
+SIMULATORS = {'sarimax': sarimax_paths, 'prophet': prophet_paths}
+
+
+@functools.lru_cache(maxsize=8)
+def simulate(kind, path, modified, steps, n=DEFAULT_PATHS, seed=0):
+    """Cached scenarios of a served model; ``modified`` keys the cache to the model version."""
+    model = ensemble.load_member(path, modified)
+    start = ensemble.training_end(kind, model) + pd.Timedelta(days=1)
+    return Scenarios(SIMULATORS[kind](model, steps, n, seed), start)
+
+
+def scenarios(kind, end, path=None, n=DEFAULT_PATHS, seed=0):
+    """Scenarios of the served ``kind`` model covering every day up to ``end``."""
+    path = path or ensemble.MEMBERS[kind]
+    modified = os.path.getmtime(path)
+    last = ensemble.training_end(kind, ensemble.load_member(path, modified))
+    # Whole blocks, so nearby windows reuse one simulation
+    steps = max(-(-(pd.Timestamp(end) - last).days // BLOCK), 1) * BLOCK
+    return simulate(kind, path, modified, steps, n, seed)
+
+
+def render_capacity_section(kind, start_date, end_date, path=None):
+    """Capacity risk over the selected stay window, for the forecast apps."""
+    # Imported here, so the command line and batch jobs do not load Streamlit
+    import streamlit as st
+
+    path = path or ensemble.MEMBERS[kind]
+    if not os.path.exists(path):
+        return
+    st.markdown("## 🎲 Capacity Risk")
+    last = ensemble.training_end(kind, ensemble.load_member(path, os.path.getmtime(path)))
+    if start_date <= last:
+        st.info(f"Scenarios start after {last.strftime('%B %d, %Y')} (end of training data)")
+        return
+    with st.spinner("Simulating demand scenarios..."):
+        sims = scenarios(kind, end_date, path)
+    sums = sims.window_sums(start_date, end_date)
+    capacity = st.number_input(
+        "Capacity (total guests over the period)",
+        min_value=0, value=int(round(np.median(sums) / 100.0) * 100), step=100,
+        key=f'{kind}_capacity',
+        help="Compared with the total guests of every simulated scenario",
+    )
+    quantiles = sims.quantiles(start_date, end_date)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Chance of Exceeding", f"{sims.exceedance(start_date, end_date, capacity):.1%}")
+    with col2:
+        st.metric("Median Total Guests", f"{quantiles[0.5]:.0f}")
+    with col3:
+        st.metric("90% Range", f"{quantiles[0.05]:.0f} - {quantiles[0.95]:.0f}")
+    st.caption(f"Based on {len(sims):,} simulated demand scenarios")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Probability and quantiles of total guests over a date window.')
+    parser.add_argument('--kind', choices=sorted(SIMULATORS), default='sarimax')
+    parser.add_argument('--model', default=None, help='Model file; defaults to the served one')
+    parser.add_argument('--start', required=True)
+    parser.add_argument('--end', required=True)
+    parser.add_argument('--capacity', type=float, default=None)
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    sims = scenarios(args.kind, args.end, args.model, args.paths, args.seed)
+    print(sims.quantiles(args.start, args.end).to_string(float_format='{:.0f}'.format))
+    if args.capacity is not None:
+        print(f'P(total > {args.capacity:.0f}) = {sims.exceedance(args.start, args.end, args.capacity):.3f}')
@@ -0,0 +1,318 @@
+"""Host-wide, read-only copy of the bookings data in shared memory.
+
+``st.cache_data`` hands every caller its own unpickled copy of the bookings
+frame, so memory grows with each concurrent dashboard session. Instead, the
+partitioned Parquet store (see :mod:`booking_store`) is published once per
+host as a single uncompressed Arrow IPC file under ``/dev/shm``, with the
+partitions stored back to back in the store's (hotel, year) order. The
+per-partition profiles are published next to it, in the store's
+``hotel=.../arrival_date_year=...`` layout. Sessions and replica processes
+memory-map the file, so every process shares the same physical pages.
+
+A selection whose partitions are adjacent in the file is a zero-copy slice:
+numeric columns are read-only views of the mapping. This covers the
+dashboard's default (every hotel and year), a single hotel, and a single
+partition. Other selections, and string columns, are private copies. The
+dashboard caches them through :class:`SelectionCache`, which is bounded by
+the bytes those copies take.
+
+Publishing is guarded by a file lock so that concurrent processes build the
+shared copy only once. A rebuilt store gets a new version directory. The
+version before it is kept, since sessions that attached to it may still read
+its index and profiles; older versions are removed, and processes still
+mapping them keep their pages until they detach. The shared directory must be private to the user
+running the dashboard, since profiles are unpickled from it.
+"""
+import collections
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+import booking_store
+import dataset_profile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SHM_DIR = os.environ.get(
+    'DASHBOARD_SHM_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'prohotelytics'),
+)
+ARROW_FILE = 'bookings.arrow'
+INDEX_FILE = '_INDEX.json'
+READY_FILE = '_READY'
+
+
+def _version(store_root):
+    # The store marker is rewritten on every rebuild, so its mtime identifies the store version
+    return 'v%d' % os.stat(os.path.join(store_root, booking_store.MARKER_FILE)).st_mtime_ns
+
+
+class _HostLock:
+    """Exclusive advisory lock shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'w')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _private_dir(path):
+    """Create ``path`` readable only by this user, refusing one that others could write to."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Shared dataset directory {path!r} must be a directory owned by this user "
+                              f"with mode 0700; set DASHBOARD_SHM_DIR to a private directory")
+    return path
+
+
+def publish(store_root=booking_store.STORE_DIR, shm_root=SHM_DIR):
+    """Publish the partitioned store into shared memory, once per store version.
+
+    Returns:
+        str: Directory holding the published Arrow file and partition profiles.
+    """
+    version_dir = os.path.join(shm_root, _version(store_root))
+    _private_dir(shm_root)
+    if os.path.exists(os.path.join(version_dir, READY_FILE)):
+        return version_dir
+
+    with _HostLock(os.path.join(shm_root, '.lock')):
+        # Another process may have published while we waited for the lock
+        if not os.path.exists(os.path.join(version_dir, READY_FILE)):
+            tables, index, start = [], [], 0
+            for part in booking_store.list_partitions(store_root).itertuples():
+                part_dir = booking_store.partition_path(version_dir, part.hotel, part.arrival_date_year)
+                os.makedirs(part_dir, exist_ok=True)
+                table = pq.read_table(part.path)
+                tables.append(table)
+                index.append({'hotel': part.hotel, 'arrival_date_year': int(part.arrival_date_year),
+                              'start': start, 'stop': start + table.num_rows})
+                start += table.num_rows
+                # Carry the partition profile over, backfilling it for stores written before profiles existed
+                dataset_profile.partition_profile(part.path)
+                shutil.copyfile(dataset_profile.profile_path(part.path),
+                                os.path.join(part_dir, dataset_profile.PROFILE_FILE))
+            if tables:
+                # One contiguous chunk per column, so any run of adjacent partitions is a zero-copy slice
+                table = pa.concat_tables(tables, promote_options='default').combine_chunks()
+                tmp_path = os.path.join(version_dir, ARROW_FILE + '.tmp')
+                with pa.OSFile(tmp_path, 'wb') as sink:
+                    with ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(tmp_path, os.path.join(version_dir, ARROW_FILE))
+            with open(os.path.join(version_dir, INDEX_FILE), 'w') as f:
+                json.dump(index, f)
+            open(os.path.join(version_dir, READY_FILE), 'w').close()
+
+        _remove_stale_versions(shm_root, version_dir)
+    return version_dir
+
+
+def _remove_stale_versions(shm_root, version_dir):
+    # Keep the newest older version too: processes that attached before this publish may still
+    # be listing its partitions or loading its profiles. Anything older has been superseded twice.
+    others = sorted((entry for entry in os.scandir(shm_root)
+                     if entry.is_dir() and entry.path != version_dir and entry.name[1:].isdigit()),
+                    key=lambda entry: int(entry.name[1:]))
+    for entry in others[:-1]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def list_partitions(version_dir):
+    """List the published partitions, in the format of :func:`booking_store.list_partitions`.
+
+    ``path`` points at each partition's profile; ``start`` and ``stop`` are
+    its rows in the published Arrow file.
+    """
+    partitions = booking_store.list_partitions(version_dir, part_file=dataset_profile.PROFILE_FILE)
+    with open(os.path.join(version_dir, INDEX_FILE)) as f:
+        index = pd.DataFrame(json.load(f), columns=['hotel', 'arrival_date_year', 'start', 'stop'])
+    return partitions.merge(index, on=['hotel', 'arrival_date_year'], how='left')
+
+
+# version_dir -> memory-mapped table, opened once per process
+_mapped = {}
+
+
+def _mapped_table(version_dir):
+    if version_dir not in _mapped:
+        # Only the current version stays mapped; frames still viewing an old one keep it alive
+        _mapped.clear()
+        path = os.path.join(version_dir, ARROW_FILE)
+        _mapped[version_dir] = ipc.open_file(pa.memory_map(path, 'r')).read_all() if os.path.exists(path) else None
+    return _mapped[version_dir]
+
+
+def _row_ranges(selected):
+    # Adjacent partitions merged into runs of rows
+    ranges = []
+    for start, stop in sorted(zip(selected['start'], selected['stop'])):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = stop
+        else:
+            ranges.append([start, stop])
+    return ranges
+
+
+def attach_table(version_dir, hotels=None, years=None):
+    """The selected partitions as one Arrow table; a zero-copy slice when they are adjacent."""
+    table = _mapped_table(version_dir)
+    selected = booking_store.select_partitions(list_partitions(version_dir), hotels, years)
+    if table is None or selected.empty:
+        return None
+    ranges = _row_ranges(selected)
+    if len(ranges) == 1:
+        return table.slice(ranges[0][0], ranges[0][1] - ranges[0][0])
+    return pa.concat_tables([table.slice(start, stop - start) for start, stop in ranges]).combine_chunks()
+
+
+def attach(version_dir, hotels=None, years=None):
+    """Attach to the selected partitions as a read-only pandas frame.
+
+    When the selected partitions are adjacent in the published file (every
+    hotel and year, one hotel, or one partition), numeric columns are
+    zero-copy views of the shared mapping. Other selections are copied.
+    """
+    table = attach_table(version_dir, hotels, years)
+    if table is None:
+        return pd.DataFrame()
+    return table.to_pandas(split_blocks=True)
+
+
+def private_bytes(df):
+    """Bytes of ``df`` held in private memory rather than viewing the shared mapping."""
+    total = 0
+    for name in df.columns:
+        column = df[name]
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+            # Under copy-on-write pandas hands out read-only views; the array they view tells
+            # private memory (writeable) from the read-only Arrow mapping
+            values = column.to_numpy()
+            while isinstance(values.base, np.ndarray):
+                values = values.base
+            if values.flags.writeable:
+                total += column.memory_usage(index=False)
+        else:
+            total += column.memory_usage(index=False, deep=True)
+    return total
+
+
+class SelectionCache:
+    """Per-selection cache shared by every session, bounded by private memory.
+
+    Each (version_dir, hotels, years) selection holds its frame and the
+    objects built from it (engine, indexes, derived columns). Frames are
+    charged by :func:`private_bytes`; once the total exceeds ``max_bytes``,
+    the least recently used selections are dropped with everything built on
+    them. The most recent selection is always kept.
+
+    Values are built outside the cache lock, so a slow build only blocks
+    callers waiting for the same value; hits on other values are served
+    meanwhile.
+
+    Usage: ``@metrics.track_cache('load_data', SELECTION_CACHE('load_data'))``;
+    the first three arguments of the cached function are the selection.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        # selection -> {key: private bytes} for the DataFrame values it holds
+        self._sizes = {}
+        # (selection, key) -> lock held while that value is built
+        self._building = {}
+        # name -> number of clear() calls, so a build that raced a clear is not stored
+        self._generations = collections.Counter()
+        self._lock = threading.Lock()
+
+    def _lookup(self, selection, key):
+        # Called with self._lock held
+        entry = self._entries.get(selection)
+        if entry is not None and key in entry:
+            self._entries.move_to_end(selection)
+            return True, entry[key]
+        return False, None
+
+    def __call__(self, name):
+        def decorator(func):
+            def cached(*args):
+                selection, key = args[:3], (name, args[3:])
+                with self._lock:
+                    found, value = self._lookup(selection, key)
+                    if found:
+                        return value
+                    build_lock = self._building.setdefault((selection, key), threading.Lock())
+                with build_lock:
+                    with self._lock:
+                        found, value = self._lookup(selection, key)
+                        generation = self._generations[name]
+                    if found:
+                        return value
+                    try:
+                        value = func(*args)
+                    except BaseException:
+                        with self._lock:
+                            self._building.pop((selection, key), None)
+                        raise
+                    nbytes = private_bytes(value) if isinstance(value, pd.DataFrame) else None
+                    with self._lock:
+                        self._building.pop((selection, key), None)
+                        if self._generations[name] == generation:
+                            self._entries.setdefault(selection, {})[key] = value
+                            self._entries.move_to_end(selection)
+                            if nbytes is not None:
+                                self._sizes.setdefault(selection, {})[key] = nbytes
+                                self._evict(selection)
+                    return value
+
+            def clear():
+                with self._lock:
+                    self._generations[name] += 1
+                    for selection, entry in self._entries.items():
+                        sizes = self._sizes.get(selection, {})
+                        for key in [key for key in entry if key[0] == name]:
+                            del entry[key]
+                            sizes.pop(key, None)
+            cached.clear = clear
+            return cached
+        return decorator
+
+    def _total(self):
+        return sum(sum(sizes.values()) for sizes in self._sizes.values())
+
+    def _evict(self, keep):
+        while self._total() > self.max_bytes and len(self._entries) > 1:
+            selection = next(iter(self._entries))
+            if selection == keep:
+                self._entries.move_to_end(selection)
+                continue
+            del self._entries[selection]
+            self._sizes.pop(selection, None)
+
+    def nbytes(self):
+        """Private bytes currently charged to the cache."""
+        with self._lock:
+            return self._total()
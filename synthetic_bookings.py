@@ -0,0 +1,212 @@
+"""Synthetic hotel bookings at any scale, for benchmarks.
+
+Generates frames with the exact schema of ``hotel_bookings.csv`` and marginal
+distributions close to the real dataset: the City/Resort split, arrival
+seasonality (an August peak) over Jul 2015 - Aug 2017, a Portugal-heavy
+country mix with a long tail, right-skewed lead times, hotel- and
+season-dependent ADR, and cancellations that rise with lead time and are
+near-certain for non-refundable deposits. Rows are generated in vectorized
+chunks, so 10M rows can be written to CSV in bounded memory.
+
+Usage:
+    python synthetic_bookings.py --rows 1000000 --out bench_data/bookings_1m.csv
+"""
+import argparse
+import calendar
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'hotel', 'is_canceled', 'lead_time', 'arrival_date_year', 'arrival_date_month',
+    'arrival_date_week_number', 'arrival_date_day_of_month', 'stays_in_weekend_nights',
+    'stays_in_week_nights', 'adults', 'children', 'babies', 'meal', 'country', 'market_segment',
+    'distribution_channel', 'is_repeated_guest', 'previous_cancellations',
+    'previous_bookings_not_canceled', 'reserved_room_type', 'assigned_room_type', 'booking_changes',
+    'deposit_type', 'agent', 'company', 'days_in_waiting_list', 'customer_type', 'adr',
+    'required_car_parking_spaces', 'total_of_special_requests', 'reservation_status',
+    'reservation_status_date',
+]
+
+SIZES = {'100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+FIRST_ARRIVAL = pd.Timestamp('2015-07-01')
+LAST_ARRIVAL = pd.Timestamp('2017-08-31')
+
+# Share of arrivals by calendar month in the real data (Jan..Dec)
+MONTH_WEIGHTS = [5.0, 6.8, 8.2, 9.3, 9.9, 9.2, 10.6, 11.6, 8.8, 9.3, 5.7, 5.7]
+
+# The most frequent countries and their shares; the remaining mass is spread over a Zipf tail
+TOP_COUNTRIES = {
+    'PRT': 40.7, 'GBR': 10.2, 'FRA': 8.7, 'ESP': 7.2, 'DEU': 6.1, 'ITA': 3.2, 'IRL': 2.8,
+    'BEL': 2.0, 'BRA': 1.9, 'NLD': 1.8, 'USA': 1.8, 'CHE': 1.5, 'CN': 1.1, 'AUT': 1.1,
+    'SWE': 0.9, 'CHN': 0.8, 'POL': 0.8, 'ISR': 0.6, 'RUS': 0.5, 'NOR': 0.5,
+}
+TAIL_COUNTRIES = 157
+
+CATEGORIES = {
+    'meal': {'BB': 77.3, 'HB': 12.1, 'SC': 8.9, 'Undefined': 1.0, 'FB': 0.7},
+    'market_segment': {
+        'Online TA': 47.3, 'Offline TA/TO': 20.3, 'Groups': 16.6, 'Direct': 10.6,
+        'Corporate': 4.4, 'Complementary': 0.6, 'Aviation': 0.2,
+    },
+    'customer_type': {'Transient': 75.1, 'Transient-Party': 21.0, 'Contract': 3.4, 'Group': 0.5},
+    'reserved_room_type': {'A': 72.0, 'D': 16.1, 'E': 5.5, 'F': 2.4, 'G': 1.8, 'B': 0.9, 'C': 0.8, 'H': 0.5},
+    'deposit_type': {'No Deposit': 87.6, 'Non Refund': 12.2, 'Refundable': 0.2},
+}
+CHANNEL_BY_SEGMENT = {
+    'Online TA': 'TA/TO', 'Offline TA/TO': 'TA/TO', 'Groups': 'TA/TO', 'Direct': 'Direct',
+    'Corporate': 'Corporate', 'Complementary': 'Direct', 'Aviation': 'Corporate',
+}
+
+
+def _choice(rng, options, n):
+    labels = np.array(list(options), dtype=object)
+    weights = np.array(list(options.values()), dtype=np.float64)
+    return labels[rng.choice(len(labels), size=n, p=weights / weights.sum())]
+
+
+def _country_weights():
+    top = np.array(list(TOP_COUNTRIES.values()))
+    tail = 1.0 / np.arange(1, TAIL_COUNTRIES + 1) ** 1.2
+    tail *= (100.0 - top.sum()) / tail.sum()
+    names = list(TOP_COUNTRIES) + [f'C{i:03d}' for i in range(TAIL_COUNTRIES)]
+    return np.array(names, dtype=object), np.concatenate([top, tail]) / 100.0
+
+
+def _arrival_dates(rng, n):
+    days = pd.date_range(FIRST_ARRIVAL, LAST_ARRIVAL, freq='D')
+    # MONTH_WEIGHTS are overall shares; July and August occur in three years of the range, the rest in two
+    years_per_month = pd.Series(days.to_period('M').unique().month).value_counts()
+    weights = (np.asarray(MONTH_WEIGHTS)[days.month - 1] / days.days_in_month.to_numpy()
+               / years_per_month.reindex(days.month).to_numpy())
+    # Mild growth in volume year on year, as in the real data
+    weights = weights * (1.0 + 0.15 * (days.year.to_numpy() - FIRST_ARRIVAL.year))
+    return days[rng.choice(len(days), size=n, p=weights / weights.sum())]
+
+
+def generate(n, seed=None):
+    """Generate ``n`` synthetic bookings.
+
+    Args:
+        n (int): Number of rows.
+        seed (int): Random seed, for reproducible data.
+
+    Returns:
+        pd.DataFrame: Bookings with the ``hotel_bookings.csv`` columns, as read by ``pd.read_csv``.
+    """
+    rng = np.random.default_rng(seed)
+    city = rng.random(n) < 0.664
+    arrival = _arrival_dates(rng, n)
+    month = arrival.month.to_numpy()
+    summer = np.isin(month, [6, 7, 8])
+
+    lead_time = np.minimum(rng.gamma(0.9, 115.0, n).astype(np.int64), 737)
+    weekend = rng.poisson(0.93, n)
+    week = rng.poisson(np.where(city, 2.2, 3.1))
+    adults = rng.choice([1, 2, 3, 0, 4], size=n, p=[0.19, 0.751, 0.052, 0.004, 0.003])
+    children = np.where(rng.random(n) < 0.072, rng.choice([1, 2, 3], size=n, p=[0.6, 0.39, 0.01]), 0).astype(np.float64)
+    children[rng.random(n) < 0.00004] = np.nan
+    babies = (rng.random(n) < 0.0077).astype(np.int64)
+
+    segment = _choice(rng, CATEGORIES['market_segment'], n)
+    deposit = _choice(rng, CATEGORIES['deposit_type'], n)
+    reserved = _choice(rng, CATEGORIES['reserved_room_type'], n)
+    assigned = np.where(rng.random(n) < 0.875, reserved, _choice(rng, CATEGORIES['reserved_room_type'], n))
+    countries, country_p = _country_weights()
+    country = countries[rng.choice(len(countries), size=n, p=country_p)]
+    country[rng.random(n) < 0.004] = None
+
+    # ADR: City is pricier on average; the Resort's summer peak is much stronger
+    season = np.where(city, 1.0 + 0.1 * summer, 1.0 + 0.8 * summer)
+    adr = rng.lognormal(np.log(np.where(city, 97.0, 68.0)), 0.35, n) * season * (1.0 + 0.25 * (children > 0))
+    adr[rng.random(n) < 0.016] = 0.0
+
+    # Cancellation odds grow with lead time; non-refundable deposits are almost always cancelled
+    logit = -1.55 + 0.0045 * lead_time + 0.35 * city - 1.6 * (segment == 'Direct')
+    cancel_p = 1.0 / (1.0 + np.exp(-logit))
+    cancel_p = np.where(deposit == 'Non Refund', 0.99, cancel_p)
+    is_canceled = (rng.random(n) < cancel_p).astype(np.int64)
+
+    nights = weekend + week
+    status = np.where(is_canceled == 1, np.where(rng.random(n) < 0.04, 'No-Show', 'Canceled'), 'Check-Out')
+    status_date = np.where(
+        is_canceled == 1,
+        arrival - pd.to_timedelta(np.minimum(rng.integers(0, lead_time + 1), lead_time), unit='D'),
+        arrival + pd.to_timedelta(nights, unit='D'),
+    )
+
+    agent = np.where(rng.random(n) < 0.137, np.nan, rng.choice([9, 240, 1, 14, 7, 6, 250, 241, 28, 8], size=n))
+    company = np.where(rng.random(n) < 0.943, np.nan, rng.integers(1, 500, n))
+
+    df = pd.DataFrame({
+        'hotel': np.where(city, 'City Hotel', 'Resort Hotel'),
+        'is_canceled': is_canceled,
+        'lead_time': lead_time,
+        'arrival_date_year': arrival.year,
+        'arrival_date_month': [calendar.month_name[m] for m in month],
+        'arrival_date_week_number': arrival.isocalendar().week.to_numpy().astype(np.int64),
+        'arrival_date_day_of_month': arrival.day,
+        'stays_in_weekend_nights': weekend,
+        'stays_in_week_nights': week,
+        'adults': adults,
+        'children': children,
+        'babies': babies,
+        'meal': _choice(rng, CATEGORIES['meal'], n),
+        'country': country,
+        'market_segment': segment,
+        'distribution_channel': np.vectorize(CHANNEL_BY_SEGMENT.get, otypes=[object])(segment),
+        'is_repeated_guest': (rng.random(n) < 0.032).astype(np.int64),
+        'previous_cancellations': np.where(rng.random(n) < 0.054, rng.integers(1, 4, n), 0),
+        'previous_bookings_not_canceled': np.where(rng.random(n) < 0.03, rng.integers(1, 10, n), 0),
+        'reserved_room_type': reserved,
+        'assigned_room_type': assigned,
+        'booking_changes': rng.choice([0, 1, 2, 3, 4], size=n, p=[0.849, 0.106, 0.032, 0.008, 0.005]),
+        'deposit_type': deposit,
+        'agent': agent,
+        'company': company,
+        'days_in_waiting_list': np.where(rng.random(n) < 0.031, rng.integers(1, 200, n), 0),
+        'customer_type': _choice(rng, CATEGORIES['customer_type'], n),
+        'adr': adr.round(2),
+        'required_car_parking_spaces': (rng.random(n) < np.where(city, 0.025, 0.14)).astype(np.int64),
+        'total_of_special_requests': rng.choice([0, 1, 2, 3, 4], size=n, p=[0.589, 0.278, 0.109, 0.021, 0.003]),
+        'reservation_status': status,
+        'reservation_status_date': pd.DatetimeIndex(status_date).strftime('%Y-%m-%d'),
+    })
+    return df[COLUMNS]
+
+
+def write_csv(path, n, chunk_size=1_000_000, seed=0):
+    """Write ``n`` synthetic bookings to ``path`` in chunks of ``chunk_size`` rows.
+
+    Each chunk uses its own seed derived from ``seed``, so output is reproducible.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-n // chunk_size)))
+    written = 0
+    for i, chunk_seed in enumerate(seeds):
+        rows = min(chunk_size, n - written)
+        generate(rows, seed=chunk_seed).to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        written += rows
+    return path
+
+
+def parse_size(value):
+    """Parse ``'100k'``, ``'1m'``, ``'10m'`` or a plain row count."""
+    value = str(value).lower()
+    if value in SIZES:
+        return SIZES[value]
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic hotel bookings to CSV.')
+    parser.add_argument('--rows', default='100k', help="Row count, e.g. 100k, 1m, 10m or 250000")
+    parser.add_argument('--out', default=None, help='Output CSV path (default bench_data/hotel_bookings_<rows>.csv)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rows = parse_size(args.rows)
+    out = args.out or os.path.join('bench_data', f'hotel_bookings_{args.rows}.csv')
+    print(write_csv(out, rows, seed=args.seed))
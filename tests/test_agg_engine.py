@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agg_engine
+
+
+def _bookings(rows, seed, countries=('PRT', 'GBR', 'FRA')):
+    rng = np.random.default_rng(seed)
+    adr = rng.normal(100, 30, rows)
+    adr[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'country': rng.choice(list(countries) + [None], rows),
+        'lead_time': rng.integers(0, 300, rows),
+        'adr': adr,
+    })
+
+
+def _expected(df, by, column, func):
+    return df.groupby(by)[column].agg(func).reset_index()
+
+
+@pytest.mark.parametrize('column', ['adr', 'lead_time'])
+@pytest.mark.parametrize('func', ['mean', 'sum', 'median', 'count'])
+def test_matches_groupby(func, column):
+    df = _bookings(500, seed=0)
+    engine = agg_engine.AggregationEngine(df)
+
+    result = engine.aggregate('country', column, func)
+
+    pd.testing.assert_frame_equal(result, _expected(df, 'country', column, func))
+
+
+@pytest.mark.parametrize('func', ['mean', 'sum', 'median', 'count'])
+def test_append_matches_groupby_on_the_extended_frame(func):
+    df = _bookings(500, seed=0)
+    engine = agg_engine.AggregationEngine(df)
+    engine.aggregate('country', 'adr', func)
+    # A category sorting before the known ones, so the old codes are remapped
+    new_rows = _bookings(50, seed=1, countries=('PRT', 'AUT'))
+
+    engine.append(new_rows)
+
+    extended = pd.concat([df, new_rows], ignore_index=True)
+    pd.testing.assert_frame_equal(engine.aggregate('country', 'adr', func),
+                                  _expected(extended, 'country', 'adr', func))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+
+CONFIG = {'order': [1, 0, 0], 'seasonal_order': [0, 0, 0, 0], 'refit': False}
+
+
+def _series(days=120):
+    t = np.arange(days)
+    guests = 150 + 20 * np.sin(2 * np.pi * t / 7) + np.random.default_rng(0).normal(0, 5, days)
+    return pd.Series(guests, index=pd.date_range('2016-01-01', periods=days))
+
+
+@pytest.mark.parametrize('days, horizon, period, initial, count', [
+    (120, 7, 7, 60, 8), (120, 14, 10, 60, 5), (67, 7, 7, 60, 1), (66, 7, 7, 60, 0),
+])
+def test_cutoffs_leave_a_full_horizon(days, horizon, period, initial, count):
+    series = _series(days)
+
+    points = backtest.cutoffs(series, horizon, period, initial)
+
+    assert len(points) == count
+    if count:
+        assert points[0] == series.index[initial - 1]
+        assert series.index.get_loc(points[-1]) + horizon <= len(series) - 1
+        assert (np.diff(series.index.get_indexer(points)) == period).all()
+
+
+def test_horizon_metrics():
+    folds = pd.DataFrame({
+        'step': [1, 1, 2, 2],
+        'actual': [100.0, 0.0, 200.0, 50.0],
+        'yhat': [110.0, 5.0, 180.0, 50.0],
+        'lower': [90.0, 10.0, 190.0, np.nan],
+        'upper': [120.0, 20.0, 210.0, np.nan],
+    })
+
+    metrics = backtest.horizon_metrics(folds)
+
+    np.testing.assert_allclose(metrics['mae'], [7.5, 10.0])
+    # Zero actuals are left out of MAPE, missing intervals out of coverage
+    np.testing.assert_allclose(metrics['mape'], [0.1, 0.05])
+    np.testing.assert_allclose(metrics['coverage'], [0.5, 1.0])
+    assert metrics['folds'].tolist() == [2, 2]
+
+
+def test_rerun_is_served_from_the_cache(tmp_path, monkeypatch):
+    pytest.importorskip('statsmodels')
+    series = _series()
+    first = backtest.run(series, 'sarimax', CONFIG, horizon=7, initial=60, workers=2, cache_dir=str(tmp_path))
+    assert first['computed'] == 8 and first['cached'] == 0
+
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    def refit(*args, **kwargs):
+        raise AssertionError('the first window was fitted again')
+
+    monkeypatch.setattr(SARIMAX, 'fit', refit)
+    second = backtest.run(series, 'sarimax', CONFIG, horizon=7, initial=60, workers=2, cache_dir=str(tmp_path))
+
+    assert second['computed'] == 0 and second['cached'] == 8
+    pd.testing.assert_frame_equal(second['folds'], first['folds'])
@@ -0,0 +1,47 @@
+import io
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import calendar_features
+
+prophet = pytest.importorskip('prophet')
+
+
+@pytest.fixture(scope='module')
+def history():
+    days = pd.date_range('2016-01-01', '2017-06-30')
+    weekly = 20 * np.sin(2 * np.pi * np.arange(len(days)) / 7)
+    return pd.DataFrame({'ds': days, 'y': 150 + weekly + np.random.default_rng(0).normal(0, 5, len(days))})
+
+
+def _fit(history, attached):
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    model = prophet.Prophet(weekly_seasonality=True, uncertainty_samples=0)
+    model.add_country_holidays(country_name='PT')
+    if attached:
+        calendar_features.attach(model)
+    return model.fit(history)
+
+
+def test_attached_model_matches_prophet(history):
+    future = pd.DataFrame({'ds': pd.date_range('2017-07-01', periods=60)})
+    plain = _fit(history, attached=False).predict(future)['yhat']
+    cached = _fit(history, attached=True).predict(future)['yhat']
+    np.testing.assert_allclose(cached, plain, rtol=1e-6)
+
+
+def test_attached_model_pickles(history):
+    model = _fit(history, attached=True)
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    buffer.seek(0)
+    loaded = joblib.load(buffer)
+
+    future = pd.DataFrame({'ds': pd.date_range('2017-07-01', periods=30)})
+    assert isinstance(loaded.make_all_seasonality_features, calendar_features._CachedFeatures)
+    assert loaded.make_all_seasonality_features.model is loaded
+    np.testing.assert_allclose(loaded.predict(future)['yhat'], model.predict(future)['yhat'])
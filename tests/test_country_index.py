@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agg_engine
+import country_index
+
+
+def _bookings(rows, seed, countries=('PRT', 'GBR', 'FRA')):
+    rng = np.random.default_rng(seed)
+    adr = rng.normal(100, 30, rows)
+    adr[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'country': rng.choice(list(countries) + [None], rows),
+        'is_canceled': rng.integers(0, 2, rows),
+        'adr': adr,
+        'lead_time': rng.integers(0, 300, rows),
+        'total stayed': rng.integers(1, 10, rows),
+    })
+
+
+def _assert_same_index(index, expected):
+    pd.testing.assert_frame_equal(index.summary, expected.summary)
+    for country in expected.countries:
+        np.testing.assert_array_equal(index.rows(country), expected.rows(country))
+    countries = list(expected.countries)
+    pd.testing.assert_frame_equal(index.frames(countries), expected.frames(countries))
+    pd.testing.assert_frame_equal(index.frames(countries[:2], columns=['adr', 'country']),
+                                  expected.frames(countries[:2], columns=['adr', 'country']))
+
+
+@pytest.mark.parametrize('countries', [('PRT', 'GBR'), ('PRT', 'AUT')], ids=['known', 'new country'])
+def test_append_matches_a_rebuild(countries):
+    df = _bookings(300, seed=0)
+    new_rows = _bookings(40, seed=1, countries=countries)
+    index = country_index.CountryIndex(df)
+
+    index.append(new_rows)
+
+    extended = pd.concat([df, new_rows], ignore_index=True)
+    _assert_same_index(index, country_index.CountryIndex(extended))
+
+
+def test_append_with_engine_codes_matches_a_rebuild():
+    df = _bookings(300, seed=0)
+    new_rows = _bookings(40, seed=1, countries=('PRT', 'AUT'))
+    engine = agg_engine.AggregationEngine(df)
+    index = country_index.CountryIndex(df, codes=engine.codes('country'))
+
+    engine.append(new_rows)
+    index.append(new_rows, codes=engine.codes('country'), df=engine.df)
+
+    _assert_same_index(index, country_index.CountryIndex(engine.df))
+
+
+def test_frames_rejects_unknown_columns():
+    index = country_index.CountryIndex(_bookings(30, seed=0))
+
+    with pytest.raises(KeyError, match='arrival_date'):
+        index.frames(['PRT'], columns=['adr', 'arrival_date'])
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import dataset_profile
+
+
+def _partition(hotel, year, rows=60):
+    rng = np.random.default_rng(year)
+    adr = rng.normal(100, 30, rows)
+    adr[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'hotel': hotel,
+        'arrival_date_year': year,
+        'country': rng.choice(['PRT', 'GBR', None], rows),
+        'is_canceled': rng.integers(0, 2, rows),
+        'lead_time': rng.integers(0, 300, rows),
+        'adr': adr,
+    })
+
+
+def test_merged_partitions_match_the_concatenated_frame(tmp_path):
+    frames = [_partition(hotel, year) for hotel in ['City Hotel', 'Resort Hotel'] for year in [2016, 2017]]
+    paths = []
+    for i, frame in enumerate(frames):
+        (tmp_path / str(i)).mkdir()
+        path = str(tmp_path / str(i) / 'data.parquet')
+        frame.to_parquet(path)
+        paths.append(path)
+
+    profile = dataset_profile.load_profile(pd.DataFrame({'path': paths}))
+
+    df = pd.concat(frames, ignore_index=True)
+    assert profile.rows == len(df)
+    assert profile.columns == list(df.columns)
+    pd.testing.assert_series_equal(profile.null_counts, df.isnull().sum())
+    assert profile.dtypes.to_dict() == df.dtypes.astype(str).to_dict()
+    numeric = ['arrival_date_year', 'is_canceled', 'lead_time', 'adr']
+    assert profile.numeric_columns == numeric
+    described, expected = profile.describe(), df[numeric].describe()
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(described.loc[exact], expected.loc[exact])
+    # Quartiles are data values rather than interpolated, within the sketch's rank error
+    for col in numeric:
+        values = np.sort(df[col].dropna().to_numpy())
+        for q, label in [(0.25, '25%'), (0.5, '50%'), (0.75, '75%')]:
+            low = np.searchsorted(values, described.loc[label, col], side='left') / len(values)
+            high = np.searchsorted(values, described.loc[label, col], side='right') / len(values)
+            assert max(0.0, low - q, q - high) <= profile.sketches[col].rank_error
+    assert profile.rate('is_canceled') == df['is_canceled'].mean()
+    # Built once, then read back from the saved profile files
+    assert all(os.path.exists(dataset_profile.profile_path(path)) for path in paths)
@@ -0,0 +1,85 @@
+import json
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import ensemble
+
+pytest.importorskip('statsmodels')
+prophet = pytest.importorskip('prophet')
+
+
+def _series(days=150):
+    t = np.arange(days)
+    guests = 150 + 20 * np.sin(2 * np.pi * t / 7) + np.random.default_rng(0).normal(0, 5, days)
+    return pd.Series(guests, index=pd.date_range('2017-01-01', periods=days, freq='D'))
+
+
+@pytest.fixture(scope='module')
+def members(tmp_path_factory):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    directory = tmp_path_factory.mktemp('members')
+    series = _series()
+    paths = {'sarimax': str(directory / 'model.joblib'), 'prophet': str(directory / 'prophetmodel.joblib')}
+    joblib.dump(SARIMAX(series, order=(1, 0, 0), seasonal_order=(0, 1, 1, 7)).fit(disp=False), paths['sarimax'])
+    joblib.dump(prophet.Prophet(yearly_seasonality=False)
+                .fit(pd.DataFrame({'ds': series.index, 'y': series.to_numpy()})), paths['prophet'])
+    return paths
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    ensemble.load_member.cache_clear()
+    ensemble.member_forecast.cache_clear()
+
+
+def test_weights_follow_member_errors(monkeypatch, tmp_path):
+    mae = {'sarimax': np.array([2.0, 4.0, 6.0]), 'prophet': np.array([6.0, 4.0, 3.0])}
+
+    def backtest_run(series, kind, *args, **kwargs):
+        return {'metrics': pd.DataFrame({'mae': mae[kind]}, index=pd.RangeIndex(1, 4, name='step'))}
+
+    monkeypatch.setattr(ensemble.backtest, 'run', backtest_run)
+    path = str(tmp_path / 'weights.json')
+
+    learned = ensemble.learn_weights(_series(), horizon=3, path=path)
+
+    np.testing.assert_allclose(learned['weight']['sarimax'], [0.75, 0.5, 1 / 3])
+    np.testing.assert_allclose(learned['weight']['prophet'], [0.25, 0.5, 2 / 3])
+    with open(path) as handle:
+        assert json.load(handle) == learned
+
+
+def test_blend_uses_the_learned_weights(members, tmp_path):
+    weights_path = str(tmp_path / 'weights.json')
+    with open(weights_path, 'w') as handle:
+        json.dump({'horizon': 2, 'mae': {'sarimax': [1.0, 2.0], 'prophet': [3.0, 2.0]}}, handle)
+
+    blend = ensemble.forecast('2017-05-31', '2017-06-04', members=members, weights_path=weights_path)
+
+    # Days 1 and 2 after training use their own step; later days use the last step
+    np.testing.assert_allclose(blend['sarimax_weight'], [0.75, 0.5, 0.5, 0.5, 0.5])
+    np.testing.assert_allclose(blend['sarimax_weight'] + blend['prophet_weight'], 1.0)
+    expected = blend['sarimax_weight'] * blend['sarimax_yhat'] + blend['prophet_weight'] * blend['prophet_yhat']
+    np.testing.assert_allclose(blend['yhat'], expected)
+
+
+def test_unchanged_models_are_served_from_the_cache(members, monkeypatch, tmp_path):
+    weights_path = str(tmp_path / 'missing.json')
+    first = ensemble.forecast('2017-05-31', '2017-06-30', members=members, weights_path=weights_path)
+    np.testing.assert_allclose(first['sarimax_weight'], 0.5)
+
+    def forecast_again(model, steps):
+        raise AssertionError('a member forecast was computed again')
+
+    monkeypatch.setitem(ensemble.FORECASTERS, 'sarimax', forecast_again)
+    monkeypatch.setitem(ensemble.FORECASTERS, 'prophet', forecast_again)
+    # A shorter request inside the cached horizon only slices it
+    second = ensemble.forecast('2017-06-05', '2017-06-20', members=members, weights_path=weights_path)
+
+    pd.testing.assert_frame_equal(second, first.loc['2017-06-05':'2017-06-20'], check_freq=False)
+    assert ensemble.load_member.cache_info().misses == 2
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('plotly')
+import plotly.graph_objects as go  # noqa: E402
+
+import forecast_charts  # noqa: E402
+
+STYLE = forecast_charts.STYLES['Luxury Gold']
+
+
+def _forecast(days):
+    dates = pd.date_range('2017-09-01', periods=days)
+    values = np.random.default_rng(days).normal(150, 30, days)
+    return dates, values
+
+
+def test_short_horizon_is_plotted_exactly():
+    dates, values = _forecast(30)
+
+    fig = forecast_charts.forecast_figure(dates, values, 'Forecast', style=STYLE,
+                                          lower=values - 10, upper=values + 10)
+
+    assert len(fig.data) == 3
+    np.testing.assert_array_equal(fig.data[-1].y, values)
+    assert fig.data[-1].mode == 'lines+markers'
+    assert fig.layout.title.text == 'Forecast'
+    # What plotly's validation would have produced
+    assert json.loads(go.Figure(fig).to_json()) == json.loads(fig.to_json())
+
+
+def test_decimated_horizon_hovers_over_each_bucket():
+    dates, values = _forecast(3000)
+
+    fig = forecast_charts.forecast_figure(dates, values, 'Forecast', style=STYLE,
+                                          lower=values - 10, upper=values + 10)
+
+    assert len(fig.data) == 3
+    line = fig.data[-1]
+    assert len(line.y) <= forecast_charts.MAX_POINTS
+    # Each point's hover covers its bucket's days exactly
+    days, low, high = np.asarray(line.customdata).T
+    assert days.sum() == len(values)
+    ends = np.cumsum(days).astype(int)
+    np.testing.assert_array_equal(low, [values[end - size:end].min() for end, size in zip(ends, days.astype(int))])
+    np.testing.assert_array_equal(high, [values[end - size:end].max() for end, size in zip(ends, days.astype(int))])
+    # The band is each bucket's envelope
+    np.testing.assert_array_equal(fig.data[0].y, high + 10)
+    np.testing.assert_array_equal(fig.data[1].y, low - 10)
+    undecimated = forecast_charts.forecast_figure(dates, values, 'Forecast', style=STYLE, lower=values - 10,
+                                                  upper=values + 10, max_points=len(values))
+    assert len(fig.to_json()) < len(undecimated.to_json()) / 2
+
+
+def test_figures_do_not_share_the_cached_layout():
+    dates, values = _forecast(30)
+    first = forecast_charts.forecast_figure(dates, values, 'First', style=STYLE)
+    first.update_layout(title_font_size=5, xaxis_gridcolor='red')
+    first.data[-1].line.color = 'blue'
+
+    second = forecast_charts.forecast_figure(dates, values, 'Second', style=STYLE)
+
+    assert second.layout.title.text == 'Second'
+    assert second.layout.title.font.size == STYLE.title_size
+    assert second.layout.xaxis.gridcolor == 'rgba(255, 255, 255, 0.1)'
+    assert second.data[-1].line.color == STYLE.line
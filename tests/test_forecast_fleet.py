@@ -0,0 +1,72 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast_fleet
+
+
+def _series(n=120):
+    return pd.Series(np.arange(n, dtype=np.float64) + 0.123456789, index=pd.date_range('2017-01-01', periods=n))
+
+
+def _quick_fit(series, spec):
+    return {'total': float(series.sum())}
+
+
+def _crash(series, spec):
+    os._exit(3)
+
+
+@pytest.fixture
+def fitters(monkeypatch):
+    # Worker processes inherit the patched table
+    monkeypatch.setitem(forecast_fleet.FITTERS, 'quick', _quick_fit)
+    monkeypatch.setitem(forecast_fleet.FITTERS, 'crash', _crash)
+
+
+def test_every_series_is_fitted(fitters):
+    jobs = {f'series {i}': _series() for i in range(12)}
+
+    entries = forecast_fleet._fit_all('quick', jobs, {}, workers=4, timeout=60)
+
+    assert set(entries) == set(jobs)
+    assert all(entry['status'] == 'ok' for entry in entries.values())
+
+
+def test_result_sent_just_before_exit_is_kept(fitters, monkeypatch):
+    receive = forecast_fleet._receive
+    polled = set()
+
+    def late_receive(receiver):
+        # The first poll misses the result; by the time the worker is checked it has exited
+        if receiver not in polled:
+            polled.add(receiver)
+            time.sleep(0.5)
+            return None
+        return receive(receiver)
+
+    monkeypatch.setattr(forecast_fleet, '_receive', late_receive)
+
+    entries = forecast_fleet._fit_all('quick', {'total': _series()}, {}, workers=1, timeout=60)
+
+    assert entries['total']['status'] == 'ok'
+
+
+def test_crashed_worker_is_marked_failed(fitters):
+    entries = forecast_fleet._fit_all('crash', {'total': _series()}, {}, workers=1, timeout=60)
+
+    assert entries['total']['status'] == 'failed'
+    assert 'code 3' in entries['total']['error']
+
+
+def test_sarimax_training_series_keeps_float64():
+    pytest.importorskip('statsmodels')
+    series = _series() % 7
+
+    fitted = forecast_fleet._fit_sarimax(series, {'order': (1, 0, 0), 'seasonal_order': (0, 0, 0, 0)})
+
+    assert fitted['series'].dtype == np.float64
+    np.testing.assert_array_equal(fitted['series'], series.to_numpy())
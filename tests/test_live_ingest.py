@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+import booking_store
+import dataset_profile
+import live_ingest
+
+
+def _raw(rows, seed, countries=('PRT', 'GBR', 'FRA')):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'hotel': rng.choice(['City Hotel', 'Resort Hotel'], rows),
+        'arrival_date_year': rng.choice([2016, 2017], rows),
+        'country': rng.choice(list(countries), rows),
+        'is_canceled': rng.integers(0, 2, rows),
+        'adr': rng.normal(100, 30, rows),
+        'lead_time': rng.integers(0, 300, rows),
+        'stays_in_weekend_nights': rng.integers(0, 3, rows),
+        'stays_in_week_nights': rng.integers(0, 6, rows),
+        'adults': rng.integers(1, 3, rows),
+        'children': rng.integers(0, 2, rows),
+        'babies': 0,
+    })
+
+
+class _Batches:
+    """A LogTail stand-in that hands out one prepared batch per poll."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    def read_new(self):
+        return self.batches.pop(0).copy() if self.batches else pd.DataFrame()
+
+
+def _live(base, *batches):
+    base_profile = dataset_profile.DatasetProfile.from_frame(base)
+    return live_ingest.LiveBookings(base, base_profile, tail=_Batches(*batches))
+
+
+def _build_views(live):
+    live.sketch_index().group_sketches('country', 'adr')
+    live.country_index()
+    return live.agg_engine(), live.country_index(), live.sketch_index()
+
+
+def _assert_matches_rebuild(live, frame):
+    # Fewer rows than a sketch holds, so the sketches are exact and comparable
+    rebuilt = _live(frame)
+    pd.testing.assert_frame_equal(live.frame, frame)
+    assert live.profile().rows == len(frame)
+    pd.testing.assert_series_equal(live.profile().null_counts, rebuilt.profile().null_counts)
+    pd.testing.assert_frame_equal(live.profile().describe(), rebuilt.profile().describe())
+    pd.testing.assert_frame_equal(live.sketch_index().describe(), rebuilt.sketch_index().describe())
+    pd.testing.assert_frame_equal(live.sketch_index().group_quantile('country', 'adr'),
+                                  rebuilt.sketch_index().group_quantile('country', 'adr'))
+    for by, column, func in [('country', 'adr', 'mean'), ('hotel', 'lead_time', 'median')]:
+        pd.testing.assert_frame_equal(live.agg_engine().aggregate(by, column, func),
+                                      rebuilt.agg_engine().aggregate(by, column, func))
+    index, expected = live.country_index(), rebuilt.country_index()
+    pd.testing.assert_frame_equal(index.summary, expected.summary)
+    for country in expected.countries:
+        np.testing.assert_array_equal(index.rows(country), expected.rows(country))
+
+
+def test_batch_with_a_new_country_matches_a_rebuild():
+    base = booking_store.prepare_bookings(_raw(60, seed=0))
+    batch = _raw(10, seed=1, countries=('PRT', 'AUT'))
+    batch['booking_id'] = np.arange(10)
+    live = _live(base, batch)
+    engine, index, sketches = _build_views(live)
+    summary = index.summary.copy()
+
+    assert live.poll() == 10
+
+    new_rows = booking_store.prepare_bookings(batch.drop(columns='booking_id'))
+    _assert_matches_rebuild(live, pd.concat([base, new_rows], ignore_index=True))
+    # Extended copies: views handed out before the poll are unchanged
+    assert live.agg_engine() is not engine and len(engine.df) == len(base)
+    assert live.sketch_index() is not sketches and sketches.columns['adr'].count == len(base)
+    assert 'AUT' not in index and index.summary.equals(summary)
+
+
+def test_replaced_booking_id_matches_a_rebuild():
+    base = booking_store.prepare_bookings(_raw(60, seed=0))
+    first = _raw(10, seed=1, countries=('PRT', 'AUT'))
+    first['booking_id'] = np.arange(10)
+    # Booking 3 changes, booking 10 is new
+    second = _raw(2, seed=2)
+    second['booking_id'] = [3, 10]
+    live = _live(base, first, second)
+    _build_views(live)
+    live.poll()
+    _build_views(live)
+
+    assert live.poll() == 2
+
+    assert live.live_rows == 11
+    kept = first[first['booking_id'] != 3]
+    new_rows = booking_store.prepare_bookings(pd.concat([kept, second]).drop(columns='booking_id'))
+    _assert_matches_rebuild(live, pd.concat([base, new_rows], ignore_index=True))
@@ -0,0 +1,21 @@
+import logging
+import socket
+
+import metrics
+
+
+def test_taken_port_is_tried_and_logged_once(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, '_server', None)
+    monkeypatch.setattr(metrics, '_failed_port', None)
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+
+        with caplog.at_level(logging.WARNING, logger='metrics'):
+            # One call per Streamlit rerun
+            results = [metrics.start_server('dashboard', port=port) for _ in range(3)]
+
+    assert results == [None, None, None]
+    assert len(caplog.records) == 1
+    assert metrics._failed_port == port
@@ -0,0 +1,83 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import prophet_retrain
+
+prophet = pytest.importorskip('prophet')
+
+
+def _guests(days, seed=0):
+    t = np.arange(len(days))
+    weekly = 20 * np.sin(2 * np.pi * t / 7)
+    return 150 + 0.05 * t + weekly + np.random.default_rng(seed).normal(0, 5, len(days))
+
+
+@pytest.fixture(scope='module')
+def model():
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    days = pd.date_range('2016-01-01', '2017-06-30')
+    history = pd.DataFrame({'ds': days, 'y': _guests(days)})
+    # BFGS, so the previous fit is at its optimum, as after a first warm retrain
+    return prophet.Prophet(changepoint_prior_scale=0.001, yearly_seasonality=False,
+                           uncertainty_samples=0).fit(history, algorithm='BFGS')
+
+
+def _new_days(model, count):
+    days = pd.date_range(model.history['ds'].max() + pd.Timedelta(days=1), periods=count)
+    return pd.Series(_guests(days, seed=1) + 5, index=days)
+
+
+def test_extended_history_keeps_days_already_trained_on(model):
+    last = model.history['ds'].max()
+    # A bookings file with only the latest records: a partial total for the last trained day
+    observations = pd.Series([1.0, 160.0], index=[last, last + pd.Timedelta(days=1)])
+
+    history = prophet_retrain.extended_history(model, observations)
+
+    assert len(history) == len(model.history) + 1
+    assert history['y'].iloc[-2] == model.history['y'].iloc[-1]
+    assert history['y'].iloc[-1] == 160.0
+
+
+def test_warm_start_moves_deltas_off_the_kink(model):
+    history = prophet_retrain.extended_history(model, _new_days(model, 7))
+
+    init = prophet_retrain.warm_start(model, history)
+
+    offset = prophet_retrain.KINK_OFFSET * model.changepoint_prior_scale
+    assert (np.abs(init['delta']) >= offset).all()
+    previous = prophet_retrain.rescaled_parameters(model, history)['delta']
+    large = np.abs(previous) >= offset
+    np.testing.assert_array_equal(init['delta'][large], previous[large])
+
+
+def test_warm_retrain_reaches_the_cold_optimum(model):
+    new_model, report = prophet_retrain.retrain(model, _new_days(model, 7), compare=True)
+
+    assert report['fit'] == 'warm' and report['added'] == 7
+    assert new_model.changepoints.equals(model.changepoints)
+    assert report['log_prob'] >= report['cold_log_prob'] - 0.5
+    assert report['drift'].loc['k', 'relative_change'] < 0.5
+
+
+def test_long_append_is_fitted_cold(model):
+    new_model, report = prophet_retrain.retrain(model, _new_days(model, prophet_retrain.MAX_WARM_DAYS + 1))
+
+    assert report['fit'] == 'cold'
+    assert new_model.history['ds'].max() > model.history['ds'].max()
+
+
+def test_repeated_warm_appends_are_refitted_cold(model):
+    first, report = prophet_retrain.retrain(model, _new_days(model, 7))
+    assert report['fit'] == 'warm' and report['warm_days'] == 7
+    second, report = prophet_retrain.retrain(first, _new_days(first, prophet_retrain.MAX_WARM_DAYS - 7))
+    assert report['fit'] == 'warm' and report['warm_days'] == prophet_retrain.MAX_WARM_DAYS
+
+    third, report = prophet_retrain.retrain(second, _new_days(second, 1))
+
+    assert report['fit'] == 'cold' and report['warm_days'] == 0
+    # Placed again over the longer history, so the newer days can hold a changepoint
+    assert third.changepoints.max() > second.changepoints.max()
@@ -0,0 +1,85 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quantile_sketch import KLLSketch, SketchIndex
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_errors(values, estimates, qs=QS):
+    # Distance from each q to the range of ranks the estimate holds in the data
+    values = np.sort(values)
+    low = np.searchsorted(values, estimates, side='left') / len(values)
+    high = np.searchsorted(values, estimates, side='right') / len(values)
+    return np.maximum(0.0, np.maximum(low - qs, qs - high))
+
+
+def _data(kind, seed, n=100_000):
+    rng = np.random.default_rng(seed)
+    if kind == 'normal':
+        return rng.normal(size=n)
+    if kind == 'exponential':
+        return rng.exponential(size=n)
+    return rng.integers(0, 50, n).astype(np.float64)
+
+
+@pytest.mark.parametrize('kind', ['normal', 'exponential', 'integers'])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_rank_error_within_bound(kind, seed):
+    values = _data(kind, seed)
+    sketch = KLLSketch(seed=seed)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+
+    errors = _rank_errors(values, sketch.quantiles(QS))
+
+    # rank_error is a typical, not a worst-case, error
+    assert errors.mean() <= sketch.rank_error
+    assert errors.max() <= 2 * sketch.rank_error
+
+
+def test_merged_sketches_keep_the_bound():
+    values = _data('normal', 3)
+    parts = [KLLSketch(seed=i).update(chunk) for i, chunk in enumerate(np.array_split(values, 8))]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.count == len(values)
+    assert _rank_errors(values, merged.quantiles(QS)).max() <= 2 * merged.rank_error
+
+
+def test_exact_statistics_match_pandas():
+    values = pd.Series(_data('exponential', 4, n=10_000))
+    values[::97] = np.nan
+    sketch = KLLSketch(seed=0).update(values.to_numpy())
+    expected = values.describe()
+
+    described = sketch.describe()
+
+    for stat in ['count', 'mean', 'std', 'min', 'max']:
+        assert described[stat] == pytest.approx(expected[stat])
+    assert sketch.quantile(0.0) == expected['min']
+    assert sketch.quantile(1.0) == expected['max']
+
+
+def test_empty_sketch_has_no_quantiles():
+    assert np.isnan(KLLSketch().update([np.nan]).quantile(0.5))
+
+
+def test_appending_to_a_copied_index_leaves_the_original():
+    df = pd.DataFrame({'adr': _data('normal', 5, n=5000), 'hotel': np.repeat(['City', 'Resort'], 2500)})
+    index = SketchIndex(df)
+    index.group_sketches('hotel', 'adr')
+    described, medians = index.describe(), index.group_quantile('hotel', 'adr')
+    new_rows = pd.DataFrame({'adr': _data('exponential', 6, n=5000) + 10, 'hotel': 'City'})
+
+    extended = copy.copy(index).append(new_rows)
+
+    pd.testing.assert_frame_equal(index.describe(), described)
+    pd.testing.assert_frame_equal(index.group_quantile('hotel', 'adr'), medians)
+    assert extended.describe()['adr']['count'] == 10_000
+    assert extended.group_sketches('hotel', 'adr')['City'].count == 7500
@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import query_backend
+
+pytest.importorskip('duckdb')
+
+
+def _bookings():
+    rng = np.random.default_rng(0)
+    rows = 200
+    return pd.DataFrame({
+        'hotel': rng.choice(['City Hotel', 'Resort Hotel'], rows),
+        'country': rng.choice(['PRT', 'GBR', 'FRA', None], rows),
+        'is_canceled': rng.integers(0, 2, rows),
+        'adr': rng.normal(100, 30, rows),
+        'lead_time': rng.integers(0, 300, rows),
+        'total stayed': rng.integers(1, 10, rows),
+    })
+
+
+def test_backends_agree_on_the_summary():
+    df = _bookings()
+    spec = query_backend.summary_spec('country', df.columns)
+
+    expected = query_backend.PandasBackend().aggregate(df, spec)
+    result = query_backend.DuckDBBackend(threads=2).aggregate(df, spec)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result['Total_Bookings'].dtype == expected['Total_Bookings'].dtype
+
+
+def test_each_thread_gets_its_own_cursor():
+    df = _bookings()
+    spec = query_backend.summary_spec('hotel', df.columns)
+    backend = query_backend.DuckDBBackend(threads=2)
+    cursors, results = [], []
+
+    def aggregate():
+        cursors.append(backend._cursor())
+        results.append(backend.aggregate(df, spec))
+
+    threads = [threading.Thread(target=aggregate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert len({id(cursor) for cursor in cursors}) == 4
+    expected = query_backend.PandasBackend().aggregate(df, spec)
+    for result in results:
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ranking
+
+
+def _countries():
+    # GBR and FRA tie, as do ESP, DEU and ITA; the first seen of each tie is not the first sorted
+    counts = {'PRT': 5, 'GBR': 3, 'FRA': 3, 'ESP': 2, 'DEU': 2, 'ITA': 2, 'AUT': 1}
+    values = [country for country, count in counts.items() for _ in range(count)] + [None] * 4
+    order = np.random.default_rng(0).permutation(len(values))
+    return pd.Series(np.array(values, dtype=object)[order], name='country')
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 10])
+def test_top_counts_matches_value_counts(n):
+    countries = _countries()
+    codes, uniques = pd.factorize(countries, sort=True)
+
+    result = ranking.top_counts(codes, uniques, n, index_name='country')
+
+    pd.testing.assert_series_equal(result, countries.value_counts().head(n))
+
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_top_rows_matches_a_stable_sort(ascending):
+    table = pd.DataFrame({'country': list('abcdefgh'),
+                          'mean': [3.0, 1.0, 3.0, np.nan, 2.0, 1.0, 3.0, 2.0],
+                          'count': [60, 60, 10, 60, 60, 60, 60, 60]})
+
+    result = ranking.top_rows(table, 'mean', 3, ascending=ascending, min_count=50)
+
+    expected = table[table['count'] >= 50].sort_values('mean', ascending=ascending, kind='stable').head(3)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reconciliation
+
+
+@pytest.fixture(scope='module')
+def hierarchy():
+    bottom = pd.DataFrame({'hotel': ['City Hotel'] * 3 + ['Resort Hotel'] * 2,
+                           'market_segment': ['Direct', 'Groups', 'Online TA', 'Direct', 'Online TA']})
+    return reconciliation.Hierarchy(bottom)
+
+
+def _base(hierarchy, days=30, seed=0):
+    # Incoherent base forecasts: every node forecast separately, with noise
+    rng = np.random.default_rng(seed)
+    bottom = rng.uniform(10, 50, (days, len(hierarchy.bottom)))
+    coherent = bottom @ hierarchy.S.T.toarray()
+    index = pd.date_range('2017-09-01', periods=days)
+    return pd.DataFrame(coherent + rng.normal(0, 3, coherent.shape), index=index, columns=hierarchy.nodes)
+
+
+def _residuals(hierarchy, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(0, 2, (200, len(hierarchy))), columns=hierarchy.nodes)
+
+
+def test_summing_matrix(hierarchy):
+    assert hierarchy.aggregates == ['total', 'hotel=City Hotel', 'hotel=Resort Hotel']
+    assert hierarchy.S.shape == (8, 5)
+    np.testing.assert_array_equal(hierarchy.S_agg.toarray(), [[1, 1, 1, 1, 1], [1, 1, 1, 0, 0], [0, 0, 0, 1, 1]])
+
+
+@pytest.mark.parametrize('method', reconciliation.METHODS)
+def test_reconciled_forecasts_are_coherent(hierarchy, method):
+    base = _base(hierarchy)
+    assert hierarchy.incoherence(base) > 1
+
+    reconciled = hierarchy.reconcile(base, method, residuals=_residuals(hierarchy), history=base)
+
+    assert list(reconciled.columns) == hierarchy.nodes
+    assert hierarchy.incoherence(reconciled) < 1e-9
+
+
+def test_bottom_up_keeps_the_bottom_level(hierarchy):
+    base = _base(hierarchy)
+
+    reconciled = hierarchy.reconcile(base, 'bottom_up')
+
+    pd.testing.assert_frame_equal(reconciled[hierarchy.bottom], base[hierarchy.bottom])
+
+
+@pytest.mark.parametrize('method', ['ols', 'wls', 'mint'])
+def test_coherent_forecasts_are_unchanged(hierarchy, method):
+    coherent = hierarchy.reconcile(_base(hierarchy), 'bottom_up')
+
+    reconciled = hierarchy.reconcile(coherent, method, residuals=_residuals(hierarchy))
+
+    np.testing.assert_allclose(reconciled.to_numpy(), coherent.to_numpy())
+
+
+def test_missing_node_is_an_error(hierarchy):
+    base = _base(hierarchy).drop(columns=['hotel=Resort Hotel|market_segment=Direct'])
+
+    with pytest.raises(ValueError, match='No forecast'):
+        hierarchy.reconcile(base, 'ols')
+
+
+def test_shrunk_covariance_is_positive_definite():
+    # Fewer dates than nodes: the sample covariance alone is singular
+    residuals = np.random.default_rng(2).normal(size=(10, 25))
+
+    covariance = reconciliation.shrunk_covariance(residuals)
+
+    assert np.linalg.eigvalsh(covariance).min() > 0
+    np.testing.assert_allclose(np.diag(covariance), residuals.var(axis=0, ddof=1))
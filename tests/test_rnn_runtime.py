@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import rnn_runtime
+
+
+def _dense(units_in, units_out, activation='linear'):
+    return {'type': 'Dense', 'activation': activation}, [np.ones((units_in, units_out)), np.zeros(units_out)]
+
+
+def test_simple_rnn_matches_hand_computed_steps():
+    # One unit: h1 = tanh(0.5 * x1), h2 = tanh(0.5 * x2 + 0.3 * h1); two timesteps of one feature
+    rnn = {'type': 'SimpleRNN', 'activation': 'tanh'}, [np.array([[0.5]]), np.array([[0.3]]), np.zeros(1)]
+    network = rnn_runtime.Network(*zip(rnn, _dense(1, 1)), look_back=1)
+    x = np.array([[[1.0], [2.0]]])
+
+    h1 = np.tanh(0.5)
+    expected = np.tanh(1.0 + 0.3 * h1)
+
+    np.testing.assert_allclose(network.predict(x), [expected])
+
+
+def test_lstm_matches_hand_computed_step():
+    # One unit, Keras gate order i, f, c, o; kernel and bias are (1, 4) and (4,)
+    kernel = np.array([[1.0, 2.0, 3.0, 4.0]])
+    bias = np.array([0.1, 0.2, 0.3, 0.4])
+    lstm = ({'type': 'LSTM', 'activation': 'tanh', 'recurrent_activation': 'sigmoid'},
+            [kernel, np.zeros((1, 4)), bias])
+    network = rnn_runtime.Network(*zip(lstm, _dense(1, 1)), look_back=1)
+
+    sigmoid = lambda v: 1 / (1 + np.exp(-v))  # noqa: E731
+    z = 0.5 * kernel[0] + bias
+    c = sigmoid(z[0]) * np.tanh(z[2])
+    expected = sigmoid(z[3]) * np.tanh(c)
+
+    np.testing.assert_allclose(network.predict(np.array([[0.5]])), [expected])
+
+
+@pytest.mark.parametrize('version, expected', [('2.15.0', 0.2 * 1.5 + 0.5), ('3.3.3', 1.5 / 6 + 0.5)])
+def test_hard_sigmoid_follows_the_keras_version(version, expected):
+    layer = _dense(1, 1, 'hard_sigmoid')
+    network = rnn_runtime.Network([layer[0]], [layer[1]], look_back=1, keras_version=version)
+
+    # Dense-only, so the output keeps its timestep axis
+    np.testing.assert_allclose(network.predict(np.array([[1.5]])).ravel(), [expected])
+
+
+def test_hard_sigmoid_without_a_keras_version_is_rejected():
+    layer = _dense(1, 1, 'hard_sigmoid')
+
+    with pytest.raises(ValueError, match='hard_sigmoid'):
+        rnn_runtime.Network([layer[0]], [layer[1]], look_back=1)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    rnn = {'type': 'SimpleRNN', 'activation': 'relu'}, [rng.normal(size=(7, 4)), rng.normal(size=(4, 4)), np.zeros(4)]
+    network = rnn_runtime.Network(*zip(rnn, _dense(4, 1)), look_back=7, scale=(10.0, 90.0), keras_version='3.3.3')
+    path = str(tmp_path / 'rnn.npz')
+    network.save(path)
+
+    loaded = rnn_runtime.Network.load(path)
+
+    assert loaded.keras_version == '3.3.3' and loaded.scale == (10.0, 90.0)
+    history = rng.uniform(10, 90, (3, 30))
+    np.testing.assert_array_equal(loaded.forecast(history, 5), network.forecast(history, 5))
+
+
+def _keras_model(keras, kind, look_back, recurrent_activation='sigmoid'):
+    # The notebook's architectures
+    if kind == 'rnn':
+        layers = [keras.layers.SimpleRNN(32, activation='relu'), keras.layers.Dense(8, activation='relu')]
+    else:
+        layers = [keras.layers.LSTM(100, activation='relu', recurrent_activation=recurrent_activation),
+                  keras.layers.Dense(4)]
+    model = keras.Sequential([keras.Input(shape=(1, look_back))] + layers + [keras.layers.Dense(1)])
+    rng = np.random.default_rng(1)
+    # Larger than initial weights, so the activations leave their linear ranges
+    model.set_weights([rng.normal(0, 0.5, w.shape) for w in model.get_weights()])
+    return model
+
+
+@pytest.mark.parametrize('kind, recurrent_activation', [('rnn', None), ('lstm', 'sigmoid'), ('lstm', 'hard_sigmoid')])
+def test_matches_keras(kind, recurrent_activation):
+    keras = pytest.importorskip('keras')
+    look_back = 7
+    model = _keras_model(keras, kind, look_back, recurrent_activation)
+    x = np.random.default_rng(2).uniform(0, 1, (64, 1, look_back)).astype(np.float32)
+
+    network = rnn_runtime.Network.from_keras(model)
+
+    assert network.keras_version == keras.__version__
+    np.testing.assert_allclose(network.predict(x), model.predict(x, verbose=0)[:, 0], rtol=1e-4, atol=1e-5)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sarimax_updater
+
+pytest.importorskip('statsmodels')
+from statsmodels.tsa.statespace.sarimax import SARIMAX  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def guests():
+    days = pd.date_range('2017-01-01', periods=120)
+    weekly = 10 * np.sin(2 * np.pi * np.arange(120) / 7)
+    return pd.Series(100 + weekly + np.random.default_rng(0).normal(0, 3, 120), index=days, name='guests')
+
+
+@pytest.mark.parametrize('endog', ['series', 'frame', 'unnamed'])
+def test_advance_aligns_observations_to_the_endog(guests, endog):
+    data = {'series': guests, 'frame': guests.to_frame(), 'unnamed': guests.rename(None)}[endog]
+    results = SARIMAX(data, order=(1, 0, 0), seasonal_order=(0, 1, 1, 7)).fit(disp=False)
+    # A forecast is named 'predicted_mean', unlike the endog
+    week = results.forecast(steps=7)
+
+    advanced, added = sarimax_updater.advance(results, week)
+
+    assert added == 7
+    assert sarimax_updater.last_observed(advanced) == guests.index[-1] + pd.Timedelta(days=7)
+    np.testing.assert_allclose(advanced.params, results.params)
+
+
+def test_advance_rejects_missing_days(guests):
+    results = SARIMAX(guests, order=(1, 0, 0)).fit(disp=False)
+    last = guests.index[-1]
+    observations = pd.Series([5.0, 7.0], index=[last, last + pd.Timedelta(days=3)])
+
+    with pytest.raises(ValueError, match='2 days .* have no observations'):
+        sarimax_updater.advance(results, observations)
+
+
+def test_advance_stops_at_the_cutoff(guests):
+    results = SARIMAX(guests, order=(1, 0, 0)).fit(disp=False)
+    last = guests.index[-1]
+    observations = pd.Series([5.0, 6.0, 7.0], index=pd.date_range(last + pd.Timedelta(days=1), periods=3))
+
+    advanced, added = sarimax_updater.advance(results, observations, until=last + pd.Timedelta(days=2))
+
+    assert added == 2
+    assert sarimax_updater.last_observed(advanced) == last + pd.Timedelta(days=2)
+
+
+def test_future_arrivals_are_not_observed(guests):
+    results = SARIMAX(guests, order=(1, 0, 0)).fit(disp=False)
+    # Bookings for arrivals from today on, whose cancellations are not known yet
+    future = pd.Series(1.0, index=pd.date_range(sarimax_updater.yesterday() + pd.Timedelta(days=1), periods=3))
+
+    advanced, added = sarimax_updater.advance(results, future)
+
+    assert added == 0
+    assert advanced is results
+
+
+def test_advance_without_new_days_keeps_the_results(guests):
+    results = SARIMAX(guests, order=(1, 0, 0)).fit(disp=False)
+
+    advanced, added = sarimax_updater.advance(results, guests.iloc[-5:])
+
+    assert added == 0
+    assert advanced is results
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import scenarios
+
+pytest.importorskip('statsmodels')
+
+
+@pytest.fixture(scope='module')
+def results():
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    t = np.arange(150)
+    guests = 150 + 20 * np.sin(2 * np.pi * t / 7) + np.random.default_rng(0).normal(0, 5, len(t))
+    series = pd.Series(guests, index=pd.date_range('2017-01-01', periods=len(t), freq='D'))
+    return SARIMAX(series, order=(1, 0, 0), seasonal_order=(0, 1, 1, 7)).fit(disp=False)
+
+
+def test_paths_are_reproducible_from_a_seed(results):
+    first = scenarios.sarimax_paths(results, 28, n=200, seed=1)
+
+    np.testing.assert_array_equal(scenarios.sarimax_paths(results, 28, n=200, seed=1), first)
+    assert first.shape == (200, 28)
+    assert not np.array_equal(scenarios.sarimax_paths(results, 28, n=200, seed=2), first)
+
+
+def test_paths_match_the_forecast_distribution(results):
+    paths = scenarios.sarimax_paths(results, 14, n=4000, seed=0)
+
+    forecast = results.get_forecast(steps=14)
+    np.testing.assert_allclose(paths.mean(axis=0), forecast.predicted_mean, atol=2.0)
+    np.testing.assert_allclose(paths.std(axis=0), np.sqrt(forecast.var_pred_mean), rtol=0.1)
+
+
+def test_window_quantiles_and_exceedance(results):
+    sims = scenarios.Scenarios(scenarios.sarimax_paths(results, 28, n=1000, seed=0), '2017-05-31')
+    start, end = '2017-06-05', '2017-06-18'
+
+    sums = sims.window_sums(start, end)
+    np.testing.assert_allclose(sums, sims.paths[:, 5:19].sum(axis=1))
+    quantiles = sims.quantiles(start, end)
+    assert quantiles.is_monotonic_increasing
+    daily = sims.daily_quantiles(start, end)
+    assert (np.diff(daily.to_numpy(), axis=1) >= 0).all()
+
+    capacities = np.linspace(sums.min() - 1, sums.max() + 1, 50)
+    chances = [sims.exceedance(start, end, capacity) for capacity in capacities]
+    assert chances[0] == 1.0 and chances[-1] == 0.0
+    assert (np.diff(chances) <= 0).all()
+    assert sims.exceedance(start, end, quantiles[0.5]) == pytest.approx(0.5, abs=0.01)
+
+
+def test_window_outside_the_simulated_days_is_rejected():
+    sims = scenarios.Scenarios(np.ones((10, 7)), '2017-06-01')
+
+    with pytest.raises(ValueError, match='outside'):
+        sims.window_sums('2017-06-05', '2017-06-08')
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import shared_dataset
+
+
+def _frame(rows):
+    return pd.DataFrame({'adr': np.zeros(rows)})
+
+
+def test_clear_releases_the_charged_bytes():
+    cache = shared_dataset.SelectionCache(max_bytes=10**9)
+    load = cache('load')(lambda version, hotels, years: _frame(1000))
+    other = cache('other')(lambda version, hotels, years: _frame(500))
+
+    load('v1', None, None)
+    other('v1', None, None)
+    assert cache.nbytes() == 12000
+
+    load.clear()
+
+    assert cache.nbytes() == 4000
+
+
+def test_slow_build_does_not_block_other_hits():
+    cache = shared_dataset.SelectionCache(max_bytes=10**9)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def build(version, hotels, years):
+        calls.append(hotels)
+        if hotels == 'slow':
+            started.set()
+            release.wait(5)
+        return _frame(10)
+
+    load = cache('load')(build)
+    fast = load('v1', 'fast', None)
+    slow = [threading.Thread(target=load, args=('v1', 'slow', None)) for _ in range(2)]
+    for thread in slow:
+        thread.start()
+    assert started.wait(5)
+
+    # Served while the slow selection is still being built
+    assert load('v1', 'fast', None) is fast
+
+    release.set()
+    for thread in slow:
+        thread.join(5)
+    assert calls == ['fast', 'slow']
+
+
+def test_publish_keeps_the_previous_version(tmp_path):
+    shm_root = tmp_path / 'shm'
+    shm_root.mkdir(mode=0o700)
+    for name in ['v100', 'v200', 'v300']:
+        (shm_root / name).mkdir()
+
+    shared_dataset._remove_stale_versions(str(shm_root), os.path.join(str(shm_root), 'v400'))
+
+    assert sorted(os.listdir(shm_root)) == ['v300']
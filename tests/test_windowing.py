@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import windowing
+
+
+def convertToMatrix(dataArr, lookBack):
+    # The notebook's implementation, kept as the reference
+    x, y = [], []
+    for i in range(len(dataArr) - lookBack):
+        d = i + lookBack
+        x.append(dataArr[i:d, ])
+        y.append(dataArr[d, ])
+    return np.array(x), np.array(y)
+
+
+@pytest.mark.parametrize('look_back', [1, 7, 30])
+def test_windows_match_convert_to_matrix(look_back):
+    values = np.random.default_rng(0).normal(100, 20, 400)
+
+    x, y = windowing.windows(values, look_back)
+    expected_x, expected_y = convertToMatrix(values, look_back)
+
+    np.testing.assert_array_equal(x, expected_x)
+    np.testing.assert_array_equal(y, expected_y)
+    np.testing.assert_array_equal(windowing.rnn_input(x),
+                                  np.reshape(expected_x, (expected_x.shape[0], 1, expected_x.shape[1])))
+
+
+def test_windows_are_views():
+    values = np.arange(50, dtype=np.float64)
+
+    x, y = windowing.windows(values, 7, horizon=3)
+
+    assert np.shares_memory(x, values) and np.shares_memory(y, values)
+    assert x.shape == (41, 7) and y.shape == (41, 3)
+    np.testing.assert_array_equal(y[0], [7, 8, 9])
+    np.testing.assert_array_equal(y[-1], [47, 48, 49])
+
+
+def test_series_shorter_than_a_window():
+    x, y = windowing.windows(np.arange(5.0), 7)
+
+    assert x.shape == (0, 7) and y.shape == (0,)
@@ -0,0 +1,113 @@
+"""Sliding windows over daily series for the RNN/LSTM forecasters.
+
+The notebook's ``convertToMatrix(dataArr, lookBack)`` copies every window
+into Python lists. Here windows are strided views from
+``numpy.lib.stride_tricks.sliding_window_view``: each input window and
+its targets share memory with the series, so sweeping look-back values or
+horizons over long histories copies nothing. Data is copied only when a
+training batch is gathered.
+
+``windows(values, 7)`` gives the same ``X``/``y`` as
+``convertToMatrix(values, 7)``, and ``rnn_input(X)`` gives the
+``(samples, 1, lookBack)`` shape the Keras models take.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def windows(values, look_back, horizon=1):
+    """Input windows and targets over one series, as views of ``values``.
+
+    Args:
+        values (array-like): 1-d series.
+        look_back (int): Days in each input window.
+        horizon (int): Days ahead in each target.
+
+    Returns:
+        tuple: ``(X, Y)`` of shapes ``(n, look_back)`` and ``(n, horizon)``,
+        with ``n = len(values) - look_back - horizon + 1``. For ``horizon=1``
+        ``Y`` is 1-d, like the notebook's ``y``.
+    """
+    values = np.asarray(values)
+    n = len(values) - look_back - horizon + 1
+    if n <= 0:
+        empty = np.empty((0, look_back), dtype=values.dtype)
+        return empty, (np.empty(0, dtype=values.dtype) if horizon == 1 else np.empty((0, horizon), values.dtype))
+    x = sliding_window_view(values, look_back)[:n]
+    if horizon == 1:
+        return x, values[look_back:look_back + n]
+    return x, sliding_window_view(values[look_back:], horizon)[:n]
+
+
+def rnn_input(x):
+    """``(samples, look_back)`` windows as the ``(samples, 1, look_back)`` view the RNN/LSTM take."""
+    return x[:, np.newaxis, :]
+
+
+def sweep(values, look_backs, horizons=(1,)):
+    """Windows for every (look_back, horizon) pair, all views of the same series.
+
+    Returns:
+        dict: ``(look_back, horizon) -> (X, Y)``.
+    """
+    values = np.asarray(values)
+    return {(look_back, horizon): windows(values, look_back, horizon)
+            for look_back in look_backs for horizon in horizons}
+
+
+class WindowSet:
+    """Windows over several series of any lengths, indexed as one training set.
+
+    Args:
+        series (list): 1-d arrays, or a 2-d array with one series per row.
+        look_back (int): Days in each input window.
+        horizon (int): Days ahead in each target.
+    """
+
+    def __init__(self, series, look_back, horizon=1):
+        self.look_back = look_back
+        self.horizon = horizon
+        self._views = [windows(np.asarray(values), look_back, horizon) for values in series]
+        counts = np.array([len(x) for x, _ in self._views], dtype=np.int64)
+        # Window i belongs to the series whose range [offsets[s], offsets[s + 1]) holds it
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def take(self, indices, rnn_shape=False):
+        """Copy the windows at ``indices`` into arrays ``(X, Y)``."""
+        indices = np.asarray(indices, dtype=np.int64)
+        owners = np.searchsorted(self.offsets, indices, side='right') - 1
+        x = np.empty((len(indices), self.look_back))
+        y = np.empty(len(indices)) if self.horizon == 1 else np.empty((len(indices), self.horizon))
+        for s in np.unique(owners):
+            mask = owners == s
+            local = indices[mask] - self.offsets[s]
+            view_x, view_y = self._views[s]
+            x[mask] = view_x[local]
+            y[mask] = view_y[local]
+        return (rnn_input(x) if rnn_shape else x), y
+
+    def arrays(self, rnn_shape=False):
+        """Every window, materialised."""
+        return self.take(np.arange(len(self)), rnn_shape)
+
+    def batches(self, batch_size=32, shuffle=False, seed=None, rnn_shape=False, epochs=1):
+        """Yield ``(X, Y)`` batches, copying only one batch at a time.
+
+        Args:
+            batch_size (int): Windows per batch.
+            shuffle (bool): Shuffle windows across all series each epoch.
+            seed (int): Seed for the shuffle.
+            rnn_shape (bool): Yield ``X`` as ``(batch, 1, look_back)``.
+            epochs (int): Passes over the data; None repeats forever, as
+                Keras ``fit`` with ``steps_per_epoch`` expects.
+        """
+        rng = np.random.default_rng(seed)
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            order = rng.permutation(len(self)) if shuffle else np.arange(len(self))
+            for start in range(0, len(order), batch_size):
+                yield self.take(order[start:start + batch_size], rnn_shape)
+            epoch += 1